@@ -133,10 +133,12 @@ def runPipeline(policyFile, runId, logthresh=None, name=None, logdir=None, worke
 
     pyPipeline.initializeStages()    
 
-    pyPipeline.startShutdownThread()  
-
+    # start the Slices first: with the "process" executionBackend they are 
+    # forked, which should happen before any other threads are running
     pyPipeline.startSlices()  
 
+    pyPipeline.startShutdownThread()  
+
     pyPipeline.startStagesLoop()
 
 
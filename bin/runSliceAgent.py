@@ -0,0 +1,68 @@
+#! /usr/bin/env python
+
+# 
+# LSST Data Management System
+# Copyright 2008, 2009, 2010 LSST Corporation.
+# 
+# This product includes software developed by the
+# LSST Project (http://www.lsst.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the LSST License Statement and 
+# the GNU General Public License along with this program.  If not, 
+# see <http://www.lsstcorp.org/LegalNotices/>.
+#
+
+
+from lsst.pex.harness.SliceAgent import SliceAgent
+
+from lsst.pex.logging import Log
+
+import sys
+import optparse, traceback
+
+usage = """Usage: %prog [-r rank] address"""
+desc = """Run one Slice of a pipeline started with executionBackend "socket".
+The agent connects to the pipeline's slice server at the given address 
+(host:port or unix:/path) and receives the pipeline policy name and run ID
+from it; the policy file must be reachable under the same path from the 
+directory in which the agent is started.
+"""
+
+cl = optparse.OptionParser(usage=usage, description=desc)
+cl.add_option("-r", "--rank", type="int", action="store", default=None, 
+              dest="rank", help="the slice rank to ask for")
+
+def main():
+    """parse the input arguments and run the slice
+    """
+
+    (cl.opts, cl.args) = cl.parse_args()
+
+    if(len(cl.args) < 1):
+        print >> sys.stderr, \
+            "%s: missing required argument(s)." % cl.get_prog_name()
+        print cl.get_usage()
+        sys.exit(1)
+
+    agent = SliceAgent(cl.args[0], cl.opts.rank)
+    agent.run()
+
+
+if (__name__ == '__main__'):
+    try:
+        main()
+    except Exception, e:
+        log = Log(Log.getDefaultLog(),"runSliceAgent")
+        log.log(Log.FATAL, str(e))
+        traceback.print_exc(file=sys.stderr)
+        sys.exit(2);
@@ -0,0 +1,148 @@
+#! /usr/bin/env python
+
+#
+# LSST Data Management System
+# Copyright 2008, 2009, 2010 LSST Corporation.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsst.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+#
+
+
+
+"""
+Report how long it takes to import the harness modules, and which modules
+the time goes to.
+
+Each module is imported in a fresh interpreter, in which every import is
+timed as it happens.  The time of an import is charged to the module it
+loads: "self" excludes the modules it imports in turn, "total" includes
+them.  The report also lists which of the costly modules that the harness
+loads only on first use (the event system and persistence) were imported.
+
+usage: importBenchmark.py [-r repeats] [-n top] [module ...]
+"""
+
+import optparse
+import subprocess
+import sys
+import time
+
+try:
+    import __builtin__ as builtins
+except ImportError:
+    import builtins
+
+MODULES = ["lsst.pex.harness",
+           "lsst.pex.harness.stage",
+           "lsst.pex.harness.simpleStageTester",
+           "lsst.pex.harness.IOStage",
+           "lsst.pex.harness.Slice",
+           "lsst.pex.harness.Pipeline"]
+
+DEFERRED = ["lsst.ctrl.events", "lsst.daf.persistence"]
+
+def timeImport(moduleName):
+    """
+    import a module, timing every import it triggers, and print one line
+    per loaded module: name, self time and total time in seconds
+    """
+    stack = []
+    times = {}
+    realImport = builtins.__import__
+
+    def timedImport(name, *args, **kw):
+        before = set(sys.modules)
+        stack.append(0.0)
+        start = time.time()
+        try:
+            return realImport(name, *args, **kw)
+        finally:
+            elapsed = time.time() - start
+            nested = stack.pop()
+            if stack:
+                stack[-1] += elapsed
+            loaded = [m for m in set(sys.modules) - before
+                      if sys.modules[m] is not None]
+            if loaded:
+                # charge the time to the module named, or to the deepest
+                # module loaded when the name was relative
+                matches = [m for m in loaded
+                           if m == name or m.endswith("." + name)]
+                loadedName = max(matches or loaded, key=len)
+                times[loadedName] = (elapsed - nested, elapsed)
+
+    builtins.__import__ = timedImport
+    start = time.time()
+    try:
+        __import__(moduleName)
+    finally:
+        builtins.__import__ = realImport
+    times[moduleName] = (times.get(moduleName, (0.0,))[0], time.time() - start)
+
+    for name, (selfTime, totalTime) in times.items():
+        print("%s %f %f" % (name, selfTime, totalTime))
+
+def measure(moduleName):
+    """
+    import a module in a fresh interpreter and return a dictionary of the
+    (self, total) import times of the modules it loaded
+    """
+    child = subprocess.Popen([sys.executable, __file__, "--child", moduleName],
+                             stdout=subprocess.PIPE)
+    output = child.communicate()[0]
+    if child.returncode != 0:
+        raise RuntimeError("Failed to import %s" % moduleName)
+
+    times = {}
+    for line in output.decode().splitlines():
+        name, selfTime, totalTime = line.split()
+        times[name] = (float(selfTime), float(totalTime))
+    return times
+
+def main():
+    parser = optparse.OptionParser(usage="%prog [-r repeats] [-n top] [module ...]")
+    parser.add_option("-r", "--repeats", type="int", default=3,
+                      help="number of fresh interpreters per module; the fastest is reported")
+    parser.add_option("-n", "--top", type="int", default=5,
+                      help="number of slowest imported modules listed per module")
+    parser.add_option("--child", action="store_true", help=optparse.SUPPRESS_HELP)
+    opts, args = parser.parse_args()
+
+    if opts.child:
+        timeImport(args[0])
+        return
+
+    for moduleName in args or MODULES:
+        best = None
+        for i in range(opts.repeats):
+            times = measure(moduleName)
+            if best is None or times[moduleName][1] < best[moduleName][1]:
+                best = times
+
+        deferred = [name for name in DEFERRED if name in best]
+        print("%-40s %8.1f ms  %d modules  deferred modules loaded: %s" % \
+              (moduleName, 1000*best[moduleName][1], len(best),
+               ", ".join(deferred) or "none"))
+
+        slowest = sorted(best.items(), key=lambda item: item[1][1], reverse=True)
+        for name, (selfTime, totalTime) in slowest[1:opts.top+1]:
+            print("    %-36s %8.1f ms total %8.1f ms self" % \
+                  (name, 1000*totalTime, 1000*selfTime))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#! /usr/bin/env python
+
+#
+# LSST Data Management System
+# Copyright 2008, 2009, 2010 LSST Corporation.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsst.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+#
+
+
+"""
+Compare the cost of sending a Clipboard holding NumPy arrays to another
+process by plain pickling (as a multiprocessing.Queue does) and through a
+ShmTransport, which passes the large arrays out-of-band in shared memory.
+
+For each array size the Clipboard is sent to a child process, which touches
+every page of the array and sends back a checksum; the round trip is timed
+over several repetitions and the best time is reported.
+
+usage: transportBenchmark.py [-r repeats] [size_MB ...]
+"""
+
+import multiprocessing
+import optparse
+import sys
+import time
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+import numpy
+
+from lsst.pex.harness.Clipboard import Clipboard
+from lsst.pex.harness.Transport import ShmTransport
+
+def receive(conn, transport):
+    while True:
+        data = conn.recv_bytes()
+        if not data:
+            break
+        if transport is None:
+            clipboard = pickle.loads(data)
+        else:
+            clipboard = transport.loads(data)
+        image = clipboard.get("image")
+        conn.send(float(image[::512].sum()))
+        del image, clipboard
+
+def timeRoundTrips(clipboard, transport, repeats):
+    parent, child = multiprocessing.Pipe()
+    proc = multiprocessing.Process(target=receive, args=(child, transport))
+    proc.start()
+
+    best = None
+    for i in range(repeats):
+        start = time.time()
+        if transport is None:
+            data = pickle.dumps(clipboard, pickle.HIGHEST_PROTOCOL)
+        else:
+            data = transport.dumps(clipboard)
+        parent.send_bytes(data)
+        parent.recv()
+        elapsed = time.time() - start
+        if best is None or elapsed < best:
+            best = elapsed
+
+    parent.send_bytes(b"")
+    proc.join()
+    return best
+
+def main():
+    parser = optparse.OptionParser(usage="%prog [-r repeats] [size_MB ...]")
+    parser.add_option("-r", "--repeats", type="int", default=5,
+                      help="number of round trips timed per size")
+    opts, args = parser.parse_args()
+    sizes = [int(arg) for arg in args] or [1, 16, 64, 256]
+
+    transport = ShmTransport()
+    try:
+        print("%10s %12s %12s %8s" % ("size (MB)", "pickle (s)", "shm (s)", "speedup"))
+        for size in sizes:
+            clipboard = Clipboard()
+            clipboard.put("image", numpy.ones((size << 20) // 8, dtype=numpy.float64))
+            clipboard.put("visitId", 1)
+
+            plain = timeRoundTrips(clipboard, None, opts.repeats)
+            shm = timeRoundTrips(clipboard, transport, opts.repeats)
+            print("%10d %12.4f %12.4f %8.1f" % (size, plain, shm, plain / shm))
+    finally:
+        transport.close()
+
+if __name__ == "__main__":
+    main()
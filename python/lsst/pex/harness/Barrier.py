@@ -0,0 +1,212 @@
+#! /usr/bin/env python
+
+#
+# LSST Data Management System
+# Copyright 2008, 2009, 2010 LSST Corporation.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsst.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+#
+
+"""
+Barrier provides the synchronization point shared by the Pipeline and its
+Slices.  All parties block in wait() until the last one arrives; they are
+then released together and the barrier resets itself for the next use.
+The time at which each party arrived is recorded so that the slowest
+participant at every sync point can be identified.
+
+Barrier synchronizes threads within one process; ProcessBarrier keeps its
+state in shared memory so that it can be used by Slices running in separate
+OS processes forked from the Pipeline.
+"""
+
+import multiprocessing
+import threading
+import time
+
+class BarrierAborted(RuntimeError):
+    """
+    raised by Barrier.wait() when the barrier has been aborted (e.g. during
+    a forced shutdown) or the wait timed out.
+    """
+    pass
+
+class Barrier(object):
+    '''Reusable N-party barrier built on a condition variable'''
+
+    def __init__(self, parties):
+        """
+        create the barrier
+        @param parties   the number of participants (e.g. nSlices + 1 for a
+                           Pipeline and its Slices)
+        """
+        if parties < 1:
+            raise ValueError("Barrier needs at least one party: %s" % parties)
+        self.parties = parties
+        self._cond = threading.Condition(threading.Lock())
+        self._count = 0
+        self._generation = 0
+        self._aborted = False
+        self._arrivals = []
+        self._lastArrivals = []
+
+    def wait(self, rank, timeout=None):
+        """
+        block until all parties have called wait().  The arrivals recorded
+        for this use of the barrier are returned as a list of (rank, time)
+        tuples, ordered by arrival; the last element is the party that
+        everyone else waited for.
+
+        @param rank     the identifier of the calling party (-1 for the
+                          Pipeline, the slice rank otherwise)
+        @param timeout  the maximum time in seconds to wait.  If None
+                          (default), wait indefinitely without polling.
+        @throws BarrierAborted  if the barrier was aborted or the wait timed
+                          out
+        """
+        self._cond.acquire()
+        try:
+            if self._aborted:
+                raise BarrierAborted("barrier aborted")
+
+            generation = self._generation
+            self._record(self._count, rank, time.time())
+            self._count += 1
+
+            if self._count == self.parties:
+                self._count = 0
+                self._generation += 1
+                arrivals = self._swapArrivals()
+                self._cond.notify_all()
+                return arrivals
+
+            if timeout is None:
+                while generation == self._generation and not self._aborted:
+                    self._cond.wait()
+            else:
+                deadline = time.time() + timeout
+                while generation == self._generation and not self._aborted:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        self._abort()
+                        raise BarrierAborted("barrier wait timed out")
+                    self._cond.wait(remaining)
+
+            if generation == self._generation:
+                raise BarrierAborted("barrier aborted")
+            return self._getLastArrivals()
+        finally:
+            self._cond.release()
+
+    def _record(self, slot, rank, arrivalTime):
+        # note the arrival of a party in the generation in progress
+        self._arrivals.append( (rank, arrivalTime) )
+
+    def _swapArrivals(self):
+        # retire the arrivals of the generation just completed
+        self._lastArrivals = self._arrivals
+        self._arrivals = []
+        return self._lastArrivals
+
+    def _getLastArrivals(self):
+        return self._lastArrivals
+
+    def abort(self):
+        """
+        put the barrier into the aborted state, releasing all current and
+        future waiters with a BarrierAborted exception.
+        """
+        self._cond.acquire()
+        try:
+            self._abort()
+        finally:
+            self._cond.release()
+
+    def _abort(self):
+        self._aborted = True
+        self._cond.notify_all()
+
+    def isAborted(self):
+        """
+        return True if the barrier has been aborted
+        """
+        return self._aborted
+
+    def getGeneration(self):
+        """
+        return the number of times the barrier has been passed
+        """
+        return self._generation
+
+    def getWaiting(self):
+        """
+        return the number of parties currently blocked in wait()
+        """
+        return self._count
+
+class ProcessBarrier(Barrier):
+    '''Reusable N-party barrier whose state lives in shared memory'''
+
+    def __init__(self, parties):
+        """
+        create the barrier.  It must be created before the processes that
+        share it are started.
+        @param parties   the number of participating processes
+        """
+        if parties < 1:
+            raise ValueError("Barrier needs at least one party: %s" % parties)
+        self.parties = parties
+        self._cond = multiprocessing.Condition(multiprocessing.Lock())
+
+        # count, generation and aborted flag
+        self._state = multiprocessing.Array('l', 3, lock=False)
+
+        # arrivals for the generation in progress and the one just completed
+        self._ranks = multiprocessing.Array('i', parties, lock=False)
+        self._times = multiprocessing.Array('d', parties, lock=False)
+        self._lastRanks = multiprocessing.Array('i', parties, lock=False)
+        self._lastTimes = multiprocessing.Array('d', parties, lock=False)
+
+    def _getCount(self):
+        return self._state[0]
+    def _setCount(self, value):
+        self._state[0] = value
+    _count = property(_getCount, _setCount)
+
+    def _getGenerationValue(self):
+        return self._state[1]
+    def _setGenerationValue(self, value):
+        self._state[1] = value
+    _generation = property(_getGenerationValue, _setGenerationValue)
+
+    def _getAborted(self):
+        return bool(self._state[2])
+    def _setAborted(self, value):
+        self._state[2] = int(value)
+    _aborted = property(_getAborted, _setAborted)
+
+    def _record(self, slot, rank, arrivalTime):
+        self._ranks[slot] = rank
+        self._times[slot] = arrivalTime
+
+    def _swapArrivals(self):
+        self._lastRanks[:] = self._ranks[:]
+        self._lastTimes[:] = self._times[:]
+        return self._getLastArrivals()
+
+    def _getLastArrivals(self):
+        return list(zip(self._lastRanks[:], self._lastTimes[:]))
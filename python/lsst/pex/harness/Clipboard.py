@@ -28,18 +28,39 @@ Clipboard provides a container for carrying image data from one Stage of
 the Pipeline to the next.  It wraps a Python dictionary. An image is 
 accessed via a get() method where a suitable key (e.g., "primary_image")
 must be provided.
+
+Each entry is stored once, in the value dictionary; whether it is shared
+with neighbouring Slices is recorded by the membership of its key in the 
+shared-key set, which put() and setShared() keep up to date.
+
+An entry put with putLazy() holds a factory in place of its value.  The 
+factory is called the first time the value is retrieved and the result 
+replaces it, so an expensive item that no later Stage reads is never 
+produced.  The keys of entries not yet forced are kept in the lazy-key set 
+and reported by getUnforcedKeys().
+
+A Clipboard may be given a ClipboardMemory, which estimates the size of 
+each entry and spills the least recently used entries to scratch files 
+when the Clipboard grows beyond its budget.  A spilled entry keeps its key
+(with None in place of its value) and is reloaded when it is retrieved.
 """
 
 
 class Clipboard(object):
     '''Container for images: maintains Python dictionary'''
 
-    def __init__ (self):
+    __slots__ = ("_values", "_sharedKeys", "_lazyKeys", "_memory")
+
+    def __init__ (self, memory=None):
         """
         Initialize the Clipboard by defining an initial dictionary
+        @param memory   an optional ClipboardMemory accounting for the 
+                          memory held by the entries
         """
-        self.dict = {}
-        self.isShared = {}
+        self._values = {}
+        self._sharedKeys = set()
+        self._lazyKeys = set()
+        self._memory = memory
 
     def __del__ (self):
         """
@@ -49,73 +70,212 @@ class Clipboard(object):
         self.close()
 
     def close(self):
+        """
+        Remove all entries, together with their shared flags
+        """
         # print 'Clearing Clipboard dictionary'
-        self.dict.clear()
+        self._values.clear()
+        self._sharedKeys.clear()
+        self._lazyKeys.clear()
+        if self._memory is not None:
+            self._memory.clear()
+
+    def getMemory (self):
+        """
+        Returns the ClipboardMemory of this Clipboard, or None
+        """
+        return self._memory
  
     def getKeys (self):
         """
         Returns the keys of the python dictionary (in the form of a python 
         list)
         """
-        return self.dict.keys()
+        return list(self._values)
 
     def getSharedKeys (self):
         """
         Returns the shared keys of the python dictionary (in the form of a python 
         list)
         """
-        fullKeySet =  self.dict.keys()
-        sharedKeySet = []
-        for key in fullKeySet:
-            if (self.isShared[key] == True):
-                sharedKeySet.append(key) 
-        return sharedKeySet
+        return list(self._sharedKeys)
+
+    def getUnforcedKeys (self):
+        """
+        Returns the keys of the entries put with putLazy() whose values have 
+        not been retrieved (in the form of a python list)
+        """
+        return list(self._lazyKeys)
+
+    def _force (self, key):
+        # produce the value of a lazy entry and cache it in place of the
+        # factory.  If the factory fails the entry stays lazy.
+        value = self._values[key]()
+        self._values[key] = value
+        self._lazyKeys.discard(key)
+        if self._memory is not None:
+            self._memory.add(key, value)
+            self._trim(key)
+        return value
+
+    def _getAccounted (self, key):
+        # retrieve an entry of a Clipboard with a ClipboardMemory, reloading
+        # it if it was spilled
+        value = self._values[key]
+        if self._memory.isSpilled(key):
+            value = self._memory.load(key)
+            self._values[key] = value
+            self._trim(key)
+        else:
+            self._memory.touch(key)
+        return value
+
+    def _trim (self, keep):
+        # spill entries until the Clipboard is within its memory budget
+        for key in self._memory.overBudget(keep):
+            if self._memory.spill(key, self._values[key]):
+                self._values[key] = None
 
     def getItem (self, key):
         """
         Return the value within the dictionary that corresponds to the 
         provided key 
         """
-        # return self.dict[key]
-        return self.dict.__getitem__(key)
+        if key in self._lazyKeys:
+            return self._force(key)
+        if self._memory is not None:
+            return self._getAccounted(key)
+        return self._values[key]
 
     def get (self, key, defValue=None):
         """
         Return the value within the dictionary that corresponds to the 
         provided key 
         """
-        return self.dict.get(key, defValue)
+        if key in self._lazyKeys:
+            return self._force(key)
+        if self._memory is not None:
+            if key not in self._values:
+                return defValue
+            return self._getAccounted(key)
+        return self._values.get(key, defValue)
 
     def put (self, key, value, isShareable=False):
         """
         Add an entry to the dictionary using the provided name/value pair 
         Set the shared value as well if provided 
         """
-        self.dict[key]     = value
-        self.isShared[key] = isShareable
+        self._values[key] = value
+        self._lazyKeys.discard(key)
+        if isShareable:
+            self._sharedKeys.add(key)
+        else:
+            self._sharedKeys.discard(key)
+        if self._memory is not None:
+            self._memory.add(key, value)
+            self._trim(key)
+
+    def putLazy (self, key, factory, isShareable=False):
+        """
+        Add an entry whose value is produced by calling factory() (with no
+        arguments) when it is first retrieved.  Set the shared value as well
+        if provided 
+        """
+        Clipboard.put(self, key, factory, isShareable)
+        self._lazyKeys.add(key)
+        if self._memory is not None:
+            # accounted for once it is produced
+            self._memory.discard(key)
 
     def setShared (self, key, isShareable):
         """
-        Set the shared value for this key 
+        Set the shared value for this key.  It has no effect for a key
+        that is not on the Clipboard.
+        """
+        if key not in self._values:
+            return
+        if isShareable:
+            self._sharedKeys.add(key)
+        else:
+            self._sharedKeys.discard(key)
+
+    def isShared (self, key):
+        """
+        Return True if the entry for this key is shared
         """
-        self.isShared[key] = isShareable
+        return key in self._sharedKeys
 
     def contains (self, key):
         """
         Return the value True if the dictionary has a key "key";
         otherwise return False.
         """
-        if key in self.dict:
-            return True
-        else:
-            return False
+        return key in self._values
+
+    def remove (self, key):
+        """
+        Remove the entry for this key, raising KeyError if there is none
+        """
+        del self._values[key]
+        self._sharedKeys.discard(key)
+        self._lazyKeys.discard(key)
+        if self._memory is not None:
+            self._memory.discard(key)
 
     #
     # Provide dictionary-like interface
     #
-    __setitem__ = put
-    __getitem__ = getItem
-    clear = close
-    has_key = contains
-    keys = getKeys
+    def __getitem__ (self, key):
+        return self.getItem(key)
+
+    def __setitem__ (self, key, value):
+        self.put(key, value)
+
+    def __delitem__ (self, key):
+        self.remove(key)
+
+    def __contains__ (self, key):
+        return key in self._values
+
+    def __len__ (self):
+        return len(self._values)
+
+    def __iter__ (self):
+        return iter(self._values)
+
+    def __nonzero__ (self):
+        # a Clipboard is a container object, not a collection: an empty one
+        # must not look like a missing one to "if clipboard:" tests
+        return True
+
+    __bool__ = __nonzero__
+
+    def keys (self):
+        return list(self._values)
+
+    def values (self):
+        return [self.getItem(key) for key in list(self._values)]
+
+    def items (self):
+        return [(key, self.getItem(key)) for key in list(self._values)]
+
+    def clear (self):
+        self.close()
+
+    def has_key (self, key):
+        return key in self._values
+
+    #
+    # __slots__ objects need explicit state for pickling, which is used to 
+    # pass Clipboards to Slices running as processes.  Lazy entries are 
+    # forced first: their factories are often closures that cannot be 
+    # pickled.  Spilled entries are reloaded; the copy has no 
+    # ClipboardMemory.
+    #
+    def __getstate__ (self):
+        return (dict(self.items()), self._sharedKeys)
 
+    def __setstate__ (self, state):
+        self._values, self._sharedKeys = state
+        self._lazyKeys = set()
+        self._memory = None
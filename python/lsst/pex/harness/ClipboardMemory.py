@@ -0,0 +1,296 @@
+#! /usr/bin/env python
+
+#
+# LSST Data Management System
+# Copyright 2008, 2009, 2010 LSST Corporation.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsst.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+#
+
+
+"""
+ClipboardMemory accounts for the memory held by the entries of a Clipboard
+and keeps it within a budget.  The size of each entry is estimated when it
+is put (see estimateSize()); the total and its high-water mark over the
+visit are kept.  When the total exceeds the budget the least recently used
+entries are spilled to files in a scratch directory and dropped from the
+Clipboard.  A spilled entry is reloaded when it is next retrieved: NumPy
+arrays are memory-mapped (copy-on-write) from the file, other values are
+unpickled.
+
+The budget is set with the clipboardMemoryBudget policy parameter (in MB);
+with a budget of 0 entries are accounted for but never spilled.
+"""
+
+import collections
+import os
+import shutil
+import sys
+import tempfile
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+_sizers = {}
+
+def registerSizer(cls, sizer):
+    """
+    register a function returning the size in bytes of the instances of a
+    class (and of its subclasses), for types estimateSize() does not know
+    @param cls     the class
+    @param sizer   a function taking an instance and returning its size
+    """
+    _sizers[cls] = sizer
+
+def estimateSize(value):
+    """
+    return an estimate of the memory held by a value, in bytes.  A sizer
+    registered for the value's class is used if there is one; otherwise 
+    NumPy arrays report nbytes, afw images and exposures the size of their
+    pixel arrays, and objects supporting the buffer protocol their buffer
+    length.  For anything else the size of the object itself is returned.
+    """
+    for cls in type(value).__mro__:
+        sizer = _sizers.get(cls)
+        if sizer is not None:
+            return sizer(value)
+
+    nbytes = getattr(value, "nbytes", None)
+    if isinstance(nbytes, (int, long)):
+        return nbytes
+
+    size = _afwSize(value)
+    if size is not None:
+        return size
+
+    try:
+        view = memoryview(value)
+        return view.itemsize * _product(view.shape)
+    except TypeError:
+        pass
+
+    return sys.getsizeof(value)
+
+def _product(shape):
+    n = 1
+    for extent in shape:
+        n *= extent
+    return n
+
+def _afwSize(value):
+    # afw images are recognized by their accessors so that afw need not be
+    # imported here: an Exposure holds a MaskedImage, which holds an image,
+    # mask and variance, each of which can return its pixels as an array
+    try:
+        if hasattr(value, "getMaskedImage"):
+            return estimateSize(value.getMaskedImage())
+        if hasattr(value, "getImage") and hasattr(value, "getVariance"):
+            return estimateSize(value.getImage()) + \
+                   estimateSize(value.getMask()) + \
+                   estimateSize(value.getVariance())
+        if hasattr(value, "getArray") and hasattr(value, "getWidth"):
+            return estimateSize(value.getArray())
+    except Exception:
+        pass
+    return None
+
+def _isNumpyArray(value):
+    return type(value).__module__ == "numpy" and \
+           type(value).__name__ in ("ndarray", "memmap")
+
+class ClipboardMemory(object):
+    '''Memory accounting and spilling for the entries of one Clipboard'''
+
+    def __init__(self, budget=0, scratchDir=None):
+        """
+        @param budget       the number of bytes above which entries are 
+                              spilled; 0 to only account for them
+        @param scratchDir   the directory under which spill files are 
+                              written, or None for the system temporary 
+                              directory
+        """
+        self.budget = budget
+        self.scratchDir = scratchDir
+        self.total = 0
+        self.highWaterMark = 0
+        self.nSpilled = 0
+        self.nReloaded = 0
+
+        self._sizes = collections.OrderedDict()   # resident entries, LRU first
+        self._spilled = {}                        # key: (path, size)
+        self._unspillable = set()
+        self._directory = None
+        self._nFiles = 0
+
+    def add(self, key, value):
+        """
+        account for a new value of an entry and make it the most recently 
+        used
+        """
+        self.discard(key)
+        size = estimateSize(value)
+        self._sizes[key] = size
+        self.total += size
+        if self.total > self.highWaterMark:
+            self.highWaterMark = self.total
+
+    def touch(self, key):
+        """
+        make an entry the most recently used
+        """
+        size = self._sizes.pop(key, None)
+        if size is not None:
+            self._sizes[key] = size
+
+    def discard(self, key):
+        """
+        stop accounting for an entry removed or replaced on the Clipboard
+        """
+        size = self._sizes.pop(key, None)
+        if size is not None:
+            self.total -= size
+        spilled = self._spilled.pop(key, None)
+        if spilled is not None:
+            self._removeFile(spilled[0])
+        self._unspillable.discard(key)
+
+    def overBudget(self, keep=None):
+        """
+        return the keys of the least recently used entries that should be 
+        spilled to bring the total back within the budget
+        @param keep   a key that must not be spilled (the entry in use)
+        """
+        if not self.budget or self.total <= self.budget:
+            return []
+        keys = []
+        excess = self.total - self.budget
+        for key, size in self._sizes.items():
+            if excess <= 0:
+                break
+            if key == keep or key in self._unspillable:
+                continue
+            keys.append(key)
+            excess -= size
+        return keys
+
+    def spill(self, key, value):
+        """
+        write an entry to a scratch file and stop accounting for it as 
+        resident.  Return True if it was spilled, or False if the value 
+        cannot be written (it is then kept in memory).
+        """
+        if self._directory is None:
+            if self.scratchDir is not None and not os.path.isdir(self.scratchDir):
+                os.makedirs(self.scratchDir)
+            self._directory = tempfile.mkdtemp(prefix="pexClipboard", 
+                                               dir=self.scratchDir)
+        self._nFiles += 1
+        path = os.path.join(self._directory, str(self._nFiles))
+
+        try:
+            if _isNumpyArray(value):
+                import numpy
+                path += ".npy"
+                numpy.save(path, value)
+            else:
+                f = open(path, "wb")
+                try:
+                    pickle.dump(value, f, pickle.HIGHEST_PROTOCOL)
+                finally:
+                    f.close()
+        except Exception:
+            self._removeFile(path)
+            self._unspillable.add(key)
+            return False
+
+        size = self._sizes.pop(key)
+        self.total -= size
+        self._spilled[key] = (path, size)
+        self.nSpilled += 1
+        return True
+
+    def isSpilled(self, key):
+        return key in self._spilled
+
+    def load(self, key):
+        """
+        return the value of a spilled entry, read back from its file.  The
+        entry is accounted for as resident again; the file is removed 
+        unless it is memory-mapped.
+        """
+        path, size = self._spilled.pop(key)
+        if path.endswith(".npy"):
+            import numpy
+            value = numpy.load(path, mmap_mode="c")
+        else:
+            f = open(path, "rb")
+            try:
+                value = pickle.load(f)
+            finally:
+                f.close()
+            self._removeFile(path)
+        self.nReloaded += 1
+
+        self._sizes[key] = size
+        self.total += size
+        if self.total > self.highWaterMark:
+            self.highWaterMark = self.total
+        return value
+
+    def _removeFile(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def getSizes(self):
+        """
+        return the estimated sizes of the entries as a dictionary, 
+        including those spilled
+        """
+        sizes = dict(self._sizes)
+        for key, (path, size) in self._spilled.items():
+            sizes[key] = size
+        return sizes
+
+    def getStats(self):
+        """
+        return the resident total, its high-water mark, the budget, and 
+        the numbers of entries spilled and reloaded as a dictionary
+        """
+        return {"total": self.total,
+                "highWaterMark": self.highWaterMark,
+                "budget": self.budget,
+                "spilled": self.nSpilled,
+                "reloaded": self.nReloaded}
+
+    def clear(self):
+        """
+        forget all entries, reset the statistics and remove the spill files
+        """
+        self._sizes.clear()
+        self._spilled.clear()
+        self._unspillable.clear()
+        self.total = 0
+        self.highWaterMark = 0
+        self.nSpilled = 0
+        self.nReloaded = 0
+        if self._directory is not None:
+            shutil.rmtree(self._directory, True)
+            self._directory = None
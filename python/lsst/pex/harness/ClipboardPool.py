@@ -0,0 +1,108 @@
+#! /usr/bin/env python
+
+#
+# LSST Data Management System
+# Copyright 2008, 2009, 2010 LSST Corporation.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsst.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+#
+
+
+"""
+ClipboardPool recycles the Clipboards of finished visits.  The Pipeline and
+the Slices take the empty Clipboard for each new visit from their pool and
+return the final Clipboard of the visit to it, instead of allocating a new
+Clipboard per visit and dropping the old one.  A returned Clipboard is
+closed, which clears its entries, flags and memory accounting, so it is
+indistinguishable from a new one.
+
+A stage must not keep a reference to a Clipboard beyond its visit: once
+the visit is over the Clipboard may be reused for another one.
+"""
+
+import threading
+
+from lsst.pex.harness.Clipboard import Clipboard
+
+class ClipboardPool(object):
+    '''A pool of empty Clipboards, shared by the threads of one process'''
+
+    def __init__(self, factory=Clipboard, maxsize=16):
+        """
+        create an empty pool
+        @param factory   the function called (with no arguments) to create a
+                           Clipboard when the pool is empty
+        @param maxsize   the maximum number of Clipboards kept; Clipboards
+                           returned to a full pool are dropped
+        """
+        self.factory = factory
+        self.maxsize = maxsize
+        self._free = []
+        self._lock = threading.Lock()
+
+        self._hits = 0
+        self._misses = 0
+        self._released = 0
+        self._dropped = 0
+
+    def acquire(self):
+        """
+        return an empty Clipboard, reusing a returned one if available
+        """
+        self._lock.acquire()
+        try:
+            if self._free:
+                self._hits += 1
+                return self._free.pop()
+            self._misses += 1
+        finally:
+            self._lock.release()
+        return self.factory()
+
+    def release(self, clipboard):
+        """
+        clear a Clipboard whose visit is over and keep it for reuse
+        """
+        clipboard.close()
+        self._lock.acquire()
+        try:
+            self._released += 1
+            if len(self._free) < self.maxsize:
+                self._free.append(clipboard)
+            else:
+                self._dropped += 1
+        finally:
+            self._lock.release()
+
+    def getStats(self):
+        """
+        return the pool statistics as a dictionary: the number of Clipboards
+        held (size), the numbers of acquisitions served from the pool (hits)
+        and by creating a Clipboard (misses), and the numbers of Clipboards
+        released and dropped because the pool was full
+        """
+        self._lock.acquire()
+        try:
+            return {"size": len(self._free),
+                    "maxsize": self.maxsize,
+                    "hits": self._hits,
+                    "misses": self._misses,
+                    "released": self._released,
+                    "dropped": self._dropped}
+        finally:
+            self._lock.release()
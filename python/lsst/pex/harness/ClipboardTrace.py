@@ -0,0 +1,248 @@
+#! /usr/bin/env python
+
+#
+# LSST Data Management System
+# Copyright 2008, 2009, 2010 LSST Corporation.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsst.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+#
+
+
+"""
+ClipboardTrace records how the stages of a pipeline use the Clipboard.  A
+TracingClipboard reports every put and get to a ClipboardTracer, together
+with the visit and stage being executed, the Slice rank, the type and 
+estimated size of the value and a timestamp.  The records are written as
+they occur, one JSON object per line, to "<path>.records.json".
+
+The tracer also builds the dataflow graph of the pipeline: an edge from
+stage A to stage B for every key that B reads after A wrote it.  Puts made
+by the harness itself (e.g. event payloads) come from the "harness" node.
+The graph is written by close() as "<path>.graph.json" and, for Graphviz,
+"<path>.dot", along with the put and get counts of every key.
+
+Tracing is enabled with the clipboardTrace policy parameter, which gives
+the path prefix; the Pipeline adds "-pipeline" and each Slice "-slice<rank>".
+"""
+
+import json
+import threading
+import time
+
+from lsst.pex.harness.Clipboard import Clipboard
+from lsst.pex.harness.ClipboardMemory import estimateSize
+
+HARNESS = "harness"
+
+class ClipboardTracer(object):
+    '''Collects the Clipboard accesses of a Pipeline or a Slice'''
+
+    def __init__(self, path, rank=-1, stageNames=None):
+        """
+        @param path         the path prefix of the files written
+        @param rank         the rank of the Slice, or -1 for the Pipeline
+        @param stageNames   the names of the stages, used in the graph
+        """
+        self.path = path
+        self.rank = rank
+        self.stageNames = stageNames or []
+        self._context = threading.local()
+        self._lock = threading.Lock()
+        self._records = None
+        self._edges = {}          # (source stage, target stage): set of keys
+        self._counts = {}         # key: [puts, gets]
+
+    def setContext(self, visit, stage):
+        """
+        set the visit and stage being executed by the calling thread
+        """
+        self._context.visit = visit
+        self._context.stage = stage
+
+    def getContext(self):
+        """
+        return the (visit, stage) being executed by the calling thread, 
+        with None for the stage outside of stage execution
+        """
+        return getattr(self._context, "visit", 0), getattr(self._context, "stage", None)
+
+    def record(self, op, key, value, visit, stage):
+        """
+        record one access
+        @param op      "put", "putLazy", "get" or "miss" (a get of an 
+                         absent key)
+        """
+        record = {"visit": visit, "stage": stage, "rank": self.rank,
+                  "op": op, "key": key, "type": type(value).__name__,
+                  "size": estimateSize(value) if op != "miss" else 0,
+                  "time": time.time()}
+        line = json.dumps(record) + "\n"
+
+        self._lock.acquire()
+        try:
+            counts = self._counts.setdefault(key, [0, 0])
+            if op.startswith("put"):
+                counts[0] += 1
+            else:
+                counts[1] += 1
+            if self._records is None:
+                self._records = open(self.path + ".records.json", "w")
+            self._records.write(line)
+        finally:
+            self._lock.release()
+
+    def addDependency(self, source, target, key):
+        """
+        record that stage target read a key written by stage source (None
+        for the harness)
+        """
+        self._lock.acquire()
+        try:
+            self._edges.setdefault((source, target), set()).add(key)
+        finally:
+            self._lock.release()
+
+    def _nodeName(self, stage):
+        if stage is None:
+            return HARNESS
+        if 0 < stage <= len(self.stageNames):
+            return "%d:%s" % (stage, self.stageNames[stage-1])
+        return str(stage)
+
+    def getGraph(self):
+        """
+        return the dataflow graph as a dictionary with lists of "nodes" and
+        "edges" (each with "from", "to" and "keys") and the put and get 
+        counts of every key under "keys"
+        """
+        self._lock.acquire()
+        try:
+            edges = sorted(self._edges.items())
+            counts = dict(self._counts)
+        finally:
+            self._lock.release()
+
+        nodes = set()
+        graphEdges = []
+        for (source, target), keys in edges:
+            nodes.add(self._nodeName(source))
+            nodes.add(self._nodeName(target))
+            graphEdges.append({"from": self._nodeName(source),
+                               "to": self._nodeName(target),
+                               "keys": sorted(keys)})
+        keys = {}
+        for key, (puts, gets) in counts.items():
+            keys[key] = {"puts": puts, "gets": gets}
+        return {"rank": self.rank, "nodes": sorted(nodes),
+                "edges": graphEdges, "keys": keys}
+
+    def toDot(self):
+        """
+        return the dataflow graph in Graphviz DOT format
+        """
+        graph = self.getGraph()
+        lines = ["digraph clipboard {"]
+        for node in graph["nodes"]:
+            lines.append('    "%s";' % node)
+        for edge in graph["edges"]:
+            lines.append('    "%s" -> "%s" [label="%s"];' % \
+                         (edge["from"], edge["to"], "\\n".join(edge["keys"])))
+        lines.append("}")
+        return "\n".join(lines) + "\n"
+
+    def close(self):
+        """
+        close the records file and write the dataflow graph
+        """
+        self._lock.acquire()
+        try:
+            if self._records is not None:
+                self._records.close()
+                self._records = None
+        finally:
+            self._lock.release()
+
+        f = open(self.path + ".graph.json", "w")
+        try:
+            json.dump(self.getGraph(), f, indent=1, sort_keys=True)
+        finally:
+            f.close()
+        f = open(self.path + ".dot", "w")
+        try:
+            f.write(self.toDot())
+        finally:
+            f.close()
+
+class TracingClipboard(Clipboard):
+    '''A Clipboard that reports its puts and gets to a ClipboardTracer'''
+
+    __slots__ = ("_tracer", "_writers")
+
+    def __init__ (self, tracer, memory=None):
+        """
+        @param tracer   the ClipboardTracer to report to
+        @param memory   an optional ClipboardMemory
+        """
+        Clipboard.__init__(self, memory)
+        self._tracer = tracer
+        self._writers = {}        # key: the stage that last put it
+
+    def close (self):
+        Clipboard.close(self)
+        self._writers.clear()
+
+    def _traceGet (self, key, value):
+        visit, stage = self._tracer.getContext()
+        self._tracer.record("get", key, value, visit, stage)
+        writer = self._writers.get(key)
+        if writer != stage:
+            self._tracer.addDependency(writer, stage, key)
+
+    def getItem (self, key):
+        value = Clipboard.getItem(self, key)
+        self._traceGet(key, value)
+        return value
+
+    def get (self, key, defValue=None):
+        if key not in self._values:
+            visit, stage = self._tracer.getContext()
+            self._tracer.record("miss", key, None, visit, stage)
+            return defValue
+        value = Clipboard.get(self, key, defValue)
+        self._traceGet(key, value)
+        return value
+
+    def put (self, key, value, isShareable=False):
+        Clipboard.put(self, key, value, isShareable)
+        visit, stage = self._tracer.getContext()
+        self._writers[key] = stage
+        self._tracer.record("put", key, value, visit, stage)
+
+    def putLazy (self, key, factory, isShareable=False):
+        Clipboard.putLazy(self, key, factory, isShareable)
+        visit, stage = self._tracer.getContext()
+        self._writers[key] = stage
+        self._tracer.record("putLazy", key, factory, visit, stage)
+
+    def remove (self, key):
+        Clipboard.remove(self, key)
+        self._writers.pop(key, None)
+
+    def __reduce__ (self):
+        # a copy sent to another process is not traced
+        return (Clipboard, (), Clipboard.__getstate__(self))
@@ -0,0 +1,292 @@
+#! /usr/bin/env python
+
+#
+# LSST Data Management System
+# Copyright 2008, 2009, 2010 LSST Corporation.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsst.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+#
+
+
+"""
+Coroutine lets a stage overlap its waits.  A preprocess(), process() or
+postprocess() written as a generator is driven as a coroutine: wherever it
+would block it yields instead, and resumes when the wait is over.  A
+coroutine may yield
+
+   a Future          to wait for its result, which is sent back (or its
+                       exception raised) at the yield
+   a list of Futures to wait for all of them; the list of their results 
+                       is sent back
+   a number          to sleep for that many seconds
+   None              to let the other coroutines run
+
+runInThread() turns a blocking call, such as a butler read or an event 
+receive, into a Future by running it in a thread of its own.  When 
+processBatch() is given several Clipboards, the coroutines processing them 
+are run together, so one Clipboard's waits overlap with the work on the 
+others.
+
+These are generator-based coroutines, as "async def" is not available to
+the Python this package supports.
+"""
+
+import collections
+import heapq
+import sys
+import threading
+import time
+import types
+
+def isCoroutine(value):
+    """
+    return True if the value returned by a stage method is a coroutine to 
+    be driven
+    """
+    return isinstance(value, types.GeneratorType)
+
+class Future(object):
+    '''The result of an operation that completes later'''
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._done = False
+        self._result = None
+        self._excInfo = None
+        self._callbacks = []
+
+    def done(self):
+        """
+        return True once the result or exception is set
+        """
+        with self._cond:
+            return self._done
+
+    def result(self, timeout=None):
+        """
+        return the result, waiting for it if necessary, or raise the 
+        exception the operation failed with
+        @param timeout   the maximum time in seconds to wait; RuntimeError
+                           is raised if it expires
+        """
+        with self._cond:
+            if not self._done:
+                self._cond.wait(timeout)
+            if not self._done:
+                raise RuntimeError("Future not done after %s seconds" % timeout)
+            if self._excInfo is not None:
+                raise self._excInfo[0], self._excInfo[1], self._excInfo[2]
+            return self._result
+
+    def excInfo(self):
+        """
+        return the exception the operation failed with as a 
+        (type, value, traceback) tuple, or None
+        """
+        with self._cond:
+            return self._excInfo
+
+    def setResult(self, result):
+        """
+        complete the operation with the given result
+        """
+        self._complete(result, None)
+
+    def setException(self, excInfo):
+        """
+        fail the operation with the given (type, value, traceback) tuple
+        """
+        self._complete(None, excInfo)
+
+    def _complete(self, result, excInfo):
+        with self._cond:
+            if self._done:
+                raise RuntimeError("Future already done")
+            self._result = result
+            self._excInfo = excInfo
+            self._done = True
+            callbacks = self._callbacks
+            self._callbacks = []
+            self._cond.notify_all()
+        for callback in callbacks:
+            callback(self)
+
+    def addDoneCallback(self, callback):
+        """
+        call callback(future) once the Future is done, at once if it 
+        already is
+        """
+        with self._cond:
+            if not self._done:
+                self._callbacks.append(callback)
+                return
+        callback(self)
+
+def runInThread(func, *args, **kwargs):
+    """
+    call func(*args, **kwargs) in a new thread and return a Future for its
+    result
+    """
+    future = Future()
+    def run():
+        try:
+            result = func(*args, **kwargs)
+        except:
+            future.setException(sys.exc_info())
+        else:
+            future.setResult(result)
+    thread = threading.Thread(target=run)
+    thread.daemon = True
+    thread.start()
+    return future
+
+def gatherFutures(futures):
+    """
+    return a Future for the list of the results of the given Futures; it 
+    fails with the first exception among them
+    """
+    gathered = Future()
+    futures = list(futures)
+    if not futures:
+        gathered.setResult([])
+        return gathered
+
+    lock = threading.Lock()
+    remaining = [len(futures)]
+    def oneDone(future):
+        with lock:
+            remaining[0] -= 1
+            last = remaining[0] == 0
+        if not last:
+            return
+        for f in futures:
+            if f.excInfo() is not None:
+                gathered.setException(f.excInfo())
+                return
+        gathered.setResult([f.result() for f in futures])
+    for future in futures:
+        future.addDoneCallback(oneDone)
+    return gathered
+
+class CoroutineLoop(object):
+    '''Drives a set of coroutines until all of them have finished'''
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._ready = collections.deque()
+        self._sleeping = []
+        self._waiting = set()
+        self._sequence = 0
+
+    def spawn(self, coroutine):
+        """
+        add a coroutine to be run
+        """
+        with self._cond:
+            self._ready.append( (coroutine, None, None) )
+
+    def run(self):
+        """
+        run the coroutines until all have finished.  If one raises an 
+        exception the others are closed and the exception is raised.
+        """
+        while True:
+            with self._cond:
+                while not self._ready:
+                    now = time.time()
+                    while self._sleeping and self._sleeping[0][0] <= now:
+                        deadline, sequence, coroutine = heapq.heappop(self._sleeping)
+                        self._ready.append( (coroutine, None, None) )
+                    if self._ready:
+                        break
+                    if not self._sleeping and not self._waiting:
+                        return
+                    timeout = None
+                    if self._sleeping:
+                        timeout = self._sleeping[0][0] - now
+                    self._cond.wait(timeout)
+                coroutine, value, excInfo = self._ready.popleft()
+
+            try:
+                self._step(coroutine, value, excInfo)
+            except:
+                excInfo = sys.exc_info()
+                self._closeAll()
+                raise excInfo[0], excInfo[1], excInfo[2]
+
+    def _step(self, coroutine, value, excInfo):
+        try:
+            if excInfo is not None:
+                awaited = coroutine.throw(excInfo[0], excInfo[1], excInfo[2])
+            else:
+                awaited = coroutine.send(value)
+        except StopIteration:
+            return
+
+        if isinstance(awaited, (list, tuple)):
+            awaited = gatherFutures(awaited)
+
+        with self._cond:
+            if awaited is None:
+                self._ready.append( (coroutine, None, None) )
+            elif isinstance(awaited, (int, long, float)):
+                self._sequence += 1
+                heapq.heappush(self._sleeping,
+                               (time.time() + awaited, self._sequence, coroutine))
+            elif isinstance(awaited, Future):
+                self._waiting.add(coroutine)
+            else:
+                try:
+                    raise RuntimeError("A coroutine cannot wait on %r" % (awaited,))
+                except RuntimeError:
+                    self._ready.append( (coroutine, None, sys.exc_info()) )
+
+        if isinstance(awaited, Future):
+            def resume(future):
+                with self._cond:
+                    if coroutine not in self._waiting:
+                        # closed after another coroutine failed
+                        return
+                    self._waiting.discard(coroutine)
+                    self._ready.append( (coroutine, future._result, future.excInfo()) )
+                    self._cond.notify_all()
+            awaited.addDoneCallback(resume)
+
+    def _closeAll(self):
+        with self._cond:
+            coroutines = [entry[0] for entry in self._ready] + \
+                         [entry[2] for entry in self._sleeping] + \
+                         list(self._waiting)
+            self._ready.clear()
+            self._sleeping = []
+            self._waiting.clear()
+        for coroutine in coroutines:
+            coroutine.close()
+
+def runCoroutines(values):
+    """
+    drive to completion those of the given values, as returned by stage 
+    methods, that are coroutines, running them together
+    """
+    coroutines = [value for value in values if isCoroutine(value)]
+    if not coroutines:
+        return
+    loop = CoroutineLoop()
+    for coroutine in coroutines:
+        loop.spawn(coroutine)
+    loop.run()
@@ -0,0 +1,124 @@
+#! /usr/bin/env python
+
+#
+# LSST Data Management System
+# Copyright 2008, 2009, 2010 LSST Corporation.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsst.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+#
+
+"""
+EventWaiter waits for the next event on one or more topics.  It relies on
+blocking receives from the event system, so an event is returned as soon as
+it arrives rather than after a fixed sleep.  Each receive is bounded by a
+short timeout (eventReceiveTimeout, in milliseconds) after which a stop
+request is noticed; the event system offers no descriptor that could be
+used to interrupt a receive directly.
+
+EventFanOut hands the events received by the Pipeline directly to Slices
+running as threads in the same process, without a round trip through the
+event broker.
+"""
+
+from __future__ import absolute_import
+
+import time
+try:
+    import Queue as pyqueue
+except ImportError:
+    import queue as pyqueue
+
+from lsst.pex.harness.LazyImport import lazyImport
+events = lazyImport("lsst.ctrl.events")
+
+class EventWaiter(object):
+    '''Waits for the first event to arrive on any of a set of topics'''
+
+    def __init__(self, topics, stop=None, receiveTimeout=100):
+        """
+        create the waiter.  Receivers for the topics must already have been
+        created with the event system.
+        @param topics          a topic name or a list of topic names
+        @param stop            an optional threading.Event; wait() returns
+                                 as soon as possible once it is set
+        @param receiveTimeout  the longest time in milliseconds a single
+                                 receive may block before the stop request
+                                 is checked
+        """
+        if not isinstance(topics, (list, tuple)):
+            topics = [topics]
+        self.topics = list(topics)
+        self.stop = stop
+        self.receiveTimeout = receiveTimeout
+        self._next = 0
+
+    def wait(self, timeout=None):
+        """
+        return the first event to arrive as a (topic, PropertySet) tuple,
+        or (None, None) if the stop request was set or the timeout expired
+        @param timeout   the maximum time in seconds to wait, or None to
+                           wait until an event arrives or a stop is requested
+        """
+        eventsSystem = events.EventSystem.getDefaultEventSystem()
+
+        # spread the receive timeout over the topics and start each scan at
+        # the topic after the one last served, so no topic is starved
+        nTopics = len(self.topics)
+        topicTimeout = max(1, self.receiveTimeout // nTopics)
+
+        deadline = None
+        if timeout is not None:
+            deadline = time.time() + timeout
+
+        while True:
+            for i in range(nTopics):
+                index = (self._next + i) % nTopics
+                topic = self.topics[index]
+                propertySet = eventsSystem.receive(topic, topicTimeout)
+                if propertySet is not None:
+                    self._next = (index + 1) % nTopics
+                    return topic, propertySet
+
+            if self.stop is not None and self.stop.isSet():
+                return None, None
+            if deadline is not None and time.time() >= deadline:
+                return None, None
+
+class EventFanOut(object):
+    '''Per-Slice mailboxes for the events of one Stage'''
+
+    def __init__(self, nSlices):
+        """
+        create one mailbox per Slice
+        """
+        self._mailboxes = [pyqueue.Queue() for i in range(nSlices)]
+
+    def publish(self, propertySet):
+        """
+        deliver a copy of the event payload to every Slice, as the broker
+        would have
+        """
+        for mailbox in self._mailboxes:
+            mailbox.put(propertySet.deepCopy())
+
+    def receive(self, rank):
+        """
+        return the next event payload for the given Slice, waiting for it
+        to arrive
+        """
+        return self._mailboxes[rank].get()
@@ -0,0 +1,214 @@
+#! /usr/bin/env python
+
+#
+# LSST Data Management System
+# Copyright 2008, 2009, 2010 LSST Corporation.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsst.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+#
+
+"""
+Exchange carries out the inter-Slice communication of a Stage with
+shareData: true.  Before process() is called, every Slice posts the
+Clipboard entries marked shared and receives those of its neighbours, which
+are placed on its Clipboard under "<key>-<neighbour rank>".  The neighbours
+are given by the topology:
+
+   ring, clockwise          receive from rank-1 (wrapping around)
+   ring, counterclockwise   receive from rank+1 (wrapping around)
+   allGather                receive from every other Slice
+
+Only the Slices take part; they meet at a barrier of their own once per
+exchange.  The posted entries are double-buffered, so a Slice may post the
+next exchange while a slower neighbour is still reading the current one.
+
+Exchange serves Slices running as threads and hands over references to the
+posted objects, which receivers must treat as read-only.  ProcessExchange
+serves Slices running as OS processes and passes the entries through files
+in shared memory (/dev/shm where available); NumPy arrays are written in
+their native layout and memory-mapped read-only by the receivers rather than
+pickled.
+"""
+
+import os
+import shutil
+import tempfile
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+from lsst.pex.harness.Barrier import Barrier, ProcessBarrier
+
+RING = "ring"
+ALL_GATHER = "allGather"
+CLOCKWISE = "clockwise"
+COUNTERCLOCKWISE = "counterclockwise"
+
+class Exchange(object):
+    '''Exchange of shared Clipboard entries among Slices running as threads'''
+
+    def __init__(self, nSlices, topology=RING, direction=CLOCKWISE):
+        """
+        create the exchange
+        @param nSlices     the number of Slices taking part
+        @param topology    RING or ALL_GATHER
+        @param direction   CLOCKWISE or COUNTERCLOCKWISE (ring only)
+        """
+        if topology not in (RING, ALL_GATHER):
+            raise RuntimeError("Unsupported shareData topology: %s" % topology)
+        if topology == RING and direction not in (CLOCKWISE, COUNTERCLOCKWISE):
+            raise RuntimeError("Unsupported ring direction: %s" % direction)
+        self.nSlices = nSlices
+        self.topology = topology
+        self.direction = direction
+        self.barrier = self._makeBarrier(nSlices)
+        self._generations = [0] * nSlices
+        self._slots = [[None] * nSlices, [None] * nSlices]
+
+    def _makeBarrier(self, nSlices):
+        return Barrier(nSlices)
+
+    def getSources(self, rank):
+        """
+        return the ranks of the Slices the given Slice receives from
+        """
+        if self.nSlices < 2:
+            return []
+        if self.topology == ALL_GATHER:
+            return [r for r in range(self.nSlices) if r != rank]
+        if self.direction == CLOCKWISE:
+            return [(rank - 1) % self.nSlices]
+        return [(rank + 1) % self.nSlices]
+
+    def share(self, rank, shared):
+        """
+        post the shared entries of a Slice, wait for all Slices to do the
+        same, and return the entries received from the neighbours as a
+        dictionary keyed by "<key>-<neighbour rank>"
+        @param rank     the rank of the calling Slice
+        @param shared   a dictionary of the entries to share
+        """
+        generation = self._generations[rank]
+        self._generations[rank] += 1
+
+        self._post(rank, generation, shared)
+        self.barrier.wait(rank)
+
+        received = {}
+        for source in self.getSources(rank):
+            for key, value in self._fetch(source, generation).items():
+                received["%s-%d" % (key, source)] = value
+        return received
+
+    def _post(self, rank, generation, shared):
+        self._slots[generation % 2][rank] = shared
+
+    def _fetch(self, source, generation):
+        return self._slots[generation % 2][source]
+
+    def abort(self):
+        """
+        release any Slice blocked in share()
+        """
+        self.barrier.abort()
+
+    def close(self):
+        """
+        release the resources held by the exchange
+        """
+        self._slots = [[None] * self.nSlices, [None] * self.nSlices]
+
+class _SharedArray(object):
+    # stands in for a NumPy array in a pickled posting
+    def __init__(self, path):
+        self.path = path
+
+def _isNumpyArray(value):
+    # recognize an ndarray without importing numpy for pipelines that
+    # never use it
+    return type(value).__name__ == "ndarray" and \
+           type(value).__module__ == "numpy"
+
+class ProcessExchange(Exchange):
+    '''Exchange of shared Clipboard entries among Slices running as OS processes'''
+
+    def __init__(self, nSlices, topology=RING, direction=CLOCKWISE, directory=None):
+        """
+        create the exchange.  It must be created before the Slice processes
+        are started.
+        @param directory   where to create the exchange files; by default a
+                             new directory under /dev/shm, or the system
+                             temporary directory if /dev/shm does not exist
+        """
+        Exchange.__init__(self, nSlices, topology, direction)
+        if directory is None and os.path.isdir("/dev/shm"):
+            directory = "/dev/shm"
+        self.directory = tempfile.mkdtemp(prefix="pexExchange", dir=directory)
+
+    def _makeBarrier(self, nSlices):
+        return ProcessBarrier(nSlices)
+
+    def _path(self, rank, generation):
+        return os.path.join(self.directory, "%d-%d" % (rank, generation))
+
+    def _post(self, rank, generation, shared):
+        # the postings of two exchanges ago have been read by everyone
+        if generation >= 2:
+            self._remove(rank, generation - 2)
+
+        base = self._path(rank, generation)
+        posting = {}
+        for i, (key, value) in enumerate(shared.items()):
+            if _isNumpyArray(value):
+                import numpy
+                arrayPath = "%s-%d.npy" % (base, i)
+                numpy.save(arrayPath, value)
+                value = _SharedArray(arrayPath)
+            posting[key] = value
+
+        f = open(base, "wb")
+        try:
+            pickle.dump(posting, f, pickle.HIGHEST_PROTOCOL)
+        finally:
+            f.close()
+
+    def _fetch(self, source, generation):
+        f = open(self._path(source, generation), "rb")
+        try:
+            posting = pickle.load(f)
+        finally:
+            f.close()
+
+        for key, value in posting.items():
+            if isinstance(value, _SharedArray):
+                import numpy
+                posting[key] = numpy.load(value.path, mmap_mode="r")
+        return posting
+
+    def _remove(self, rank, generation):
+        prefix = "%d-%d" % (rank, generation)
+        for name in os.listdir(self.directory):
+            if name == prefix or name.startswith(prefix + "-"):
+                os.remove(os.path.join(self.directory, name))
+
+    def close(self):
+        """
+        remove the exchange files
+        """
+        shutil.rmtree(self.directory, True)
@@ -0,0 +1,227 @@
+#! /usr/bin/env python
+
+#
+# LSST Data Management System
+# Copyright 2008, 2009, 2010 LSST Corporation.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsst.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+#
+
+
+"""
+Executor gives the parallel part of a stage a pool of workers within its
+Slice, for work that fans out below the Slice's unit of data (the 
+amplifiers of a CCD, the patches of a detection).  A Slice creates one 
+Executor and makes it available to its stages as self.executor:
+
+   results = self.executor.map(measureAmp, amps)
+
+or, from a coroutine (see lsst.pex.harness.Coroutine):
+
+   result = yield self.executor.submit(measureAmp, amp)
+
+The workers are threads by default, or OS processes (sliceWorkerKind: 
+"process") for work that holds the interpreter lock; the functions and 
+arguments must then be picklable.  A Slice that itself runs as a daemon 
+process cannot start processes, and uses threads instead.  The pool is 
+started on first use.  Unless sliceWorkers sets the number of workers, the
+CPUs of the node are divided among the Slices running on it 
+(slicesPerNode, by default all of them) so that the node is not 
+oversubscribed.  The time taken by every task is logged.
+"""
+
+import multiprocessing
+import multiprocessing.pool
+import sys
+import threading
+import time
+import traceback
+
+from lsst.pex.logging import Log
+from lsst.pex.harness.Coroutine import Future
+
+def getWorkerCount(sliceWorkers, slicesPerNode):
+    """
+    return the number of workers for each Slice's Executor
+    @param sliceWorkers    the number of workers requested, or 0 to share
+                             the node's CPUs among its Slices
+    @param slicesPerNode   the number of Slices running on the node
+    """
+    if sliceWorkers > 0:
+        return sliceWorkers
+    try:
+        nCpus = multiprocessing.cpu_count()
+    except NotImplementedError:
+        nCpus = 1
+    return max(1, nCpus // max(1, slicesPerNode))
+
+def _timedCall(task):
+    # run one task in a worker, returning its duration with its result or
+    # with the exception it raised and the formatted traceback
+    func, args, kwargs = task
+    start = time.time()
+    try:
+        result = func(*args, **kwargs)
+    except:
+        excType, excValue, excTraceback = sys.exc_info()
+        trace = "".join(traceback.format_exception(excType, excValue, excTraceback))
+        return time.time() - start, False, (excType, excValue, trace)
+    return time.time() - start, True, result
+
+class Executor(object):
+    '''A pool of workers for the tasks of a Slice's stages'''
+
+    def __init__(self, nWorkers=0, kind="thread", log=None):
+        """
+        create the Executor; no worker is started until it is used
+        @param nWorkers   the number of workers; 0 runs every task at once 
+                            in the calling thread
+        @param kind       "thread" or "process"
+        @param log        the Log to record the task timings in
+        """
+        if kind not in ("thread", "process"):
+            raise RuntimeError("Unsupported executor kind: %s" % kind)
+        self.nWorkers = nWorkers
+        self.kind = kind
+        self.log = log
+        self._pool = None
+        self._lock = threading.Lock()
+
+        self._tasks = 0
+        self._failed = 0
+        self._busyTime = 0.0
+        self._longest = 0.0
+
+    def _getPool(self):
+        with self._lock:
+            if self._pool is None:
+                kind = self.kind
+                if kind == "process" and multiprocessing.current_process().daemon:
+                    if self.log is not None:
+                        self.log.log(Log.WARN, "Cannot start worker processes from a daemon process; using threads")
+                    kind = "thread"
+                if kind == "process":
+                    self._pool = multiprocessing.Pool(self.nWorkers)
+                else:
+                    self._pool = multiprocessing.pool.ThreadPool(self.nWorkers)
+            return self._pool
+
+    def _record(self, index, outcome):
+        # account for a finished task; return its result or raise its 
+        # exception
+        elapsed, ok, payload = outcome
+        with self._lock:
+            self._tasks += 1
+            self._busyTime += elapsed
+            self._longest = max(self._longest, elapsed)
+            if not ok:
+                self._failed += 1
+        if self.log is not None:
+            self.log.log(Log.DEBUG, "task %d: %.4f s" % (index, elapsed))
+        if not ok:
+            excType, excValue, trace = payload
+            if self.log is not None:
+                self.log.log(Log.WARN, "task %d failed: %s" % (index, trace))
+            raise excType, excValue
+        return payload
+
+    def map(self, func, items):
+        """
+        call func on every item and return the list of results in order.
+        If tasks fail, the exception of the first failed one is raised once
+        all have finished.
+        """
+        tasks = [(func, (item,), {}) for item in items]
+        start = time.time()
+        if self.nWorkers > 0 and len(tasks) > 1:
+            outcomes = self._getPool().map(_timedCall, tasks)
+        else:
+            outcomes = [_timedCall(task) for task in tasks]
+
+        results = []
+        excInfo = None
+        for index, outcome in enumerate(outcomes):
+            try:
+                results.append(self._record(index, outcome))
+            except:
+                results.append(None)
+                if excInfo is None:
+                    excInfo = sys.exc_info()
+        if self.log is not None:
+            self.log.log(Log.DEBUG, "map of %d tasks: %.4f s" % (len(tasks), time.time() - start))
+        if excInfo is not None:
+            raise excInfo[0], excInfo[1], excInfo[2]
+        return results
+
+    def submit(self, func, *args, **kwargs):
+        """
+        call func(*args, **kwargs) in a worker and return a Future for its 
+        result
+        """
+        future = Future()
+        task = (func, args, kwargs)
+        def done(outcome):
+            try:
+                result = self._record(0, outcome)
+            except:
+                future.setException(sys.exc_info())
+            else:
+                future.setResult(result)
+
+        if self.nWorkers > 0:
+            pending = self._getPool().apply_async(_timedCall, (task,))
+            # wait for the outcome in a thread of its own: the pool calls 
+            # no callback if the task or its result cannot be pickled for 
+            # a worker process, and the Future would never complete
+            def wait():
+                try:
+                    outcome = pending.get()
+                except:
+                    if self.log is not None:
+                        self.log.log(Log.WARN, "task could not be run: %s" % sys.exc_info()[1])
+                    future.setException(sys.exc_info())
+                else:
+                    done(outcome)
+            waiter = threading.Thread(target=wait)
+            waiter.daemon = True
+            waiter.start()
+        else:
+            done(_timedCall(task))
+        return future
+
+    def getStats(self):
+        """
+        return the number of tasks run and failed, and their total and 
+        longest times in seconds, as a dictionary
+        """
+        with self._lock:
+            return {"tasks": self._tasks,
+                    "failed": self._failed,
+                    "busyTime": self._busyTime,
+                    "longest": self._longest}
+
+    def close(self):
+        """
+        stop the workers
+        """
+        with self._lock:
+            pool = self._pool
+            self._pool = None
+        if pool is not None:
+            pool.terminate()
+            pool.join()
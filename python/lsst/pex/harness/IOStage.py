@@ -45,11 +45,14 @@ import lsst.pex.harness.stage as harnessStage
 import lsst.pex.harness.Utils
 from lsst.pex.harness import Dataset
 import lsst.daf.base as dafBase
-import lsst.daf.persistence as dafPersist
 import lsst.pex.policy as pexPolicy
 from lsst.pex.logging import Log, BlockTimingLog
 import lsst.pex.exceptions as pexExcept
 
+# persistence and the butler are imported when a stage first uses them
+from lsst.pex.harness.LazyImport import lazyImport
+dafPersist = lazyImport("lsst.daf.persistence")
+
 class OutputStageSerial(harnessStage.SerialProcessing):
     """A Stage that persists data."""
 
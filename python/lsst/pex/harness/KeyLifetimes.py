@@ -0,0 +1,89 @@
+#! /usr/bin/env python
+
+#
+# LSST Data Management System
+# Copyright 2008, 2009, 2010 LSST Corporation.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsst.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+#
+
+
+"""
+KeyLifetimes works out when the Clipboard entries of a visit can be
+released.  A stage may declare the Clipboard keys it reads and writes in
+its "appStage" policy:
+
+   consumedKeys: "calexp" "psf"
+   producedKeys: "sources"
+
+A declared key is released once the last stage that declares it has 
+finished with the visit.  A stage that declares nothing may use any key, so
+no declared key is released before it.  Keys that no stage declares are 
+kept until the visit's final Clipboard is closed, as before.
+
+The keys are removed when the next stage takes the Clipboard, so that they
+never disappear while another stage may be reading it.
+"""
+
+def getDeclaredKeys(stageDefPolicy):
+    """
+    return the set of keys declared (consumed or produced) by the given
+    "appStage" policy, or None if it declares neither
+    """
+    declared = None
+    for name in ("consumedKeys", "producedKeys"):
+        if stageDefPolicy.exists(name):
+            if declared is None:
+                declared = set()
+            declared.update([key.strip() for key in stageDefPolicy.getStringArray(name)])
+    return declared
+
+def makeReleasePlan(executePolicy):
+    """
+    return the release plan (see planReleases()) for the pipeline described
+    by the given "execute" policy
+    """
+    return planReleases([getDeclaredKeys(p) for p in executePolicy.getArray("appStage")])
+
+def planReleases(declarations):
+    """
+    return, for each stage, the sorted list of keys whose last use is that
+    stage.  The list for the final stage is always empty: its Clipboard is 
+    closed at the end of the visit.
+    @param declarations   for each stage, the set of keys it declares, or
+                            None if it declares none
+    """
+    nStages = len(declarations)
+
+    lastUse = {}
+    for i, declared in enumerate(declarations):
+        if declared is None:
+            # an undeclared stage keeps every key seen so far alive
+            for key in lastUse:
+                lastUse[key] = i
+        else:
+            for key in declared:
+                lastUse[key] = i
+
+    plan = [[] for i in range(nStages)]
+    for key, i in lastUse.items():
+        if i < nStages - 1:
+            plan[i].append(key)
+    for keys in plan:
+        keys.sort()
+    return plan
@@ -0,0 +1,80 @@
+#! /usr/bin/env python
+
+#
+# LSST Data Management System
+# Copyright 2008, 2009, 2010 LSST Corporation.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsst.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+#
+
+
+"""
+lazyImport() stands in for a module that is costly to import, such as the
+event system or persistence, in a module that needs it only on some code
+paths.  The module is imported the first time one of its attributes is
+used, so that importing the harness for a unit test or SimpleStageTester
+does not load the whole stack.
+"""
+
+import sys
+
+class LazyModule(object):
+    '''A module that is imported on first use'''
+
+    def __init__(self, name):
+        """
+        create a stand-in for the module
+        @param name    the fully qualified name of the module
+        """
+        self.__dict__["_name"] = name
+        self.__dict__["_module"] = None
+
+    def getModule(self):
+        """
+        import the module if this has not been done yet and return it
+        """
+        module = self.__dict__["_module"]
+        if module is None:
+            __import__(self._name)
+            module = sys.modules[self._name]
+            self.__dict__["_module"] = module
+        return module
+
+    def isLoaded(self):
+        """
+        return True if the module has been imported
+        """
+        return self.__dict__["_module"] is not None or \
+               self._name in sys.modules
+
+    def __getattr__(self, attr):
+        return getattr(self.getModule(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self.getModule(), attr, value)
+
+    def __repr__(self):
+        return "<lazily imported module '%s'>" % self._name
+
+def lazyImport(name):
+    """
+    return a stand-in for the named module, which is imported the first 
+    time one of its attributes is used
+    @param name    the fully qualified name of the module
+    """
+    return LazyModule(name)
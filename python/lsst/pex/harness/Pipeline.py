@@ -27,12 +27,29 @@ from lsst.pex.harness.Queue import Queue
 from lsst.pex.harness.stage import StageProcessing
 from lsst.pex.harness.stage import NoOpSerialProcessing
 from lsst.pex.harness.Clipboard import Clipboard
+from lsst.pex.harness.ClipboardMemory import ClipboardMemory
+from lsst.pex.harness.ClipboardPool import ClipboardPool
+from lsst.pex.harness.ClipboardTrace import ClipboardTracer, TracingClipboard
+from lsst.pex.harness.KeyLifetimes import makeReleasePlan
+from lsst.pex.harness.StageCache import makeCachePlan, makeStageCache
 from lsst.pex.harness.Directories import Directories
+from lsst.pex.harness.PipelineConfig import PipelineConfig
+from lsst.pex.harness.Barrier import Barrier, ProcessBarrier
+from lsst.pex.harness.SyncPlan import SyncPlan, makeSyncPlan
+from lsst.pex.harness.StageFusion import makeFusionPlan, getFusedStages
+from lsst.pex.harness.SyncPlan import isSerialActive, isDynamicDispatch
+from lsst.pex.harness.WorkQueue import WorkQueue, ProcessWorkQueue
+from lsst.pex.harness.WorkQueue import WORK_ITEMS_KEY, WORK_RESULTS_KEY
+from lsst.pex.harness.Exchange import Exchange, ProcessExchange
+from lsst.pex.harness.Exchange import RING, CLOCKWISE
 from lsst.pex.logging import Log, LogRec, cout, Prop
 from lsst.pex.logging import BlockTimingLog
 from lsst.pex.harness import harnessLib as logutils
 
 from lsst.pex.harness.SliceThread import SliceThread
+from lsst.pex.harness.SliceProcess import SliceProcess
+from lsst.pex.harness.SliceServer import SliceServer
+from lsst.pex.harness.EventWaiter import EventWaiter, EventFanOut
 from lsst.pex.harness.ShutdownThread import ShutdownThread
 
 import threading 
@@ -43,15 +60,13 @@ from threading import Event as PyEvent
 import lsst.pex.policy as policy
 
 import lsst.pex.exceptions
-from lsst.pex.exceptions import *
 
 import lsst.daf.base as dafBase
-from lsst.daf.base import *
-import lsst.daf.persistence as dafPersist
-from lsst.daf.persistence import *
 
-
-import lsst.ctrl.events as events
+# the event system and persistence are imported on first use
+from lsst.pex.harness.LazyImport import lazyImport
+dafPersist = lazyImport("lsst.daf.persistence")
+events = lazyImport("lsst.ctrl.events")
 
 import os, sys, re, traceback, time
 
@@ -91,6 +106,29 @@ class Pipeline(object):
         self.shareDataList = []
         self.clipboardList = []
         self.executionMode = 0
+        self.executionBackend = "thread"
+        self.pipelineConfig = None
+        self.sliceServerAddress = "localhost:0"
+        self.sliceConnectTimeout = None
+        self.sliceServer = None
+        self.eventReceiveTimeout = 100
+        self.visitDepth = 1
+        self.clipboardMemoryBudget = None
+        self.clipboardPool = ClipboardPool(self.createClipboard)
+        self.clipboardTracer = None
+        self.releaseList = []
+        self.cacheList = []
+        self.stageCache = None
+        self.scratchDir = None
+        self.statelessList = []
+        self.fusionPlan = []
+        self.stageBarrierList = []
+        self.dynamicList = []
+        self.workQueueList = []
+        self.exchangeList = []
+        self.eventFanOutList = []
+        self.topology = RING
+        self.topologyDirection = CLOCKWISE
         self._runId = runId
         self.pipelinePolicyName = pipelinePolicyName
         if workerId is not None:
@@ -101,14 +139,56 @@ class Pipeline(object):
         self.cppLogUtils = logutils.LogUtils()
         self._stop = PyEvent()
 
+        # per-thread visit state; in overlapped mode each Stage runs in its
+        # own thread and works on its own visit
+        self._visitState = threading.local()
+        self._visitCond = None
+        self._failStageLock = threading.Lock()
+
     def setStop (self):
         self._stop.set()
+        if self._visitCond is not None:
+            with self._visitCond:
+                self._visitCond.notify_all()
+
+    def _getErrorFlagged(self):
+        return getattr(self._visitState, "errorFlagged", 0)
+
+    def _setErrorFlagged(self, flag):
+        self._visitState.errorFlagged = flag
+
+    errorFlagged = property(_getErrorFlagged, _setErrorFlagged)
+
+    def flagError(self):
+        """
+        Flag an error on the visit being executed.  In overlapped mode the
+        visit is marked failed at once, before its Clipboard is passed on
+        to the thread of the next stage.
+        """
+        self.errorFlagged = 1
+        visit = getattr(self._visitState, "visit", None)
+        if visit is not None:
+            with self._visitCond:
+                self._failedVisits.add(visit)
+
+    def _getInterQueue(self):
+        return getattr(self._visitState, "interQueue", None)
+
+    def _setInterQueue(self, queue):
+        self._visitState.interQueue = queue
+
+    interQueue = property(_getInterQueue, _setInterQueue)
 
     def exit (self):
 
         if self.log is not None:
             self.log.log(self.VERB1, 'Killing Pipeline process immediately: shutdown level 1')
 
+        # Slice processes would otherwise outlive the killed Pipeline
+        if self.executionBackend in ("process", "socket"):
+            for slice in self.sliceThreadList:
+                slice.stop()
+
         thisPid = os.getpid()
         os.popen("kill -9 "+str(thisPid))
  
@@ -171,10 +251,16 @@ class Pipeline(object):
             self.nSlices = 0   # default value
         self.universeSize = self.nSlices + 1; 
 
-        if (self.executePolicy.exists('barrierDelay')):
-            self.barrierDelay = self.executePolicy.getDouble('barrierDelay')
-        else:
-            self.barrierDelay = 0.000001   # default value
+        # Check for executionBackend: run Slices as threads, OS processes, 
+        # or in SliceAgents connecting over a socket
+        if (self.executePolicy.exists('executionBackend')):
+            self.executionBackend = self.executePolicy.getString('executionBackend')
+        if self.executionBackend not in ("thread", "process", "socket"):
+            raise RuntimeError("Unsupported executionBackend: %s" % self.executionBackend)
+        if (self.executePolicy.exists('sliceServer')):
+            self.sliceServerAddress = self.executePolicy.getString('sliceServer')
+        if (self.executePolicy.exists('sliceConnectTimeout')):
+            self.sliceConnectTimeout = self.executePolicy.getDouble('sliceConnectTimeout')
 
         # do some juggling to capture the actual stage policy names.  We'll
         # use these to assign some logical names to the stages for logging
@@ -191,7 +277,7 @@ class Pipeline(object):
 
 
         # Obtain the working directory space locators
-        psLookup = lsst.daf.base.PropertySet()
+        psLookup = dafBase.PropertySet()
         if (self.executePolicy.exists('dir')):
             dirPolicy = self.executePolicy.get('dir')
             shortName = None
@@ -201,6 +287,7 @@ class Pipeline(object):
                 shortName = self.pipelinePolicyName.split('.')[0]
             dirs = Directories(dirPolicy, shortName, self._runId)
             psLookup = dirs.getDirs()
+            self.scratchDir = psLookup.get("scratch")
         if (self.executePolicy.exists('database.url')):
             psLookup.set('dbUrl', self.executePolicy.get('database.url'))
 
@@ -221,7 +308,7 @@ class Pipeline(object):
         dafPersist.LogicalLocation.setLocationMap(psLookup)
 
         log.log(self.VERB2, "eventBrokerHost %s " % self.eventBrokerHost)
-        log.log(self.VERB2, "barrierDelay %s " % self.barrierDelay)
+        log.log(self.VERB2, "executionBackend %s " % self.executionBackend)
 
         # Check for eventTimeout
         if (self.executePolicy.exists('eventTimeout')):
@@ -229,6 +316,23 @@ class Pipeline(object):
         else:
             self.eventTimeout = 10000000   # default value is 10 000 000
 
+        # Check for eventReceiveTimeout: the longest a single blocking 
+        # receive may last (milliseconds) before a stop request is noticed
+        if (self.executePolicy.exists('eventReceiveTimeout')):
+            self.eventReceiveTimeout = self.executePolicy.getInt('eventReceiveTimeout')
+
+        # Check for clipboardMemoryBudget (MB): account for the memory held 
+        # by Clipboard entries and spill them to the scratch directory 
+        # beyond the budget; 0 to account only
+        if (self.executePolicy.exists('clipboardMemoryBudget')):
+            self.clipboardMemoryBudget = self.executePolicy.getInt('clipboardMemoryBudget')
+
+        # Check for clipboardTrace: the path prefix of the Clipboard access 
+        # records and dataflow graph
+        if (self.executePolicy.exists('clipboardTrace')):
+            self.clipboardTracer = ClipboardTracer( \
+                self.executePolicy.getString('clipboardTrace') + "-pipeline", -1, self.stageNames)
+
         # Process Application Stages
         fullStageList = self.executePolicy.getArray("appStage")
         self.nStages = len(fullStageList)
@@ -322,6 +426,16 @@ class Pipeline(object):
                 shareDataStage = item.getBool('shareData')
             self.shareDataList.append(shareDataStage)
 
+        # shareDataOn: false turns off inter-Slice communication globally
+        if (self.executePolicy.exists('shareDataOn') and not self.executePolicy.getBool('shareDataOn')):
+            self.shareDataList = [False] * len(self.shareDataList)
+
+        # Check for the topology of the inter-Slice communication
+        if (self.executePolicy.exists('topology.type')):
+            self.topology = self.executePolicy.getString('topology.type')
+        if (self.executePolicy.exists('topology.param1')):
+            self.topologyDirection = self.executePolicy.getString('topology.param1')
+
         log.log(self.VERB3, "Loading in %d trigger topics" % \
                 len(filter(lambda x: x != "None", self.eventTopicList)))
 
@@ -349,6 +463,45 @@ class Pipeline(object):
         if (self.executePolicy.exists('executionMode') and (self.executePolicy.getString('executionMode') == "oneloop")):
             self.executionMode = 1 
 
+        # Check for visitDepth: the number of visits that may be in flight
+        if (self.executePolicy.exists('visitDepth')):
+            self.visitDepth = self.executePolicy.getInt('visitDepth')
+        self.statelessList = []
+        for item in fullStageList:
+            statelessStage = False
+            if (item.exists('stateless')):
+                statelessStage = item.getBool('stateless')
+            self.statelessList.append(statelessStage)
+        log.log(self.VERB2, "visitDepth %d " % self.visitDepth)
+
+        # Check for stages that dispatch their parallel work dynamically
+        self.dynamicList = []
+        for item in fullStageList:
+            dynamicStage = isDynamicDispatch(item)
+            if dynamicStage and (self.nSlices < 1 or not isSerialActive(item)):
+                raise RuntimeError("Stage %s: dynamic dispatch requires Slices and a serialClass" % \
+                                   item.getString("name"))
+            self.dynamicList.append(dynamicStage)
+
+        # Determine which runs of parallel-only stages are fused
+        self.fusionPlan = makeFusionPlan(self.executePolicy)
+        log.log(self.VERB2, "Fusing %d stages into the stage before them" % \
+                len([i for i in range(self.nStages) if self.fusionPlan[i] != i+1]))
+
+        # Determine which synchronization points each stage needs
+        self.syncPlan = makeSyncPlan(self.executePolicy, self.fusionPlan)
+        log.log(self.VERB2, "Sync plan: %d of %d barriers per visit" % \
+                (self.syncPlan.getBarrierCount(), 4*self.nStages))
+
+        # Determine after which stage each declared Clipboard key is released
+        self.releaseList = makeReleasePlan(self.executePolicy)
+        log.log(self.VERB2, "Releasing %d declared Clipboard keys early" % \
+                sum([len(keys) for keys in self.releaseList]))
+
+        # Check for stages whose results are cached across runs
+        self.cacheList = makeCachePlan(self.executePolicy)
+        self.stageCache = makeStageCache(self.executePolicy, self.cacheList)
+
         # Check for shutdownTopic 
         if (self.executePolicy.exists('shutdownTopic')):
             self.shutdownTopic = self.executePolicy.getString('shutdownTopic')
@@ -416,28 +569,78 @@ class Pipeline(object):
 
         log.log(self.VERB3, "Number of slices " + str(self.nSlices));
 
-        self.loopEventList = []
-        for i in range(self.nSlices):
-           loopEventA = PyEvent()
-           self.loopEventList.append(loopEventA)
-           loopEventB = PyEvent()
-           self.loopEventList.append(loopEventB)
+        # a single barrier shared by the Pipeline and all of its Slices
+        if self.executionBackend == "process":
+            BarrierClass = ProcessBarrier
+            SliceClass = SliceProcess
+            WorkQueueClass = ProcessWorkQueue
+            ExchangeClass = ProcessExchange
+        else:
+            BarrierClass = Barrier
+            SliceClass = SliceThread
+            WorkQueueClass = WorkQueue
+            ExchangeClass = Exchange
+        self.barrier = BarrierClass(self.nSlices+1)
+
+        # with overlapped visits each stage synchronizes on its own barrier
+        self.stageBarrierList = []
+        if self.visitDepth > 1:
+            for iStage in range(1, self.nStages+1):
+                self.stageBarrierList.append(BarrierClass(self.nSlices+1))
+
+        # work queues of the dynamically dispatched stages
+        self.workQueueList = []
+        for dynamicStage in self.dynamicList:
+            if dynamicStage:
+                self.workQueueList.append(WorkQueueClass(self.nSlices))
+            else:
+                self.workQueueList.append(None)
+
+        # inter-Slice exchanges of the shareData stages
+        self.exchangeList = []
+        for shareDataStage in self.shareDataList:
+            if shareDataStage and self.nSlices > 0:
+                self.exchangeList.append(ExchangeClass(self.nSlices, \
+                    self.topology, self.topologyDirection))
+            else:
+                self.exchangeList.append(None)
+
+        # triggering events go straight to in-process Slices; the other 
+        # Slices receive them from the broker on "<topic>_<pipeline name>"
+        self.eventFanOutList = []
+        eventsSystem = events.EventSystem.getDefaultEventSystem()
+        for topic in self.eventTopicList:
+            if topic.strip() == "None":
+                self.eventFanOutList.append(None)
+            elif self.executionBackend == "thread":
+                self.eventFanOutList.append(EventFanOut(self.nSlices))
+            else:
+                self.eventFanOutList.append(None)
+                sliceTopic = "%s_%s" % (topic.strip(), self._pipelineName)
+                eventsSystem.createTransmitter(self.eventBrokerHost, sliceTopic)
 
         self.sliceThreadList = []
 
-        for i in range(self.nSlices):
-            k = 2*i
-            loopEventA = self.loopEventList[k]
-            loopEventB = self.loopEventList[k+1]
-            oneSliceThread = SliceThread(i, self._pipelineName, self.pipelinePolicyName, \
-               self._runId, self.logthresh, self.universeSize, loopEventA, loopEventB, self._logdir, self.workerId)
+        if self.executionBackend == "socket":
+            self.sliceThreadList = self.acceptSliceAgents(log)
+
+        # the policy and stage classes are resolved once for all of the 
+        # in-process and forked Slices
+        if len(self.sliceThreadList) < self.nSlices:
+            self.pipelineConfig = PipelineConfig(self.executePolicy)
+
+        for i in range(len(self.sliceThreadList), self.nSlices):
+            oneSliceThread = SliceClass(i, self._pipelineName, self.pipelinePolicyName, \
+               self._runId, self.logthresh, self.universeSize, self.barrier, self._logdir, self.workerId, \
+               self.stageBarrierList, self.workQueueList, self.exchangeList, self.eventFanOutList, \
+               self.pipelineConfig)
             self.sliceThreadList.append(oneSliceThread)
 
         for slicei in self.sliceThreadList:
             log.log(self.VERB3, "Starting slice");
-            slicei.setDaemon(True) 
+            slicei.daemon = True
             slicei.start()
-            if slicei.isAlive():
+            if slicei.is_alive():
                 log.log(self.VERB3, "slicei is Alive");
             else:
                 log.log(self.VERB3, "slicei is not Alive");
@@ -445,11 +648,65 @@ class Pipeline(object):
         log.done()
 
 
+    def acceptSliceAgents(self, log):
+        """
+        Wait for a SliceAgent to connect for every Slice (socket backend) and
+        return the RemoteSlices standing in for them.  Each RemoteSlice uses
+        the Pipeline's barriers, work queues and exchanges on behalf of its
+        agent.
+        """
+        self.sliceServer = SliceServer(self.sliceServerAddress)
+        log.log(Log.INFO, "Waiting for %d Slice agents at %s" % \
+                (self.nSlices, self.sliceServer.getAddress()))
+
+        targets = {("barrier", 0): self.barrier}
+        for kind, objects in (("stageBarrier", self.stageBarrierList),
+                              ("workQueue", self.workQueueList),
+                              ("exchange", self.exchangeList)):
+            for i in range(len(objects)):
+                if objects[i] is not None:
+                    targets[(kind, i)] = objects[i]
+
+        sliceConfig = {"name": self._pipelineName,
+                       "pipelinePolicyName": self.pipelinePolicyName,
+                       "runId": self._runId,
+                       "logthresh": self.logthresh,
+                       "universeSize": self.universeSize,
+                       "logdir": self._logdir,
+                       "workerId": self.workerId,
+                       "nStages": self.nStages}
+
+        remoteSlices = self.sliceServer.accept(self.nSlices, sliceConfig, targets, \
+                                               self.sliceConnectTimeout)
+        for remoteSlice in remoteSlices:
+            log.log(self.VERB2, "Slice %d: agent pid %s on %s" % \
+                    (remoteSlice.rank, remoteSlice.pid, remoteSlice.host))
+        return remoteSlices
+
+    def newClipboard(self):
+        """
+        Return an empty Clipboard from the Clipboard pool
+        """
+        return self.clipboardPool.acquire()
+
+    def createClipboard(self):
+        """
+        Create a Clipboard, with a ClipboardMemory if a 
+        clipboardMemoryBudget is configured, and tracing its accesses if
+        clipboardTrace is
+        """
+        memory = None
+        if self.clipboardMemoryBudget is not None:
+            memory = ClipboardMemory(self.clipboardMemoryBudget << 20, self.scratchDir)
+        if self.clipboardTracer is not None:
+            return TracingClipboard(self.clipboardTracer, memory)
+        return Clipboard(memory)
+
     def startInitQueue(self):
         """
         Place an empty Clipboard in the first Queue
         """
-        clipboard = Clipboard()
+        clipboard = self.newClipboard()
 
         #print "Python Pipeline Clipboard check \n"
         #acount=0
@@ -465,6 +722,10 @@ class Pipeline(object):
         """
         Method to execute loop over Stages
         """
+        if self.visitDepth > 1:
+            self.startOverlappedLoop()
+            return
+
         startStagesLoopLog = self.log.timeBlock("startStagesLoop", self.TRACE)
         looplog = BlockTimingLog(self.log, "visit", self.TRACE)
         stagelog = BlockTimingLog(looplog, "stage", self.TRACE-1)
@@ -501,23 +762,27 @@ class Pipeline(object):
 
                     stage = self.stageList[iStage-1]
 
-                    self.handleEvents(iStage, stagelog)
+                    self.beginStage(visitcount, iStage, stagelog)
 
                     # synchronize before preprocess
-                    self.threadBarrier(iStage)
+                    self.syncPoint(iStage, SyncPlan.BEFORE_PREPROCESS)
 
                     self.tryPreProcess(iStage, stage, stagelog)
 
+                    nWorkItems = self.dispatchWorkItems(iStage, stagelog)
+
                     # synchronize after preprocess, before process
-                    self.threadBarrier(iStage)
+                    self.syncPoint(iStage, SyncPlan.AFTER_PREPROCESS)
 
                     # synchronize after process, before postprocess
-                    self.threadBarrier(iStage)
+                    self.syncPoint(iStage, SyncPlan.AFTER_PROCESS)
+
+                    self.collectWorkResults(iStage, nWorkItems, stagelog)
 
                     self.tryPostProcess(iStage, stage, stagelog)
 
                     # synchronize after postprocess
-                    self.threadBarrier(iStage)
+                    self.syncPoint(iStage, SyncPlan.AFTER_POSTPROCESS)
 
                     stagelog.done()
 
@@ -535,10 +800,11 @@ class Pipeline(object):
             looplog.log(Log.DEBUG, 'Retrieving finalClipboard for deletion')
             finalQueue = self.queueList[self.nStages]
             finalClipboard = finalQueue.getNextDataset()
+            self.reportFinalClipboard(finalClipboard, looplog)
             looplog.log(Log.DEBUG, "deleting final clipboard")
             looplog.done()
-            # delete entries on the clipboard
-            finalClipboard.close()
+            # clear the clipboard and return it to the pool
+            self.clipboardPool.release(finalClipboard)
             del finalClipboard
 
         startStagesLoopLog.log(Log.INFO, "Shutting down pipeline");
@@ -546,6 +812,205 @@ class Pipeline(object):
         startStagesLoopLog.done()
 
 
+    def startOverlappedLoop(self): 
+        """
+        Method to execute loop over Stages with up to visitDepth visits in 
+        flight.  Each Stage runs in its own thread, so that Stage k can work 
+        on visit N+1 while Stage k+1 is still working on visit N.  Stages not
+        declared stateless wait for the previous visit to leave the pipeline.
+        """
+        startStagesLoopLog = self.log.timeBlock("startStagesLoop", self.TRACE)
+        looplog = BlockTimingLog(self.log, "visit", self.TRACE)
+
+        maxVisits = None
+        if self.executionMode == 1:
+            maxVisits = 1
+
+        self._visitsDone = 0
+        self._failedVisits = set()
+        self._overlapExit = False
+        self._visitCond = threading.Condition()
+
+        self.threadBarrier(0)
+
+        stageThreads = []
+        for iStage in range(1, self.nStages+1):
+            if not getFusedStages(self.fusionPlan, iStage):
+                continue
+            stageThread = Thread(target=self.runStageThread, args=(iStage, maxVisits))
+            stageThread.daemon = True
+            stageThread.start()
+            stageThreads.append(stageThread)
+
+        visitcount = 0
+        with self._visitCond:
+            while not self._overlapExit and not self._stop.isSet():
+                if maxVisits is not None and visitcount >= maxVisits:
+                    break
+                if visitcount - self._visitsDone >= self.visitDepth:
+                    self._visitCond.wait()
+                    continue
+                visitcount += 1
+                looplog.log(self.VERB3, "Starting visit %d" % visitcount)
+                self.startInitQueue()    # place an empty clipboard in the first Queue
+
+            if self._stop.isSet():
+                self.checkExitBySyncPoint()
+                self.checkExitByStage()
+
+            # let the visits in flight drain
+            while not self._overlapExit and self._visitsDone < visitcount:
+                self._visitCond.wait()
+
+        if self._overlapExit:
+            startStagesLoopLog.log(Log.INFO, "Stage thread exited; exiting pipeline")
+            sys.exit()
+
+        self.checkExitByVisit()
+
+        if maxVisits is not None:
+            LogRec(looplog, Log.INFO)  << "terminating pipeline after one loop/visit "
+            for stageThread in stageThreads:
+                stageThread.join()
+
+        startStagesLoopLog.log(Log.INFO, "Shutting down pipeline");
+        self.shutdown()
+        startStagesLoopLog.done()
+
+    def runStageThread(self, iStage, maxVisits):
+        """
+        Execute a single Stage, and the Stages fused after it, over 
+        successive visits (overlapped mode)
+        """
+        stagelog = BlockTimingLog(self.log, "stage", self.TRACE-1)
+
+        fusedStages = getFusedStages(self.fusionPlan, iStage)
+        inputQueue = self.queueList[iStage-1]
+        stateless = self.statelessList[iStage-1]
+
+        try:
+            visit = 0
+            while maxVisits is None or visit < maxVisits:
+                visit += 1
+
+                # a stateful stage keeps to the order of the visits
+                if not stateless:
+                    with self._visitCond:
+                        while self._visitsDone < visit-1:
+                            self._visitCond.wait()
+                inputQueue.element(block=True)
+
+                stagelog.setPreamblePropertyInt("LOOPNUM", visit)
+
+                self._visitState.visit = visit
+                with self._visitCond:
+                    self.errorFlagged = int(visit in self._failedVisits)
+
+                for jStage in fusedStages:
+                    stage = self.stageList[jStage-1]
+                    stagelog.setPreamblePropertyInt("STAGEID", jStage)
+                    stagelog.start(self.stageNames[jStage-1] + " loop")
+
+                    self.beginStage(visit, jStage, stagelog)
+
+                    self.syncPoint(jStage, SyncPlan.BEFORE_PREPROCESS)
+                    self.tryPreProcess(jStage, stage, stagelog)
+                    nWorkItems = self.dispatchWorkItems(jStage, stagelog)
+                    self.syncPoint(jStage, SyncPlan.AFTER_PREPROCESS)
+                    self.syncPoint(jStage, SyncPlan.AFTER_PROCESS)
+                    self.collectWorkResults(jStage, nWorkItems, stagelog)
+                    self.tryPostProcess(jStage, stage, stagelog)
+                    self.syncPoint(jStage, SyncPlan.AFTER_POSTPROCESS)
+
+                    stagelog.done()
+
+                if fusedStages[-1] == self.nStages:
+                    self.finishVisit(visit)
+
+                self.checkExitByStage()
+        except SystemExit:
+            stagelog.log(self.VERB2, "Stage thread %d exiting" % iStage)
+        except:
+            trace = "".join(traceback.format_exception(
+                    sys.exc_info()[0], sys.exc_info()[1], sys.exc_info()[2]))
+            stagelog.log(Log.FATAL, trace)
+        else:
+            return
+
+        # wake the main thread so that the pipeline shuts down
+        with self._visitCond:
+            self._overlapExit = True
+            self._visitCond.notify_all()
+
+    def beginStage(self, visit, iStage, stagelog):
+        """
+        Prepare the visit's Clipboard for a stage: release the entries that
+        are no longer needed and add the payload of the stage's triggering
+        event.  The payload is traced as written by the harness; the 
+        Clipboard accesses that follow are attributed to the stage.
+        """
+        self.releaseKeys(iStage, stagelog)
+        self.traceStage(visit, None)
+        self.handleEvents(iStage, stagelog)
+        self.traceStage(visit, iStage)
+
+    def traceStage(self, visit, iStage):
+        """
+        Attribute the Clipboard accesses that follow to the given visit and
+        stage, if Clipboard tracing is on
+        """
+        if self.clipboardTracer is not None:
+            self.clipboardTracer.setContext(visit, iStage)
+
+    def releaseKeys(self, iStage, stagelog):
+        """
+        Remove from the Clipboard entering a stage the declared entries 
+        whose last use was the previous stage
+        """
+        if iStage < 2 or not self.releaseList[iStage-2]:
+            return
+        clipboard = self.queueList[iStage-1].element()
+        released = 0
+        for key in self.releaseList[iStage-2]:
+            if clipboard.contains(key):
+                clipboard.remove(key)
+                released += 1
+        stagelog.log(self.VERB3, "Released %d Clipboard entries" % released)
+
+    def reportFinalClipboard(self, clipboard, log):
+        """
+        Report the lazy entries of a visit's final Clipboard that no Stage 
+        retrieved, so that the Stages putting them can be reconsidered, and
+        the memory held by its entries if it was accounted for
+        """
+        unforced = clipboard.getUnforcedKeys()
+        if unforced:
+            log.log(self.VERB3, "Lazy Clipboard entries never used: %s" % \
+                    ", ".join(sorted(unforced)))
+
+        memory = clipboard.getMemory()
+        if memory is not None:
+            stats = memory.getStats()
+            sizes = sorted(memory.getSizes().items(), key=lambda item: -item[1])
+            log.log(Log.INFO, "clipboard mem: highWaterMark=%d spilled=%d reloaded=%d largest: %s" % \
+                    (stats["highWaterMark"], stats["spilled"], stats["reloaded"],
+                     " ".join(["%s=%d" % item for item in sizes[:5]])))
+
+    def finishVisit(self, visit):
+        """
+        Delete the final Clipboard of a visit and release its slot (overlapped mode)
+        """
+        finalQueue = self.queueList[self.nStages]
+        finalClipboard = finalQueue.getNextDataset()
+        self.reportFinalClipboard(finalClipboard, self.log)
+        self.clipboardPool.release(finalClipboard)
+        del finalClipboard
+
+        with self._visitCond:
+            self._visitsDone += 1
+            self._failedVisits.discard(visit)
+            self._visitCond.notify_all()
+
     def getSliceThreadList(self):
         return self.sliceThreadList
 
@@ -576,56 +1041,35 @@ class Pipeline(object):
             log.log(Log.INFO, "Exit here at the end of the Visit")
             sys.exit()
 
+    def syncPoint(self, iStage, point):
+        """
+        Enter the barrier for the given synchronization point of a stage 
+        unless the sync plan shows that it protects nothing 
+        """
+        if self.syncPlan.needsBarrier(iStage, point):
+            self.threadBarrier(iStage)
+
     def threadBarrier(self, iStage): 
         """
-        Create an approximate barrier where all Slices intercommunicate with the Pipeline 
+        Create a barrier where all Slices intercommunicate with the Pipeline 
         """
 
         log = Log(self.log, "threadBarrier")
 
         self.checkExitBySyncPoint()
 
-        # if((self._stop.isSet()) and (self.exitLevel == 2)):
-
-        #     log.log(Log.INFO, "Pipeline stop is set at exitLevel of 2; exit here at a synchronization point")
-        #     print "Pipeline stop is set at exitLevel of 2; exit here at a synchronization point" 
-            # os._exit() 
-        #    sys.exit()
-        #    log.log(Log.INFO, "Pipeline Ever reach here ?? ")
-
         entryTime = time.time()
         log.log(Log.DEBUG, "Entry time %f" % (entryTime)) 
-        
-
-        for i in range(self.nSlices):
-            k = 2*i
-            loopEventA = self.loopEventList[k]
-            loopEventB = self.loopEventList[k+1]
-
-            signalTime1 = time.time()
-            log.log(Log.DEBUG, "Signal to Slice  %d %f" % (i, signalTime1)) 
-
-            loopEventA.set()
 
-            log.log(Log.DEBUG, "Wait for signal from Slice %d" % (i)) 
+        # Block until every Slice has arrived; all parties are released at once
+        barrier = self.barrier
+        if iStage > 0 and self.stageBarrierList:
+            barrier = self.stageBarrierList[iStage-1]
+        arrivals = barrier.wait(-1)
 
-            # Wait for the B event to be set by the Slice
-            # Excute time sleep in between checks to free the GIL periodically 
-            useDelay = self.barrierDelay
-
-            if(iStage == 1): 
-                useDelay = 0.1
-            if(iStage == 290): 
-                useDelay = 0.1
-
-            while( not (loopEventB.isSet())):
-                 time.sleep(useDelay)
-
-            signalTime2 = time.time()
-            log.log(Log.DEBUG, "Done waiting for signal from Slice %d %f" % (i, signalTime2)) 
-
-            if(loopEventB.isSet()):
-                loopEventB.clear()
+        lastRank, lastTime = arrivals[-1]
+        log.log(Log.DEBUG, "Stage %d sync: last arrival rank %d at %f (%f after first)" % \
+                (iStage, lastRank, lastTime, lastTime - arrivals[0][1]))
 
         self.checkExitBySyncPoint()
 
@@ -637,6 +1081,14 @@ class Pipeline(object):
 
         self.log.log(self.VERB2, 'Pipeline forceShutdown : Stopping Slices ')
 
+        # release any Slice blocked at a synchronization point
+        self.barrier.abort()
+        for barrier in self.stageBarrierList:
+            barrier.abort()
+        for exchange in self.exchangeList:
+            if exchange is not None:
+                exchange.abort()
+
         for i in range(self.nSlices):
             slice = self.sliceThreadList[i]
             slice.stop()
@@ -659,6 +1111,14 @@ class Pipeline(object):
         Shutdown the Pipeline execution: delete the MPI environment
         Send the Exit Event if required
         """
+        self.log.log(self.VERB2, "Clipboard pool: %(hits)d hits %(misses)d misses %(dropped)d dropped" % \
+                     self.clipboardPool.getStats())
+        if self.stageCache is not None:
+            self.log.log(self.VERB2, "Stage cache: %(hits)d hits %(misses)d misses %(evicted)d evicted" % \
+                         self.stageCache.getStats())
+        if self.clipboardTracer is not None:
+            self.clipboardTracer.close()
+
         if self.exitTopic == None:
             pass
         else:
@@ -673,6 +1133,17 @@ class Pipeline(object):
             slice.join()
             self.log.log(self.VERB2, 'Slice ' + str(i) + ' ended.')
 
+        for exchange in self.exchangeList:
+            if exchange is not None:
+                exchange.close()
+
+        for workQueue in self.workQueueList:
+            if workQueue is not None:
+                workQueue.close()
+
+        if self.sliceServer is not None:
+            self.sliceServer.close()
+
         # Also have to tell the shutdown Thread to stop  
         self.oneShutdownThread.setStop()
         self.oneShutdownThread.join()
@@ -683,14 +1154,13 @@ class Pipeline(object):
 
     def invokeSyncSlices(self, iStage, stagelog):
         """
-        THIS GOES AWAY in non MPI harness 
-        If needed, calls the C++ Pipeline invokeSyncSlices
+        The Pipeline takes no part in the inter-Slice communication of a 
+        shareData Stage: the Slices exchange their shared Clipboard entries
+        among themselves (see Exchange).  Only logged here. 
         """
         invlog = stagelog.timeBlock("invokeSyncSlices", self.TRACE-1)
         if(self.shareDataList[iStage-1]):
-            invlog.log(self.VERB3, "Calling invokeSyncSlices")
-            # self.cppPipeline.invokeSyncSlices()  
-            # invokeSyncSlices 
+            invlog.log(self.VERB3, "Slices exchange shared data among themselves")
         invlog.done()
 
     def tryPreProcess(self, iStage, stage, stagelog):
@@ -698,6 +1168,7 @@ class Pipeline(object):
         Executes the try/except construct for Stage preprocess() call 
         """
         prelog = stagelog.timeBlock("tryPreProcess", self.TRACE-2);
+        inputClipboard = self.queueList[iStage-1].element()
 
         # Important try - except construct around stage preprocess() 
         try:
@@ -705,7 +1176,7 @@ class Pipeline(object):
             # otherwise, simply pass along the Clipboard 
             if (self.errorFlagged == 0):
                 processlog = stagelog.timeBlock("preprocess", self.TRACE)
-                self.interQueue = stage.applyPreprocess()
+                self.interQueue = self.applyPreprocess(iStage, stage, processlog)
                 processlog.done()
             else:
                 prelog.log(self.TRACE, "Skipping process due to error")
@@ -718,7 +1189,7 @@ class Pipeline(object):
 
             # Flag that an exception occurred to guide the framework to skip processing
             prelog.log(self.VERB2, "Flagging error in tryPreProcess, tryPostProcess to be skipped")
-            self.errorFlagged = 1
+            self.flagError()
 
             if(self.failureStageName != None): 
                 if(self.failSerialName != "lsst.pex.harness.stage.NoOpSerialProcessing"):
@@ -739,19 +1210,90 @@ class Pipeline(object):
                     clipboard.put("failureMessage", str(sys.exc_info()[1])) 
                     clipboard.put("failureTraceback", trace) 
 
-                    self.failStageObject.initialize(outputQueue, inputQueue)
+                    with self._failStageLock:
+                        self.failStageObject.initialize(outputQueue, inputQueue)
 
-                    self.interQueue = self.failStageObject.applyPreprocess()
+                        self.interQueue = self.failStageObject.applyPreprocess()
 
                 else:
                     prelog.log(self.VERB2, "No SerialProcessing to do for failure stage")
 
             # Post the cliphoard that the Stage failed to transfer to the output queue
+            self.dropClipboard(iStage, inputClipboard)
             self.postOutputClipboard(iStage)
 
         prelog.done()
         # Done try - except around stage preprocess 
 
+    def applyPreprocess(self, iStage, stage, log):
+        """
+        Apply the Stage's preprocess(), or, for a Stage whose results are 
+        cached, put the results of an identical earlier run on the Clipboard
+        instead.  Returns the queue to be passed on to postprocess().
+        """
+        cachedKeys = None
+        if self.cacheList:
+            cachedKeys = self.cacheList[iStage-1]
+        if cachedKeys is None:
+            return stage.applyPreprocess()
+
+        consumedKeys, producedKeys = cachedKeys
+        inputQueue = self.queueList[iStage-1]
+        key = self.stageCache.makeKey("preprocess", stage, inputQueue.element(), consumedKeys)
+        results = self.stageCache.get(key)
+        if results is not None:
+            log.log(self.VERB3, "Reusing %d cached preprocess results" % len(results))
+            interQueue = Queue()
+            clipboard = inputQueue.getNextDataset()
+            self.stageCache.restore(clipboard, results)
+            interQueue.addDataset(clipboard)
+            return interQueue
+
+        interQueue = stage.applyPreprocess()
+        self.stageCache.put(key, interQueue.element(), producedKeys)
+        return interQueue
+
+    def dispatchWorkItems(self, iStage, stagelog):
+        """
+        For a dynamically dispatched Stage, post the work items left by 
+        preprocess() under the "workItems" key onto the Stage's WorkQueue, 
+        followed by one end-of-visit marker per Slice.  The markers are 
+        posted even if no items are, so that the Slices never block.  Returns
+        the number of items posted, or None if preprocess() did not succeed.
+        """
+        workQueue = None
+        if self.workQueueList:
+            workQueue = self.workQueueList[iStage-1]
+        if workQueue is None:
+            return None
+
+        displog = stagelog.timeBlock("dispatchWorkItems", self.TRACE-2)
+        items = []
+        nItems = None
+        if self.errorFlagged == 0:
+            clipboard = self.interQueue.element()
+            items = clipboard.get(WORK_ITEMS_KEY, [])
+            nItems = len(items)
+        workQueue.submit(items)
+        displog.log(self.VERB3, "Dispatched %d work items" % len(items))
+        displog.done()
+        return nItems
+
+    def collectWorkResults(self, iStage, nItems, stagelog):
+        """
+        Wait for the processed work items of a dynamically dispatched Stage
+        and place them, in the order they were dispatched, on the visit's 
+        Clipboard under the "workResults" key for postprocess()
+        """
+        if nItems is None:
+            return
+
+        colllog = stagelog.timeBlock("collectWorkResults", self.TRACE-2)
+        results = self.workQueueList[iStage-1].collect(nItems)
+        clipboard = self.interQueue.element()
+        clipboard.put(WORK_RESULTS_KEY, results)
+        colllog.done()
+
     def tryPostProcess(self, iStage, stage, stagelog):
         """
         Executes the try/except construct for Stage postprocess() call 
@@ -767,8 +1309,9 @@ class Pipeline(object):
                 stage.applyPostprocess(self.interQueue)
                 processlog.done()
             else:
+                # tryPreProcess has already passed the Clipboard on; in 
+                # overlapped mode the input queue may hold the next visit's
                 postlog.log(self.TRACE, "Skipping applyPostprocess due to flagged error")
-                self.transferClipboard(iStage)
 
         except:
             trace = "".join(traceback.format_exception(
@@ -776,7 +1319,7 @@ class Pipeline(object):
             postlog.log(Log.FATAL, trace)
 
             # Flag that an exception occurred to guide the framework to skip processing
-            self.errorFlagged = 1
+            self.flagError()
 
             if(self.failureStageName != None):
                 if(self.failSerialName != "lsst.pex.harness.stage.NoOpSerialProcessing"):
@@ -790,9 +1333,10 @@ class Pipeline(object):
                     inputQueue  = self.queueList[iStage-1]
                     outputQueue = self.queueList[iStage]
 
-                    self.failStageObject.initialize(outputQueue, inputQueue)
+                    with self._failStageLock:
+                        self.failStageObject.initialize(outputQueue, inputQueue)
 
-                    self.failStageObject.applyPostprocess(self.interQueue)
+                        self.failStageObject.applyPostprocess(self.interQueue)
 
                 else:
                     postlog.log(self.VERB2, "No SerialProcessing to do for failure stage")
@@ -805,28 +1349,12 @@ class Pipeline(object):
 
     def waitForEvent(self, thisTopic):
         """
-        wait for a single event of a designated topic
+        wait for a single event of a designated topic, or of any of a list 
+        of topics.  Returns None if no event arrived within eventTimeout 
+        seconds or the Pipeline was asked to stop.
         """
-
-        eventsSystem = events.EventSystem.getDefaultEventSystem()
-
-        sleepTimeout = 0.1
-        transTimeout = 900
-
-        inputParamPropertySetPtr  = None
-        waitLoopCount = 0
-        while((inputParamPropertySetPtr == None) and (waitLoopCount < self.eventTimeout)):
-            if(self.logthresh == self.VERB3):
-                print "Pipeline waitForEvent Looping : checking for event ... \n"
-
-            inputParamPropertySetPtr = eventsSystem.receive(thisTopic, transTimeout)
-
-            time.sleep(sleepTimeout)
-
-            if((self._stop.isSet())):
-                break
-
-            waitLoopCount = waitLoopCount+1
+        waiter = EventWaiter(thisTopic, self._stop, self.eventReceiveTimeout)
+        topic, inputParamPropertySetPtr = waiter.wait(self.eventTimeout)
 
         return inputParamPropertySetPtr
 
@@ -866,8 +1394,13 @@ class Pipeline(object):
                 # It places the payload on the clipboard with key of the eventTopic
                 self.populateClipboard(inputParamPropertySetPtr, iStage, thisTopic)
 
-                eventsSystem.createTransmitter(self.eventBrokerHost, sliceTopic)
-                eventsSystem.publish(sliceTopic, inputParamPropertySetPtr)
+                fanOut = None
+                if self.eventFanOutList:
+                    fanOut = self.eventFanOutList[iStage-1]
+                if fanOut is not None:
+                    fanOut.publish(inputParamPropertySetPtr)
+                else:
+                    eventsSystem.publish(sliceTopic, inputParamPropertySetPtr)
 
                 log.log(self.VERB2, "event sent to Slices")
             else: 
@@ -911,10 +1444,20 @@ class Pipeline(object):
         """
         Place an empty Clipboard in the output queue for designated stage
         """
-        clipboard = Clipboard()
+        clipboard = self.newClipboard()
         queue2 = self.queueList[iStage]
         queue2.addDataset(clipboard)
 
+    def dropClipboard(self, iStage, clipboard):
+        """
+        Remove the given Clipboard from the input queue for the designated 
+        stage if a failed stage left it there, so that the visit passes on 
+        only the Clipboard posted in its place
+        """
+        queue1 = self.queueList[iStage-1]
+        if queue1.element() is clipboard:
+            queue1.getNextDataset()
+
     def transferClipboard(self, iStage):
         """
         Move the Clipboard from the input queue to output queue for the designated stage
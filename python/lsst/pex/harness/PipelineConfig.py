@@ -0,0 +1,107 @@
+#! /usr/bin/env python
+
+#
+# LSST Data Management System
+# Copyright 2008, 2009, 2010 LSST Corporation.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsst.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+#
+
+
+"""
+PipelineConfig is the part of a Pipeline's configuration that its Slices
+need, resolved once: the "execute" policy with its policy files loaded, 
+the stage names, the parallel stage classes and their policies, the event
+topics and shareData flags, and the failure stage.  The Pipeline builds one
+before it starts its Slices and hands it to every SliceThread, and to 
+every SliceProcess, which inherits it when forked, so that the policy is
+read and the stage modules are imported once however many Slices there 
+are.  A Slice given no PipelineConfig, such as one run by a SliceAgent on
+another host, builds its own from the policy file.
+"""
+
+NOOP_PARALLEL = "lsst.pex.harness.stage.NoOpParallelProcessing"
+
+def importClass(className):
+    """
+    import and return the class with the given fully qualified name
+    """
+    tokenList = className.strip().split('.')
+    classString = tokenList.pop().strip()
+    package = ".".join(tokenList)
+
+    # For example  package -> lsst.pex.harness.App1Stage  classString -> App1Stage
+    module = __import__(package, globals(), locals(), [classString], -1)
+    return getattr(module, classString)
+
+class PipelineConfig(object):
+    '''The resolved configuration shared by the Slices of a Pipeline'''
+
+    def __init__(self, executePolicy):
+        """
+        resolve the configuration
+        @param executePolicy   the "execute" policy, with its policy files
+                                 already loaded
+        """
+        self.executePolicy = executePolicy
+
+        fullStageList = executePolicy.getArray("appStage")
+        self.nStages = len(fullStageList)
+
+        self.stageNames = []
+        self.parallelClassNames = []
+        self.parallelClasses = []
+        self.stagePolicies = []
+        self.eventTopics = []
+        self.shareData = []
+        for stageDefPolicy in fullStageList:
+            if (stageDefPolicy.exists('parallelClass')):
+                parallelName = stageDefPolicy.getString('parallelClass')
+                stagePolicy = stageDefPolicy.get('stagePolicy')
+            else:
+                parallelName = NOOP_PARALLEL
+                stagePolicy = None
+
+            stageName = stageDefPolicy.get("name")
+            if stageName is None:
+                stageName = parallelName.split('.')[-1]
+
+            self.stageNames.append(stageName)
+            self.parallelClassNames.append(parallelName)
+            self.parallelClasses.append(importClass(parallelName))
+            self.stagePolicies.append(stagePolicy)
+            self.eventTopics.append(stageDefPolicy.getString("eventTopic"))
+
+            shareDataStage = False
+            if (stageDefPolicy.exists('shareData')):
+                shareDataStage = stageDefPolicy.getBool('shareData')
+            self.shareData.append(shareDataStage)
+
+        self.failureStageName = None
+        self.failParallelName = None
+        self.failParallelClass = None
+        self.failStagePolicy = None
+        if (executePolicy.exists('failureStage')):
+            failstg = executePolicy.get("failureStage")
+            self.failureStageName = failstg.get("name")
+            if (failstg.exists('parallelClass')):
+                self.failParallelName = failstg.getString('parallelClass')
+                self.failStagePolicy = failstg.get('stagePolicy')
+            else:
+                self.failParallelName = NOOP_PARALLEL
+            self.failParallelClass = importClass(self.failParallelName)
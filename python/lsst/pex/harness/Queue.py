@@ -30,70 +30,171 @@ the next image it should operate on (via the InputQueue interface) and
 2) post a Clipboard container that has been updated with 
 the image that the present Stage has completed work on for the 
 next Stage (via the OutputQueue interface)
+
+A Queue may be shared by the threads of one process (e.g. the Stage 
+threads of an overlapped pipeline).  It can be bounded, in which case 
+addDataset() applies backpressure by waiting for room, and both ends can 
+wait for the other instead of polling.
 """
 
+import collections
+import threading
+import time
+
+class QueueFull(RuntimeError):
+    """
+    raised by addDataset() when a bounded Queue stays full
+    """
+    pass
+
 class Queue(object):
     '''Carry references to image data from Stage to Stage via ClipBoard container'''
 
     #------------------------------------------------------------------------
-    def __init__(self):
+    def __init__(self, maxsize=0):
         """
         Initialize the Queue by defining an initial dataset list
+        @param maxsize   the maximum number of Clipboards the Queue may hold;
+                           0 (default) means no limit
         """
-        self.datasetList = []
+        self.maxsize = maxsize
+        self.datasetList = collections.deque()
+        self._cond = threading.Condition(threading.Lock())
+
+        # occupancy statistics
+        self._highWaterMark = 0
+        self._added = 0
+        self._removed = 0
+        self._getWaitTime = 0.0
+        self._addWaitTime = 0.0
 
     #------------------------------------------------------------------------
     def __del__(self):
         """
         Delete the Queue object for cleanup
         """
-	# print 'Queue being deleted'
+        # print 'Queue being deleted'
         pass
 
     #------------------------------------------------------------------------
-    def getNextDataset(self): 
+    def _waitFor(self, predicate, timeout):
+        # wait on the condition until predicate() is true; return False if
+        # the timeout expired first.  Must be called with the lock held.
+        if timeout is None:
+            while not predicate():
+                self._cond.wait()
+            return True
+        deadline = time.time() + timeout
+        while not predicate():
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return False
+            self._cond.wait(remaining)
+        return True
+
+    #------------------------------------------------------------------------
+    def getNextDataset(self, block=False, timeout=None): 
         """
         Return the Clipboard at the top of the dataset list, removing 
         the Clipboard from the dataset list in the process (pop).
         This method comprises the InputQueue interface
+        @param block     if True, wait for a Clipboard to arrive if the 
+                           Queue is empty; otherwise return None at once
+        @param timeout   the maximum time in seconds to wait when blocking;
+                           None means wait indefinitely.  None is returned
+                           if the timeout expires.
         """
-        if not self.datasetList:
-            # Code here for the case where the list is empty
-            clipboard = None
-        else:
-            # Code here for the case where the list is NOT empty
-            clipboard = self.datasetList.pop(0)
-
-        return clipboard
+        with self._cond:
+            if block and not self.datasetList:
+                start = time.time()
+                arrived = self._waitFor(lambda: self.datasetList, timeout)
+                self._getWaitTime += time.time() - start
+                if not arrived:
+                    return None
+            if not self.datasetList:
+                # Code here for the case where the list is empty
+                return None
+            clipboard = self.datasetList.popleft()
+            self._removed += 1
+            self._cond.notify_all()
+            return clipboard
 
     #------------------------------------------------------------------------
-    def element(self): 
+    def element(self, block=False, timeout=None): 
         """
         Return the Clipboard at the top of the dataset list, but do not remove 
         the Clipboard from the dataset list
+        @param block     if True, wait for a Clipboard to arrive if the 
+                           Queue is empty; otherwise return None at once
+        @param timeout   the maximum time in seconds to wait when blocking
         """
-        if not self.datasetList:
-            # Code here for the case where the list is empty
-            clipboard = None
-        else:
-            # Code here for the case where the list is NOT empty
-            clipboard = self.datasetList[0]
+        with self._cond:
+            if block and not self.datasetList:
+                start = time.time()
+                arrived = self._waitFor(lambda: self.datasetList, timeout)
+                self._getWaitTime += time.time() - start
+                if not arrived:
+                    return None
+            if not self.datasetList:
+                return None
+            return self.datasetList[0]
 
-        return clipboard
+    #------------------------------------------------------------------------
+    def elements(self): 
+        """
+        Return a list of all the Clipboards in the dataset list, from the 
+        top down, without removing them
+        """
+        with self._cond:
+            return list(self.datasetList)
 
     #------------------------------------------------------------------------
-    def addDataset(self, clipboard): 
+    def addDataset(self, clipboard, block=True, timeout=None): 
         """
         Append the given Clipboard to the dataset list.
         This method comprises the OutputQueue interface
+        @param block     if the Queue is bounded and full, wait for room 
+                           (default); otherwise raise QueueFull at once
+        @param timeout   the maximum time in seconds to wait for room;
+                           QueueFull is raised if it expires
         """
-        self.datasetList.append(clipboard)
+        with self._cond:
+            if self.maxsize > 0 and len(self.datasetList) >= self.maxsize:
+                if not block:
+                    raise QueueFull("Queue is full (%d Clipboards)" % self.maxsize)
+                start = time.time()
+                hasRoom = self._waitFor(
+                    lambda: len(self.datasetList) < self.maxsize, timeout)
+                self._addWaitTime += time.time() - start
+                if not hasRoom:
+                    raise QueueFull("Queue stayed full (%d Clipboards)" % self.maxsize)
+            self.datasetList.append(clipboard)
+            self._added += 1
+            if len(self.datasetList) > self._highWaterMark:
+                self._highWaterMark = len(self.datasetList)
+            self._cond.notify_all()
 
     #------------------------------------------------------------------------
     def size(self): 
         """
         Return the size of the dataset list (the number of Clipboards)
         """
-        size = len(self.datasetList)
-        return size 	
+        return len(self.datasetList)
 
+    #------------------------------------------------------------------------
+    def getStats(self): 
+        """
+        Return the occupancy statistics of the Queue as a dictionary: the
+        current size, maxsize, highWaterMark (the largest size reached), 
+        the numbers of Clipboards added and removed, and getWaitTime and
+        addWaitTime (the total seconds spent waiting for a Clipboard and
+        for room)
+        """
+        with self._cond:
+            return {"size": len(self.datasetList),
+                    "maxsize": self.maxsize,
+                    "highWaterMark": self._highWaterMark,
+                    "added": self._added,
+                    "removed": self._removed,
+                    "getWaitTime": self._getWaitTime,
+                    "addWaitTime": self._addWaitTime}
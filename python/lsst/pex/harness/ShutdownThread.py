@@ -29,7 +29,8 @@ from threading import Event as PyEvent
 
 from lsst.pex.logging import Log, BlockTimingLog
 
-import lsst.ctrl.events as events
+from lsst.pex.harness.LazyImport import lazyImport
+events = lazyImport("lsst.ctrl.events")
 
 """
 ShutdownThread class manages a separate Python thread that runs
@@ -81,8 +82,9 @@ class ShutdownThread(threading.Thread):
         # works 
         # recv = events.EventReceiver(eventBrokerHost, shutdownTopic)
 
-        sleepTimeout = 2.0
-        transTimeout = 900
+        # block in the receive rather than sleeping, but return often 
+        # enough to notice a stop request from the Pipeline
+        transTimeout = self.pipeline.eventReceiveTimeout
 
         shutdownEvent = None
         shutdownPropertySetPtr = None
@@ -93,7 +95,6 @@ class ShutdownThread(threading.Thread):
                 print "ShutdownThread Looping : checking for Shutdown event ... \n" 
                 print "ShutdownThread Looping : " + clause 
 
-            time.sleep(sleepTimeout)
             # shutdownPropertySetPtr = eventsSystem.receive(shutdownTopic, transTimeout)
             shutdownEvent  = recv.receiveEvent(transTimeout)
             if(shutdownEvent == None):
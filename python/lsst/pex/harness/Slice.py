@@ -28,7 +28,17 @@ from lsst.pex.harness.Queue import Queue
 from lsst.pex.harness.stage import StageProcessing
 from lsst.pex.harness.stage import NoOpParallelProcessing
 from lsst.pex.harness.Clipboard import Clipboard
+from lsst.pex.harness.ClipboardMemory import ClipboardMemory
+from lsst.pex.harness.ClipboardPool import ClipboardPool
+from lsst.pex.harness.ClipboardTrace import ClipboardTracer, TracingClipboard
+from lsst.pex.harness.KeyLifetimes import makeReleasePlan
+from lsst.pex.harness.StageCache import makeCachePlan, makeStageCache
+from lsst.pex.harness.Executor import Executor, getWorkerCount
 from lsst.pex.harness.Directories import Directories
+from lsst.pex.harness.PipelineConfig import PipelineConfig
+from lsst.pex.harness.SyncPlan import SyncPlan, makeSyncPlan
+from lsst.pex.harness.StageFusion import makeFusionPlan, getFusedStages
+from lsst.pex.harness.EventWaiter import EventWaiter
 from lsst.pex.logging import Log, LogRec, Prop
 from lsst.pex.logging import BlockTimingLog
 from lsst.pex.harness import harnessLib as logutils
@@ -37,14 +47,11 @@ import lsst.pex.policy as policy
 import lsst.pex.exceptions as ex
 
 import lsst.daf.base as dafBase
-from lsst.daf.base import *
-import lsst.daf.persistence as dafPersist
-from lsst.daf.persistence import *
 
-
-import lsst.ctrl.events as events
-import lsst.pex.exceptions
-from lsst.pex.exceptions import *
+# the event system and persistence are imported on first use
+from lsst.pex.harness.LazyImport import lazyImport
+dafPersist = lazyImport("lsst.daf.persistence")
+events = lazyImport("lsst.ctrl.events")
 
 import os, sys, signal, re, traceback, time, datetime
 import threading
@@ -88,8 +95,28 @@ class Slice(object):
         self.shareDataList = []
         self.shutdownTopic = "triggerShutdownEvent_slice"
         self.executionMode = 0
+        self.visitDepth = 1
+        self.clipboardMemoryBudget = None
+        self.clipboardPool = ClipboardPool(self.createClipboard)
+        self.clipboardTracer = None
+        self.releaseList = []
+        self.cacheList = []
+        self.stageCache = None
+        self.executor = None
+        self.sliceWorkers = 0
+        self.sliceWorkerKind = "thread"
+        self.slicesPerNode = None
+        self.scratchDir = None
+        self.statelessList = []
+        self.fusionPlan = []
+        self.workBatchSizeList = []
+        self.stageBarrierList = []
+        self.workQueueList = []
+        self.exchangeList = []
+        self.eventFanOutList = []
         self._runId = runId
         self.pipelinePolicyName = pipelinePolicyName
+        self.config = None
 
         self.cppLogUtils = logutils.LogUtils()
         self._rank = int(rank)
@@ -99,6 +126,30 @@ class Slice(object):
         else:
             self.workerId = -1
 
+        # per-thread visit state; in overlapped mode each Stage runs in its
+        # own thread and works on its own visit
+        self._visitState = threading.local()
+        self._failStageLock = threading.Lock()
+
+    def _getErrorFlagged(self):
+        return getattr(self._visitState, "errorFlagged", 0)
+
+    def _setErrorFlagged(self, flag):
+        self._visitState.errorFlagged = flag
+
+    errorFlagged = property(_getErrorFlagged, _setErrorFlagged)
+
+    def flagError(self):
+        """
+        Flag an error on the visit being executed.  In overlapped mode the
+        visit is marked failed at once, before its Clipboard is passed on
+        to the thread of the next stage.
+        """
+        self.errorFlagged = 1
+        visit = getattr(self._visitState, "visit", None)
+        if visit is not None:
+            with self._visitCond:
+                self._failedVisits.add(visit)
 
 
     def __del__(self):
@@ -115,12 +166,16 @@ class Slice(object):
         if(self.pipelinePolicyName == None):
             self.pipelinePolicyName = "pipeline_policy.paf"
         dictName = "pipeline_dict.paf"
-        topPolicy = policy.Policy.createPolicy(self.pipelinePolicyName)
-
-        if (topPolicy.exists('execute')):
-            self.executePolicy = topPolicy.get('execute')
+        if self.config is not None:
+            # the policy was read and its files loaded by the Pipeline
+            self.executePolicy = self.config.executePolicy
         else:
-            self.executePolicy = policy.Policy.createPolicy(self.pipelinePolicyName)
+            topPolicy = policy.Policy.createPolicy(self.pipelinePolicyName)
+
+            if (topPolicy.exists('execute')):
+                self.executePolicy = topPolicy.get('execute')
+            else:
+                self.executePolicy = policy.Policy.createPolicy(self.pipelinePolicyName)
 
         # Check for eventBrokerHost 
         if (self.executePolicy.exists('eventBrokerHost')):
@@ -158,17 +213,15 @@ class Slice(object):
         conflog = BlockTimingLog(self.log, "configureSlice", self.TRACE)
         conflog.start()
 
-        stgcfg = self.executePolicy.getArray("appStage")
+        if self.config is None:
+            self.executePolicy.loadPolicyFiles()
+            self.config = PipelineConfig(self.executePolicy)
+        config = self.config
 
-        self.stageNames = []
-        for subpol in stgcfg:
-            stageName = subpol.get("name")
-            self.stageNames.append(stageName)
-
-        self.executePolicy.loadPolicyFiles()
+        self.stageNames = list(config.stageNames)
 
         # Obtain the working directory space locators  
-        psLookup = lsst.daf.base.PropertySet()
+        psLookup = dafBase.PropertySet()
         if (self.executePolicy.exists('dir')):
             dirPolicy = self.executePolicy.get('dir')
             shortName = None
@@ -178,6 +231,7 @@ class Slice(object):
                 shortName = self.pipelinePolicyName.split('.')[0]
             dirs = Directories(dirPolicy, shortName, self._runId)
             psLookup = dirs.getDirs()
+            self.scratchDir = psLookup.get("scratch")
 
         if (self.executePolicy.exists('database.url')):
             psLookup.set('dbUrl', self.executePolicy.get('database.url'))
@@ -198,44 +252,47 @@ class Slice(object):
         else:
             self.eventTimeout = 10000000   # default value
 
+        # Check for eventReceiveTimeout (milliseconds)
+        self.eventReceiveTimeout = 100
+        if (self.executePolicy.exists('eventReceiveTimeout')):
+            self.eventReceiveTimeout = self.executePolicy.getInt('eventReceiveTimeout')
+
+        # Check for clipboardMemoryBudget (MB)
+        if (self.executePolicy.exists('clipboardMemoryBudget')):
+            self.clipboardMemoryBudget = self.executePolicy.getInt('clipboardMemoryBudget')
+
+        # Check for clipboardTrace
+        if (self.executePolicy.exists('clipboardTrace')):
+            self.clipboardTracer = ClipboardTracer( \
+                "%s-slice%d" % (self.executePolicy.getString('clipboardTrace'), self._rank),
+                self._rank, self.stageNames)
+
+        # Check for sliceWorkers, sliceWorkerKind and slicesPerNode: the 
+        # size and kind of the pool of workers within each Slice
+        if (self.executePolicy.exists('sliceWorkers')):
+            self.sliceWorkers = self.executePolicy.getInt('sliceWorkers')
+        if (self.executePolicy.exists('sliceWorkerKind')):
+            self.sliceWorkerKind = self.executePolicy.getString('sliceWorkerKind')
+        if (self.executePolicy.exists('slicesPerNode')):
+            self.slicesPerNode = self.executePolicy.getInt('slicesPerNode')
+
         # Process Application Stages
         fullStageList = self.executePolicy.getArray("appStage")
         self.nStages = len(fullStageList)
         log.log(self.VERB2, "Found %d stages" % len(fullStageList))
 
-        # extract the stage class name and associated policy file.  
-        fullStageNameList = [ ]
-        self.stagePolicyList = [ ]
-        for stagei in xrange(self.nStages):
-            fullStagePolicy = fullStageList[stagei]
-            if (fullStagePolicy.exists('parallelClass')):
-                parallelName = fullStagePolicy.getString('parallelClass')
-                stagePolicy = fullStagePolicy.get('stagePolicy')
-            else:
-                parallelName = "lsst.pex.harness.stage.NoOpParallelProcessing"
-                stagePolicy = None
-
-            fullStageNameList.append(parallelName)
+        # the stage classes and associated policy files; each Slice gets 
+        # its own copy of a stage policy, to which the stage may add defaults
+        self.stagePolicyList = []
+        for stagePolicy in config.stagePolicies:
+            if stagePolicy is not None:
+                stagePolicy = policy.Policy(stagePolicy, True)
             self.stagePolicyList.append(stagePolicy)
-
-            if self.stageNames[stagei] is None:
-                self.stageNames[stagei] = fullStageNameList[-1].split('.')[-1]
+        self.stageClassList = list(config.parallelClasses)
+        for stagei in xrange(self.nStages):
             log.log(self.VERB3,
                     "Stage %d: %s: %s" % (stagei+1, self.stageNames[stagei],
-                                          fullStageNameList[-1]))
-
-        for astage in fullStageNameList:
-            fullStage = astage.strip()
-            tokenList = astage.split('.')
-            classString = tokenList.pop()
-            classString = classString.strip()
-
-            package = ".".join(tokenList)
-
-            # For example  package -> lsst.pex.harness.App1Stage  classString -> App1Stage
-            AppStage = __import__(package, globals(), locals(), [classString], -1)
-            StageClass = getattr(AppStage, classString)
-            self.stageClassList.append(StageClass)
+                                          config.parallelClassNames[stagei]))
 
         log.log(self.VERB2, "Imported Stage Classes")
 
@@ -244,29 +301,13 @@ class Slice(object):
         #   - Read the policy information
         #   - Import failure stage Class and make failure stage instance Object
         #
-        self.failureStageName = None
-        self.failParallelName   = None
-        if (self.executePolicy.exists('failureStage')):
-            failstg = self.executePolicy.get("failureStage")
-            self.failureStageName = failstg.get("name")
-
-            if (failstg.exists('parallelClass')):
-                self.failParallelName = failstg.getString('parallelClass')
-                failStagePolicy = failstg.get('stagePolicy')
-            else:
-                self.failParallelName = "lsst.pex.harness.stage.NoOpParallelProcessing"
-                failStagePolicy = None
-
-            astage = self.failParallelName
-            tokenList = astage.split('.')
-            failClassString = tokenList.pop()
-            failClassString = failClassString.strip()
-
-            package = ".".join(tokenList)
-
-            # For example  package -> lsst.pex.harness.App1Stage  classString -> App1Stage
-            FailAppStage = __import__(package, globals(), locals(), [failClassString], -1)
-            FailStageClass = getattr(FailAppStage, failClassString)
+        self.failureStageName = config.failureStageName
+        self.failParallelName = config.failParallelName
+        if (self.failParallelName is not None):
+            FailStageClass = config.failParallelClass
+            failStagePolicy = config.failStagePolicy
+            if (failStagePolicy != None):
+                failStagePolicy = policy.Policy(failStagePolicy, True)
 
             sysdata = {}
 
@@ -288,23 +329,52 @@ class Slice(object):
 
 
         # Process Event Topics
-        self.eventTopicList = [ ]
-        self.sliceEventTopicList = [ ]
-        for item in fullStageList:
-            self.eventTopicList.append(item.getString("eventTopic"))
-            self.sliceEventTopicList.append(item.getString("eventTopic"))
+        self.eventTopicList = list(config.eventTopics)
+        self.sliceEventTopicList = list(config.eventTopics)
 
         # Check for executionMode of oneloop 
         if (self.executePolicy.exists('executionMode') and (self.executePolicy.getString('executionMode') == "oneloop")):
             self.executionMode = 1
 
-        # Process Share Data Schedule
-        self.shareDataList = []
+        # Check for visitDepth: the number of visits that may be in flight
+        if (self.executePolicy.exists('visitDepth')):
+            self.visitDepth = self.executePolicy.getInt('visitDepth')
+        self.statelessList = []
+        for item in fullStageList:
+            statelessStage = False
+            if (item.exists('stateless')):
+                statelessStage = item.getBool('stateless')
+            self.statelessList.append(statelessStage)
+
+        # Check for dynamically dispatched stages that take their work items
+        # in batches
+        self.workBatchSizeList = []
         for item in fullStageList:
-            shareDataStage = False
-            if (item.exists('shareData')):
-                shareDataStage = item.getBool('shareData')
-            self.shareDataList.append(shareDataStage)
+            workBatchSize = 1
+            if (item.exists('workBatchSize')):
+                workBatchSize = item.getInt('workBatchSize')
+            self.workBatchSizeList.append(max(1, workBatchSize))
+
+        # Determine which runs of parallel-only stages are fused
+        self.fusionPlan = makeFusionPlan(self.executePolicy)
+        log.log(self.VERB3, "Fusing %d stages into the stage before them" % \
+                len([i for i in range(self.nStages) if self.fusionPlan[i] != i+1]))
+
+        # Determine which synchronization points each stage needs; this 
+        # must match the plan computed by the Pipeline 
+        self.syncPlan = makeSyncPlan(self.executePolicy, self.fusionPlan)
+        log.log(self.VERB3, "Sync plan: %d of %d barriers per visit" % \
+                (self.syncPlan.getBarrierCount(), 4*self.nStages))
+
+        # Determine after which stage each declared Clipboard key is released
+        self.releaseList = makeReleasePlan(self.executePolicy)
+
+        # Check for stages whose results are cached across runs
+        self.cacheList = makeCachePlan(self.executePolicy)
+        self.stageCache = makeStageCache(self.executePolicy, self.cacheList)
+
+        # Process Share Data Schedule
+        self.shareDataList = list(config.shareData)
 
         log.log(self.VERB3, "Loading in %d trigger topics" % \
                 len(filter(lambda x: x != "None", self.eventTopicList)))
@@ -322,9 +392,12 @@ class Slice(object):
             count += 1
 
         eventsSystem = events.EventSystem.getDefaultEventSystem()
-        for topic in self.sliceEventTopicList:
+        for iStage in range(1, self.nStages+1):
+            topic = self.sliceEventTopicList[iStage-1]
             if (topic == "None_" + self._pipelineName):
                 pass
+            elif self.eventFanOutList and self.eventFanOutList[iStage-1] is not None:
+                log.log(self.VERB3, "Events for %s are handed over by the Pipeline" % (topic))
             else:
                 eventsSystem.createReceiver(self.eventBrokerHost, topic)
                 log.log(self.VERB3, "Creating receiver %s" % (topic))
@@ -357,6 +430,16 @@ class Slice(object):
         istageslog = BlockTimingLog(self.log, "initializeStages", self.TRACE)
         istageslog.start()
 
+        # the workers shared by the stages of this Slice
+        slicesPerNode = self.slicesPerNode
+        if slicesPerNode is None:
+            # all of the Slices; the universe also counts the Pipeline
+            slicesPerNode = max(1, self.universeSize - 1)
+        self.executor = Executor(getWorkerCount(self.sliceWorkers, slicesPerNode),
+                                 self.sliceWorkerKind, Log(self.log, "executor"))
+        istageslog.log(self.VERB3, "Executor: %d %s workers" % \
+                       (self.executor.nWorkers, self.executor.kind))
+
         for iStage in range(1, self.nStages+1):
             # Make a Policy object for the Stage Policy file
             stagePolicy = self.stagePolicyList[iStage-1]
@@ -370,6 +453,7 @@ class Slice(object):
             sysdata["stageId"] = iStage
             sysdata["universeSize"] = self.universeSize
             sysdata["runId"] =  self._runId
+            sysdata["executor"] = self.executor
             # Here 
             if (stagePolicy != "None"):
                 stageObject = StageClass(stagePolicy, self.log, self.eventBrokerHost, sysdata)
@@ -386,11 +470,30 @@ class Slice(object):
 
         istageslog.done()
 
+    def newClipboard(self):
+        """
+        Return an empty Clipboard from the Clipboard pool
+        """
+        return self.clipboardPool.acquire()
+
+    def createClipboard(self):
+        """
+        Create a Clipboard, with a ClipboardMemory if a 
+        clipboardMemoryBudget is configured, and tracing its accesses if
+        clipboardTrace is
+        """
+        memory = None
+        if self.clipboardMemoryBudget is not None:
+            memory = ClipboardMemory(self.clipboardMemoryBudget << 20, self.scratchDir)
+        if self.clipboardTracer is not None:
+            return TracingClipboard(self.clipboardTracer, memory)
+        return Clipboard(memory)
+
     def startInitQueue(self):
         """
         Place an empty Clipboard in the first Queue
         """
-        clipboard = Clipboard()
+        clipboard = self.newClipboard()
         queue1 = self.queueList[0]
         queue1.addDataset(clipboard)
 
@@ -398,10 +501,20 @@ class Slice(object):
         """
         Place an empty Clipboard in the output queue for designated stage
         """
-        clipboard = Clipboard()
+        clipboard = self.newClipboard()
         queue2 = self.queueList[iStage]
         queue2.addDataset(clipboard)
 
+    def dropClipboard(self, iStage, clipboard):
+        """
+        Remove the given Clipboard from the input queue for the designated 
+        stage if a failed stage left it there, so that the visit passes on 
+        only the Clipboard posted in its place
+        """
+        queue1 = self.queueList[iStage-1]
+        if queue1.element() is clipboard:
+            queue1.getNextDataset()
+
     def transferClipboard(self, iStage):
         """
         Move the Clipboard from the input queue to output queue for the designated stage
@@ -418,6 +531,10 @@ class Slice(object):
         the analogous stage loop in the central Pipeline by means of
         MPI Bcast and Barrier calls.
         """
+        if self.visitDepth > 1:
+            self.startOverlappedLoop()
+            return
+
         startStagesLoopLog = self.log.timeBlock("startStagesLoop", self.TRACE)
         looplog = BlockTimingLog(self.log, "visit", self.TRACE)
         stagelog = BlockTimingLog(looplog, "stage", self.TRACE)
@@ -458,21 +575,26 @@ class Slice(object):
                 stagelog.log(Log.INFO, "Begin stage loop iteration iStage %d " % iStage)
 
                 stageObject = self.stageList[iStage-1]
-                self.handleEvents(iStage, stagelog)
+                self.beginStage(visitcount, iStage, stagelog)
 
                 # synchronize before preprocess
-                self.threadBarrier()
+                self.syncPoint(iStage, SyncPlan.BEFORE_PREPROCESS)
 
                 # synchronize after preprocess, before process
-                self.threadBarrier()
+                self.syncPoint(iStage, SyncPlan.AFTER_PREPROCESS)
 
-                self.tryProcess(iStage, stageObject, stagelog)
+                self.shareData(iStage, stagelog)
+
+                if self.workQueueList and self.workQueueList[iStage-1] is not None:
+                    self.processWorkItems(iStage, stageObject, stagelog)
+                else:
+                    self.tryProcess(iStage, stageObject, stagelog)
 
                 # synchronize after process, before postprocess
-                self.threadBarrier()
+                self.syncPoint(iStage, SyncPlan.AFTER_PROCESS)
 
                 # synchronize after postprocess
-                self.threadBarrier()
+                self.syncPoint(iStage, SyncPlan.AFTER_POSTPROCESS)
 
                 stagelog.log(self.TRACE, "End stage loop iteration iStage %d " % iStage)
                 stagelog.log(Log.INFO, "End stage loop iteration : ErrorCheck \
@@ -488,7 +610,8 @@ class Slice(object):
                             "Retrieving final Clipboard for deletion")
                 finalQueue = self.queueList[self.nStages]
                 finalClipboard = finalQueue.getNextDataset()
-                finalClipboard.close()
+                self.reportFinalClipboard(finalClipboard, looplog)
+                self.clipboardPool.release(finalClipboard)
                 del finalClipboard
                 looplog.log(Log.DEBUG, "Deleted final Clipboard")
             else:
@@ -524,28 +647,211 @@ class Slice(object):
 
         startStagesLoopLog.done()
 
-    def threadBarrier(self):
+    def startOverlappedLoop(self): 
         """
-        Create an approximate barrier where all Slices intercommunicate with the Pipeline 
+        Execute the Stage loop with up to visitDepth visits in flight, 
+        one thread per Stage, in step with the Pipeline's overlapped loop.
+        Each Stage synchronizes with the Pipeline through its own barrier.
         """
+        startStagesLoopLog = self.log.timeBlock("startStagesLoop", self.TRACE)
+        looplog = BlockTimingLog(self.log, "visit", self.TRACE)
 
-        log = Log(self.log, "threadBarrier")
+        maxVisits = None
+        if self.executionMode == 1:
+            maxVisits = 1
 
-        entryTime = time.time()
-        log.log(Log.DEBUG, "Slice %d waiting for signal from Pipeline %f" % (self._rank, entryTime))
+        self._visitsDone = 0
+        self._failedVisits = set()
+        self._overlapExit = False
+        self._visitCond = threading.Condition()
 
-        self.loopEventA.wait()
+        self.threadBarrier()
 
-        signalTime1 = time.time()
-        log.log(Log.DEBUG, "Slice %d done waiting; signaling back %f" % (self._rank, signalTime1))
+        stageThreads = []
+        for iStage in range(1, self.nStages+1):
+            if not getFusedStages(self.fusionPlan, iStage):
+                continue
+            stageThread = threading.Thread(target=self.runStageThread, args=(iStage, maxVisits))
+            stageThread.daemon = True
+            stageThread.start()
+            stageThreads.append(stageThread)
 
-        if(self.loopEventA.isSet()):
-            self.loopEventA.clear()
+        visitcount = 0
+        with self._visitCond:
+            while not self._overlapExit:
+                if maxVisits is not None and visitcount >= maxVisits:
+                    break
+                if visitcount - self._visitsDone >= self.visitDepth:
+                    self._visitCond.wait()
+                    continue
+                visitcount += 1
+                looplog.log(self.VERB3, "Starting visit %d" % visitcount)
+                self.startInitQueue()    # place an empty clipboard in the first Queue
+
+            while not self._overlapExit and self._visitsDone < visitcount:
+                self._visitCond.wait()
+
+        for stageThread in stageThreads:
+            stageThread.join()
 
-        self.loopEventB.set()
+        startStagesLoopLog.done()
 
-        signalTime2 = time.time()
-        log.log(Log.DEBUG, "Slice %d sent signal back. Exit threadBarrier  %f" % (self._rank, signalTime2))
+    def runStageThread(self, iStage, maxVisits):
+        """
+        Execute a single Stage, and the Stages fused after it, over 
+        successive visits (overlapped mode)
+        """
+        stagelog = BlockTimingLog(self.log, "stage", self.TRACE)
+
+        fusedStages = getFusedStages(self.fusionPlan, iStage)
+        inputQueue = self.queueList[iStage-1]
+        stateless = self.statelessList[iStage-1]
+
+        try:
+            visit = 0
+            while maxVisits is None or visit < maxVisits:
+                visit += 1
+
+                # a stateful stage keeps to the order of the visits
+                if not stateless:
+                    with self._visitCond:
+                        while self._visitsDone < visit-1:
+                            self._visitCond.wait()
+                inputQueue.element(block=True)
+
+                stagelog.setPreamblePropertyInt("LOOPNUM", visit)
+
+                self._visitState.visit = visit
+                with self._visitCond:
+                    self.errorFlagged = int(visit in self._failedVisits)
+
+                for jStage in fusedStages:
+                    stageObject = self.stageList[jStage-1]
+                    stagelog.setPreamblePropertyInt("STAGEID", jStage)
+                    stagelog.setPreamblePropertyString("stagename", self.stageNames[jStage-1])
+                    stagelog.start(self.stageNames[jStage-1] + " loop")
+
+                    self.beginStage(visit, jStage, stagelog)
+
+                    self.syncPoint(jStage, SyncPlan.BEFORE_PREPROCESS)
+                    self.syncPoint(jStage, SyncPlan.AFTER_PREPROCESS)
+                    self.shareData(jStage, stagelog)
+                    if self.workQueueList and self.workQueueList[jStage-1] is not None:
+                        self.processWorkItems(jStage, stageObject, stagelog)
+                    else:
+                        self.tryProcess(jStage, stageObject, stagelog)
+                    self.syncPoint(jStage, SyncPlan.AFTER_PROCESS)
+                    self.syncPoint(jStage, SyncPlan.AFTER_POSTPROCESS)
+
+                    stagelog.done()
+
+                if fusedStages[-1] == self.nStages:
+                    self.finishVisit(visit)
+        except:
+            trace = "".join(traceback.format_exception(
+                    sys.exc_info()[0], sys.exc_info()[1], sys.exc_info()[2]))
+            stagelog.log(Log.FATAL, trace)
+            with self._visitCond:
+                self._overlapExit = True
+                self._visitCond.notify_all()
+
+    def beginStage(self, visit, iStage, stagelog):
+        """
+        Prepare the visit's Clipboard for a stage: release the entries that
+        are no longer needed and add the payload of the stage's triggering
+        event.  The payload is traced as written by the harness; the 
+        Clipboard accesses that follow are attributed to the stage.
+        """
+        self.releaseKeys(iStage, stagelog)
+        self.traceStage(visit, None)
+        self.handleEvents(iStage, stagelog)
+        self.traceStage(visit, iStage)
+
+    def traceStage(self, visit, iStage):
+        """
+        Attribute the Clipboard accesses that follow to the given visit and
+        stage, if Clipboard tracing is on
+        """
+        if self.clipboardTracer is not None:
+            self.clipboardTracer.setContext(visit, iStage)
+
+    def releaseKeys(self, iStage, stagelog):
+        """
+        Remove from the Clipboard entering a stage the declared entries 
+        whose last use was the previous stage
+        """
+        if iStage < 2 or not self.releaseList[iStage-2]:
+            return
+        clipboard = self.queueList[iStage-1].element()
+        released = 0
+        for key in self.releaseList[iStage-2]:
+            if clipboard.contains(key):
+                clipboard.remove(key)
+                released += 1
+        stagelog.log(self.VERB3, "Released %d Clipboard entries" % released)
+
+    def reportFinalClipboard(self, clipboard, log):
+        """
+        Report the lazy entries of a visit's final Clipboard that no Stage 
+        retrieved, so that the Stages putting them can be reconsidered, and
+        the memory held by its entries if it was accounted for
+        """
+        unforced = clipboard.getUnforcedKeys()
+        if unforced:
+            log.log(self.VERB3, "Lazy Clipboard entries never used: %s" % \
+                    ", ".join(sorted(unforced)))
+
+        memory = clipboard.getMemory()
+        if memory is not None:
+            stats = memory.getStats()
+            sizes = sorted(memory.getSizes().items(), key=lambda item: -item[1])
+            log.log(Log.INFO, "clipboard mem: highWaterMark=%d spilled=%d reloaded=%d largest: %s" % \
+                    (stats["highWaterMark"], stats["spilled"], stats["reloaded"],
+                     " ".join(["%s=%d" % item for item in sizes[:5]])))
+
+    def finishVisit(self, visit):
+        """
+        Delete the final Clipboard of a visit and release its slot (overlapped mode)
+        """
+        finalQueue = self.queueList[self.nStages]
+        finalClipboard = finalQueue.getNextDataset()
+        self.reportFinalClipboard(finalClipboard, self.log)
+        self.clipboardPool.release(finalClipboard)
+        del finalClipboard
+
+        if visit in self._failedVisits:
+            self.log.log(self.VERB3, "Error flagged on visit %d" % visit)
+
+        with self._visitCond:
+            self._visitsDone += 1
+            self._failedVisits.discard(visit)
+            self._visitCond.notify_all()
+
+    def syncPoint(self, iStage, point):
+        """
+        Enter the barrier for the given synchronization point of a stage 
+        unless the sync plan shows that it protects nothing 
+        """
+        if self.syncPlan.needsBarrier(iStage, point):
+            self.threadBarrier(iStage)
+
+    def threadBarrier(self, iStage=0):
+        """
+        Create a barrier where all Slices intercommunicate with the Pipeline 
+        """
+
+        log = Log(self.log, "threadBarrier")
+
+        entryTime = time.time()
+        log.log(Log.DEBUG, "Slice %d waiting for Pipeline and Slices %f" % (self._rank, entryTime))
+
+        barrier = self.barrier
+        if iStage > 0 and self.stageBarrierList:
+            barrier = self.stageBarrierList[iStage-1]
+        barrier.wait(self._rank)
+
+        exitTime = time.time()
+        log.log(Log.DEBUG, "Slice %d released. Exit threadBarrier  %f" % (self._rank, exitTime))
 
     def shutdown(self): 
         """
@@ -553,6 +859,17 @@ class Slice(object):
         """
         shutlog = Log(self.log, "shutdown", Log.INFO);
         pid = os.getpid()
+        shutlog.log(self.VERB2, "Clipboard pool: %(hits)d hits %(misses)d misses %(dropped)d dropped" % \
+                    self.clipboardPool.getStats())
+        if self.executor is not None:
+            shutlog.log(self.VERB2, "Executor: %(tasks)d tasks %(failed)d failed busy %(busyTime).3f s longest %(longest).3f s" % \
+                        self.executor.getStats())
+            self.executor.close()
+        if self.stageCache is not None:
+            shutlog.log(self.VERB2, "Stage cache: %(hits)d hits %(misses)d misses %(evicted)d evicted" % \
+                        self.stageCache.getStats())
+        if self.clipboardTracer is not None:
+            self.clipboardTracer.close()
         shutlog.log(Log.INFO, "Shutting down Slice:  pid " + str(pid))
         os.kill(pid, signal.SIGKILL) 
 
@@ -564,6 +881,7 @@ class Slice(object):
         proclog = stagelog.timeBlock("tryProcess", self.TRACE-2);
 
         stageObject = self.stageList[iStage-1]
+        inputClipboard = self.queueList[iStage-1].element()
         proclog.log(self.VERB3, "Getting process signal from Pipeline")
 
         # Important try - except construct around stage process() 
@@ -572,13 +890,13 @@ class Slice(object):
             # otherwise, simply pass along the Clipboard 
             if (self.errorFlagged == 0):
                 processlog = stagelog.timeBlock("process", self.TRACE)
-                stageObject.applyProcess()
+                self.applyProcess(iStage, stageObject, processlog)
 
-                outputQueue = self.queueList[iStage]
-                clipboard = outputQueue.element()
+                # the Clipboard has been passed on, and in overlapped mode the
+                # next stage may already have taken it from the output queue
                 proclog.log(Log.INFO, "Checking_For_Shotdown")
 
-                if clipboard.has_key("noMoreDatasets"): 
+                if inputClipboard.has_key("noMoreDatasets"): 
                     proclog.log(Log.INFO, "Ready_For_Shutdown")
                     self.shutdown();
 
@@ -593,7 +911,7 @@ class Slice(object):
             proclog.log(Log.FATAL, trace)
 
             # Flag that an exception occurred to guide the framework to skip processing
-            self.errorFlagged = 1
+            self.flagError()
             # Post the cliphoard that the Stage failed to transfer to the output queue
 
             if(self.failureStageName != None):
@@ -615,24 +933,156 @@ class Slice(object):
                     clipboard.put("failureMessage", str(sys.exc_info()[1]))
                     clipboard.put("failureTraceback", trace)
 
-                    self.failStageObject.initialize(outputQueue, inputQueue)
+                    with self._failStageLock:
+                        self.failStageObject.initialize(outputQueue, inputQueue)
 
-                    self.failStageObject.applyProcess()
+                        self.failStageObject.applyProcess()
 
-                    proclog.log(self.TRACE, "Popping off failure stage Clipboard")
-                    clipboard = outputQueue.getNextDataset()
-                    clipboard.close()
-                    del clipboard
+                        proclog.log(self.TRACE, "Popping off failure stage Clipboard")
+                        clipboard = outputQueue.getNextDataset()
+                        clipboard.close()
+                        del clipboard
                     proclog.log(self.TRACE, "Erasing and deleting failure stage Clipboard")
 
                 else:
                     proclog.log(self.VERB2, "No ParallelProcessing to do for failure stage")
 
+            self.dropClipboard(iStage, inputClipboard)
             self.postOutputClipboard(iStage)
 
         proclog.log(self.VERB3, "Getting end of process signal from Pipeline")
         proclog.done()
 
+    def applyProcess(self, iStage, stage, log):
+        """
+        Apply the Stage's process(), or, for a Stage whose results are 
+        cached, put the results of an identical earlier run on the Clipboard
+        and pass it along instead
+        """
+        cachedKeys = None
+        if self.cacheList:
+            cachedKeys = self.cacheList[iStage-1]
+        if cachedKeys is None:
+            stage.applyProcess()
+            return
+
+        consumedKeys, producedKeys = cachedKeys
+        key = self.stageCache.makeKey("process", stage, 
+                                      self.queueList[iStage-1].element(), consumedKeys)
+        results = self.stageCache.get(key)
+        if results is not None:
+            log.log(self.VERB3, "Reusing %d cached process results" % len(results))
+            self.stageCache.restore(self.queueList[iStage-1].element(), results)
+            self.transferClipboard(iStage)
+            return
+
+        # store the results before the next Stage can see the Clipboard
+        outputQueue = Queue()
+        stage.initialize(outputQueue, self.queueList[iStage-1])
+        try:
+            stage.applyProcess()
+        finally:
+            stage.initialize(self.queueList[iStage], self.queueList[iStage-1])
+        clipboard = outputQueue.getNextDataset()
+        self.stageCache.put(key, clipboard, producedKeys)
+        self.queueList[iStage].addDataset(clipboard)
+
+    def shareData(self, iStage, stagelog):
+        """
+        For a Stage with shareData: true, exchange the Clipboard entries 
+        marked shared with the neighbouring Slices and place the received 
+        entries on the Clipboard under "<key>-<neighbour rank>".  A Slice 
+        with a flagged error still takes part, sharing nothing, so that its
+        neighbours are not left waiting.
+        """
+        if not self.exchangeList or self.exchangeList[iStage-1] is None:
+            return
+
+        sharelog = stagelog.timeBlock("shareData", self.TRACE-2)
+        clipboard = self.queueList[iStage-1].element()
+
+        shared = {}
+        if self.errorFlagged == 0:
+            for key in clipboard.getSharedKeys():
+                shared[key] = clipboard.get(key)
+
+        received = self.exchangeList[iStage-1].share(self._rank, shared)
+
+        if self.errorFlagged == 0:
+            for key, value in received.items():
+                clipboard.put(key, value)
+        sharelog.log(self.VERB3, "Shared %d entries, received %d" % (len(shared), len(received)))
+        sharelog.done()
+
+    def processWorkItems(self, iStage, stage, stagelog):
+        """
+        Pull work items from the WorkQueue of a dynamically dispatched Stage
+        and process them until the end-of-visit marker arrives, then pass 
+        the visit's Clipboard along.  With a workBatchSize above 1, up to 
+        that many items already waiting are taken at a time and handed to 
+        the Stage's applyProcessBatch(), so that processBatch() sees them 
+        in one call; otherwise each goes through applyProcess().  A work 
+        item whose processing fails is returned to the Pipeline carrying 
+        the failure keys; it does not flag an error on the visit.  When a 
+        batch fails, every item in it is returned that way.
+        """
+        proclog = stagelog.timeBlock("processWorkItems", self.TRACE-2)
+        workQueue = self.workQueueList[iStage-1]
+        workBatchSize = self.workBatchSizeList[iStage-1]
+
+        itemInQueue = Queue()
+        itemOutQueue = Queue()
+        stage.initialize(itemOutQueue, itemInQueue)
+
+        nItems = 0
+        nBatches = 0
+        try:
+            finished = False
+            while not finished:
+                works, finished = workQueue.nextBatch(workBatchSize)
+                if not works:
+                    break
+
+                for index, item in works:
+                    itemInQueue.addDataset(item)
+                try:
+                    if workBatchSize > 1:
+                        stage.applyProcessBatch(len(works))
+                    else:
+                        stage.applyProcess()
+                    results = []
+                    for work in works:
+                        results.append(itemOutQueue.getNextDataset())
+                except:
+                    trace = "".join(traceback.format_exception(
+                        sys.exc_info()[0], sys.exc_info()[1], sys.exc_info()[2]))
+                    proclog.log(Log.FATAL, trace)
+
+                    while itemInQueue.getNextDataset() is not None:
+                        pass
+                    while itemOutQueue.getNextDataset() is not None:
+                        pass
+                    results = []
+                    for index, item in works:
+                        item.put("failedInStage",  stage.getName())
+                        item.put("failedInStageN", iStage)
+                        item.put("failureType", str(sys.exc_info()[0]))
+                        item.put("failureMessage", str(sys.exc_info()[1]))
+                        item.put("failureTraceback", trace)
+                        results.append(item)
+
+                for work, result in zip(works, results):
+                    workQueue.putResult(work[0], result)
+                nItems += len(works)
+                nBatches += 1
+        finally:
+            stage.initialize(self.queueList[iStage], self.queueList[iStage-1])
+
+        proclog.log(self.VERB3, "Processed %d work items in %d batches" % \
+                    (nItems, nBatches))
+        self.transferClipboard(iStage)
+        proclog.done()
+
     def handleEvents(self, iStage, stagelog):
         """
         Handles Events: transmit or receive events as specified by Policy
@@ -649,18 +1099,13 @@ class Slice(object):
             waitlog = log.timeBlock("eventwait " + sliceTopic, self.TRACE,
                                     "wait for event...")
 
-            # Receive the event from the Pipeline 
-            # Call with a timeout , followed by a call to time sleep to free the GIL 
-            # periodically
-
-            sleepTimeout = 0.1
-            transTimeout = 900
-
-            inputParamPropertySetPtr = eventsSystem.receive(sliceTopic, transTimeout)
-            while(inputParamPropertySetPtr == None):
-                time.sleep(sleepTimeout)
-                inputParamPropertySetPtr = eventsSystem.receive(sliceTopic, transTimeout)
-     
+            # Receive the event from the Pipeline; wait for as long as it 
+            # takes to arrive
+            if self.eventFanOutList and self.eventFanOutList[iStage-1] is not None:
+                inputParamPropertySetPtr = self.eventFanOutList[iStage-1].receive(self._rank)
+            else:
+                waiter = EventWaiter(sliceTopic, None, self.eventReceiveTimeout)
+                topic, inputParamPropertySetPtr = waiter.wait()
 
             waitlog.done()
             LogRec(log, self.TRACE) << "received event; contents: "        \
@@ -751,15 +1196,31 @@ class Slice(object):
         else:
             return None
         
-    def setLoopEventA(self, event):
-        self.loopEventA = event
+    def setBarrier(self, barrier):
+        self.barrier = barrier
+
+    def setStageBarriers(self, barriers):
+        self.stageBarrierList = barriers
+
+    def setWorkQueues(self, workQueues):
+        self.workQueueList = workQueues
+
+    def setExchanges(self, exchanges):
+        self.exchangeList = exchanges
 
-    def setLoopEventB(self, event):
-        self.loopEventB = event
+    def setEventFanOuts(self, fanOuts):
+        self.eventFanOutList = fanOuts
 
     def setUniverseSize(self, usize):
         self.universeSize = usize
 
+    def setConfig(self, config):
+        """
+        use the PipelineConfig resolved by the Pipeline instead of reading
+        the policy file and importing the stage classes again
+        """
+        self.config = config
+
 trailingpolicy = re.compile(r'_*(policy|dict)$', re.IGNORECASE)
 
 
@@ -0,0 +1,224 @@
+#! /usr/bin/env python
+
+#
+# LSST Data Management System
+# Copyright 2008, 2009, 2010 LSST Corporation.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsst.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+#
+
+"""
+SliceAgent runs one Slice of a Pipeline using executionBackend: "socket".
+It connects to the Pipeline's SliceServer, receives its rank and the
+Pipeline's settings, and drives the Slice with proxies in place of the
+Barrier, WorkQueue and Exchange objects shared by thread Slices.  See
+SliceServer for the protocol.
+"""
+
+import itertools
+import os
+import signal
+import socket
+import threading
+
+from lsst.pex.harness.Barrier import BarrierAborted
+from lsst.pex.harness.SliceServer import parseAddress, configureSocket
+from lsst.pex.harness.SliceServer import sendMessage, receiveMessage
+
+class SliceClient(object):
+    '''The agent's connection to the SliceServer'''
+
+    def __init__(self, address, rank=None, onStop=None):
+        """
+        connect to the server and obtain a rank and the Slice settings
+        (available as the config attribute)
+        @param address   the server's "host:port" or "unix:/path"
+        @param rank      the rank to ask for, or None for any free rank
+        @param onStop    the function to call when the Pipeline stops the
+                           Slice or goes away; by default the agent process
+                           is killed
+        """
+        family, sockaddr = parseAddress(address)
+        self._socket = socket.socket(family, socket.SOCK_STREAM)
+        self._socket.connect(sockaddr)
+        configureSocket(self._socket)
+
+        sendMessage(self._socket, (rank, os.getpid(), socket.gethostname()))
+        reply = receiveMessage(self._socket)
+        if reply is None or reply[0] != "welcome":
+            self._socket.close()
+            raise RuntimeError("Slice server refused connection: %s" % \
+                               (reply and reply[1]))
+        self.config = reply[1]
+        self.rank = self.config["rank"]
+
+        self._onStop = onStop
+        self._ids = itertools.count()
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._sendLock = threading.Lock()
+        self._closed = False
+
+        reader = threading.Thread(target=self._read)
+        reader.daemon = True
+        reader.start()
+
+    def call(self, target, method, *args):
+        """
+        call a method of a Pipeline-side object and return its result,
+        raising BarrierAborted or RuntimeError for a failed call
+        """
+        done = threading.Event()
+        reply = [done]
+        self._lock.acquire()
+        try:
+            if self._closed:
+                raise RuntimeError("connection to the Pipeline is closed")
+            requestId = next(self._ids)
+            self._pending[requestId] = reply
+        finally:
+            self._lock.release()
+
+        self._sendLock.acquire()
+        try:
+            sendMessage(self._socket, (requestId, target, method, args))
+        finally:
+            self._sendLock.release()
+
+        done.wait()
+        error, result = reply[1:]
+        if error is None:
+            return result
+        if error == BarrierAborted.__name__:
+            raise BarrierAborted(result)
+        raise RuntimeError("%s.%s failed: %s: %s" % (target, method, error, result))
+
+    def _read(self):
+        while True:
+            try:
+                message = receiveMessage(self._socket)
+            except socket.error:
+                message = None
+            if message is None or message[0] is None:
+                break
+            requestId, error, result = message
+            self._lock.acquire()
+            try:
+                reply = self._pending.pop(requestId)
+            finally:
+                self._lock.release()
+            reply.extend([error, result])
+            reply[0].set()
+
+        # stopped by the Pipeline or the connection was lost: release the
+        # callers still waiting for a reply
+        self._lock.acquire()
+        try:
+            self._closed = True
+            for reply in self._pending.values():
+                reply.extend([BarrierAborted.__name__, "connection to the Pipeline closed"])
+                reply[0].set()
+            self._pending.clear()
+        finally:
+            self._lock.release()
+
+        if self._onStop is not None:
+            self._onStop()
+        else:
+            os.kill(os.getpid(), signal.SIGKILL)
+
+    def close(self):
+        self._socket.close()
+
+class RemoteObject(object):
+    '''Proxy for a Pipeline-side Barrier, WorkQueue or Exchange'''
+
+    def __init__(self, client, target):
+        self._client = client
+        self._target = target
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        def call(*args):
+            return self._client.call(self._target, name, *args)
+        return call
+
+class SliceAgent(object):
+    '''Runs one Slice on behalf of a remote Pipeline'''
+
+    def __init__(self, address, rank=None):
+        """
+        connect to the Pipeline
+        @param address   the Pipeline's SliceServer address
+        @param rank      the rank to ask for, or None for any free rank
+        """
+        self.client = SliceClient(address, rank)
+        self.rank = self.client.rank
+
+    def makeProxies(self, kind, nStages):
+        """
+        return a list with a proxy per stage for which the Pipeline offers
+        an object of the given kind, and None for the other stages
+        """
+        targets = self.client.config["targets"]
+        proxies = []
+        for i in range(nStages):
+            if (kind, i) in targets:
+                proxies.append(RemoteObject(self.client, (kind, i)))
+            else:
+                proxies.append(None)
+        return proxies
+
+    def run(self):
+        # imported here so that the proxies above can be used without the
+        # rest of the harness
+        from lsst.pex.harness.Slice import Slice
+
+        config = self.client.config
+        nStages = config["nStages"]
+
+        name = config["name"]
+        if name is None or name == "None":
+            name = os.path.splitext(os.path.basename(config["pipelinePolicyName"]))[0]
+
+        self.pySlice = Slice(config["runId"], config["pipelinePolicyName"], name, \
+                             self.rank, config["workerId"])
+        if isinstance(config["logthresh"], int):
+            self.pySlice.setLogThreshold(config["logthresh"])
+
+        self.pySlice.setBarrier(RemoteObject(self.client, ("barrier", 0)))
+        stageBarriers = self.makeProxies("stageBarrier", nStages)
+        if stageBarriers[0] is not None:
+            self.pySlice.setStageBarriers(stageBarriers)
+        self.pySlice.setWorkQueues(self.makeProxies("workQueue", nStages))
+        self.pySlice.setExchanges(self.makeProxies("exchange", nStages))
+        self.pySlice.setUniverseSize(config["universeSize"])
+        self.pySlice.setLogDir(config["logdir"])
+
+        self.pySlice.initializeLogger()
+
+        self.pySlice.configureSlice()
+
+        self.pySlice.initializeQueues()
+
+        self.pySlice.initializeStages()
+
+        self.pySlice.startStagesLoop()
+
+        self.pySlice.shutdown()
@@ -0,0 +1,97 @@
+#! /usr/bin/env python
+
+#
+# LSST Data Management System
+# Copyright 2008, 2009, 2010 LSST Corporation.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsst.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+#
+
+
+import multiprocessing
+import os
+from lsst.pex.harness.Slice import Slice
+
+"""
+SliceProcess runs a Slice in its own OS process forked from the Pipeline
+(executionBackend: "process"), so that the parallel processing of different
+Slices is not serialized by a shared interpreter lock.  It is the process
+counterpart of SliceThread and synchronizes with the Pipeline through a
+ProcessBarrier.
+"""
+
+class SliceProcess(multiprocessing.Process):
+
+    def __init__ (self, rank, name, pipelinePolicyName, runId, logthresh, usize, barrier, logdir, workerid, stageBarriers=None, workQueues=None, exchanges=None, eventFanOuts=None, config=None):
+        multiprocessing.Process.__init__(self)
+        self.rank = rank
+        self.sliceName = name
+        self.pipelinePolicyName = pipelinePolicyName
+        self._runId = runId
+        self.logthresh = logthresh
+        self.barrier = barrier
+        self.stageBarriers = stageBarriers
+        self.workQueues = workQueues
+        self.exchanges = exchanges
+        self.eventFanOuts = eventFanOuts
+        self.config = config
+        self.universeSize = usize
+        self.logdir = logdir
+        self.workerId = workerid
+
+    def getPid (self):
+        return self.pid
+
+    def stop (self):
+        self.terminate()
+
+    def run(self):
+
+        name = self.sliceName
+        if name is None or name == "None":
+            name = os.path.splitext(os.path.basename(self.pipelinePolicyName))[0]
+
+        self.pySlice = Slice(self._runId, self.pipelinePolicyName, name, self.rank, self.workerId)
+        if isinstance(self.logthresh, int):
+            self.pySlice.setLogThreshold(self.logthresh)
+
+        self.pySlice.setBarrier(self.barrier)
+        if self.stageBarriers:
+            self.pySlice.setStageBarriers(self.stageBarriers)
+        if self.workQueues:
+            self.pySlice.setWorkQueues(self.workQueues)
+        if self.exchanges:
+            self.pySlice.setExchanges(self.exchanges)
+        if self.eventFanOuts:
+            self.pySlice.setEventFanOuts(self.eventFanOuts)
+        if self.config is not None:
+            self.pySlice.setConfig(self.config)
+        self.pySlice.setUniverseSize(self.universeSize)
+        self.pySlice.setLogDir(self.logdir)
+
+        self.pySlice.initializeLogger()
+
+        self.pySlice.configureSlice()
+
+        self.pySlice.initializeQueues()
+
+        self.pySlice.initializeStages()
+
+        self.pySlice.startStagesLoop()
+
+        self.pySlice.shutdown()
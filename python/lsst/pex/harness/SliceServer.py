@@ -0,0 +1,264 @@
+#! /usr/bin/env python
+
+#
+# LSST Data Management System
+# Copyright 2008, 2009, 2010 LSST Corporation.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsst.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+#
+
+"""
+SliceServer lets Slices run on other hosts (executionBackend: "socket").
+A SliceAgent on each host connects to the Pipeline over TCP or a Unix
+socket and runs one Slice.  On the Pipeline side every agent is represented
+by a RemoteSlice thread, which carries out the agent's calls on the
+Pipeline's own synchronization objects: it waits at the Barrier on behalf of
+its Slice, pulls work items from the WorkQueues and takes part in the
+shareData Exchanges.  The rest of the harness sees the same objects as with
+thread Slices.
+
+Messages are pickled and sent with an 8-byte length prefix.  A request is
+(request id, target, method, arguments) and is answered by
+(request id, error, result).  A message with request id None from the
+Pipeline tells the agent to stop.
+
+Addresses are given as "host:port" or "unix:/path/to/socket".
+"""
+
+import os
+import socket
+import struct
+import sys
+import threading
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+_header = struct.Struct("!Q")
+
+def parseAddress(address):
+    """
+    return the socket family and socket address for an address given as
+    "host:port" or "unix:/path"
+    """
+    if address.startswith("unix:"):
+        return socket.AF_UNIX, address[len("unix:"):]
+    host, sep, port = address.rpartition(":")
+    if not sep:
+        raise RuntimeError("Slice server address must be host:port or unix:path: %s" % address)
+    return socket.AF_INET, (host, int(port))
+
+def sendMessage(sock, message):
+    """
+    send a pickled message preceded by its length
+    """
+    data = pickle.dumps(message, pickle.HIGHEST_PROTOCOL)
+    sock.sendall(_header.pack(len(data)) + data)
+
+def _receiveExactly(sock, size):
+    chunks = []
+    while size > 0:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+def receiveMessage(sock):
+    """
+    receive a message sent with sendMessage(), or return None if the
+    connection was closed
+    """
+    header = _receiveExactly(sock, _header.size)
+    if header is None:
+        return None
+    data = _receiveExactly(sock, _header.unpack(header)[0])
+    if data is None:
+        return None
+    return pickle.loads(data)
+
+def configureSocket(sock):
+    # synchronization round trips are small messages; do not delay them
+    if sock.family == socket.AF_INET:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+class RemoteSlice(threading.Thread):
+    '''The Pipeline's handle on a Slice running in a SliceAgent'''
+
+    # the methods an agent may call on each kind of target
+    METHODS = {
+        "barrier":      ("wait",),
+        "stageBarrier": ("wait",),
+        "workQueue":    ("next", "nextBatch", "putResult"),
+        "exchange":     ("share",),
+    }
+
+    def __init__(self, conn, rank, targets, pid=None, host=None):
+        """
+        @param conn      the connected socket
+        @param rank      the rank assigned to the Slice
+        @param targets   a dictionary of the objects the agent may use,
+                           keyed by (kind, index)
+        @param pid       the process id of the agent
+        @param host      the host the agent runs on
+        """
+        threading.Thread.__init__(self)
+        self.rank = rank
+        self.pid = pid
+        self.host = host
+        self._conn = conn
+        self._targets = targets
+        self._sendLock = threading.Lock()
+
+    def getPid(self):
+        return self.pid
+
+    def run(self):
+        # each request is served in its own thread: with overlapped visits
+        # a Slice may be blocked at several barriers at once
+        try:
+            while True:
+                try:
+                    message = receiveMessage(self._conn)
+                except socket.error:
+                    message = None
+                if message is None:
+                    break
+                server = threading.Thread(target=self._serve, args=message)
+                server.daemon = True
+                server.start()
+        finally:
+            self._conn.close()
+
+    def _serve(self, requestId, target, method, args):
+        try:
+            if method not in self.METHODS.get(target[0], ()):
+                raise RuntimeError("%s not available on %s" % (method, target))
+            result = getattr(self._targets[target], method)(*args)
+            reply = (requestId, None, result)
+        except:
+            reply = (requestId, sys.exc_info()[0].__name__, str(sys.exc_info()[1]))
+        try:
+            self._send(reply)
+        except socket.error:
+            pass
+
+    def _send(self, message):
+        self._sendLock.acquire()
+        try:
+            sendMessage(self._conn, message)
+        finally:
+            self._sendLock.release()
+
+    def stop(self):
+        """
+        tell the agent to stop its Slice
+        """
+        try:
+            self._send( (None, "stop", None) )
+        except socket.error:
+            pass
+
+class SliceServer(object):
+    '''Accepts the connections of SliceAgents'''
+
+    def __init__(self, address="localhost:0"):
+        """
+        listen for agents
+        @param address   "host:port" or "unix:/path"; with port 0 a free
+                           port is chosen (see getAddress())
+        """
+        self.family, sockaddr = parseAddress(address)
+        self._sockaddr = sockaddr
+        self._socket = socket.socket(self.family, socket.SOCK_STREAM)
+        if self.family == socket.AF_INET:
+            self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        elif os.path.exists(sockaddr):
+            os.remove(sockaddr)
+        self._socket.bind(sockaddr)
+        self._socket.listen(128)
+
+    def getAddress(self):
+        """
+        return the address agents should connect to
+        """
+        if self.family == socket.AF_UNIX:
+            return "unix:" + self._socket.getsockname()
+        host, port = self._socket.getsockname()[:2]
+        return "%s:%d" % (host, port)
+
+    def accept(self, nSlices, sliceConfig, targets, timeout=None):
+        """
+        wait for nSlices agents to connect and return their RemoteSlices,
+        ordered by rank.  An agent may ask for a particular rank; the others
+        are given the lowest free rank.
+        @param sliceConfig  a dictionary of the settings sent to every agent
+                              (the rank and available targets are added)
+        @param targets      a dictionary of the objects the agents may use,
+                              keyed by (kind, index)
+        @param timeout      the maximum time in seconds to wait for each
+                              agent, or None to wait indefinitely
+        """
+        slices = [None] * nSlices
+        self._socket.settimeout(timeout)
+        try:
+            while None in slices:
+                try:
+                    conn, peer = self._socket.accept()
+                except socket.timeout:
+                    raise RuntimeError("Timed out waiting for %d Slice agents" % \
+                                       slices.count(None))
+                conn.settimeout(None)
+                configureSocket(conn)
+
+                hello = receiveMessage(conn)
+                if hello is None:
+                    conn.close()
+                    continue
+                requestedRank, pid, host = hello
+
+                if requestedRank is None:
+                    rank = slices.index(None)
+                elif 0 <= requestedRank < nSlices and slices[requestedRank] is None:
+                    rank = requestedRank
+                else:
+                    sendMessage(conn, ("reject", "rank %s is not available" % requestedRank))
+                    conn.close()
+                    continue
+
+                config = dict(sliceConfig)
+                config["rank"] = rank
+                config["targets"] = sorted(targets.keys())
+                sendMessage(conn, ("welcome", config))
+                slices[rank] = RemoteSlice(conn, rank, targets, pid, host)
+        finally:
+            self._socket.settimeout(None)
+        return slices
+
+    def close(self):
+        """
+        stop listening for agents
+        """
+        self._socket.close()
+        if self.family == socket.AF_UNIX:
+            try:
+                os.remove(self._sockaddr)
+            except OSError:
+                pass
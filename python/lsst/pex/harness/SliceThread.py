@@ -30,15 +30,19 @@ from lsst.pex.harness.Slice import Slice
 
 class SliceThread(threading.Thread):
 
-    def __init__ (self, rank, name, pipelinePolicyName, runId, logthresh, usize, eventa, eventb, logdir, workerid):
+    def __init__ (self, rank, name, pipelinePolicyName, runId, logthresh, usize, barrier, logdir, workerid, stageBarriers=None, workQueues=None, exchanges=None, eventFanOuts=None, config=None):
         Thread.__init__(self)
         self.rank = rank
         self.name = name
         self.pipelinePolicyName = pipelinePolicyName
         self._runId = runId
         self.logthresh = logthresh
-        self.eventa = eventa
-        self.eventb = eventb
+        self.barrier = barrier
+        self.stageBarriers = stageBarriers
+        self.workQueues = workQueues
+        self.exchanges = exchanges
+        self.eventFanOuts = eventFanOuts
+        self.config = config
         self.universeSize = usize
         self.logdir = logdir
         self.workerId = workerid
@@ -65,8 +69,17 @@ class SliceThread(threading.Thread):
         if isinstance(self.logthresh, int):
             self.pySlice.setLogThreshold(self.logthresh)
 
-        self.pySlice.setLoopEventA(self.eventa)
-        self.pySlice.setLoopEventB(self.eventb)
+        self.pySlice.setBarrier(self.barrier)
+        if self.stageBarriers:
+            self.pySlice.setStageBarriers(self.stageBarriers)
+        if self.workQueues:
+            self.pySlice.setWorkQueues(self.workQueues)
+        if self.exchanges:
+            self.pySlice.setExchanges(self.exchanges)
+        if self.eventFanOuts:
+            self.pySlice.setEventFanOuts(self.eventFanOuts)
+        if self.config is not None:
+            self.pySlice.setConfig(self.config)
         self.pySlice.setUniverseSize(self.universeSize)
         self.pySlice.setLogDir(self.logdir)
 
@@ -0,0 +1,273 @@
+#! /usr/bin/env python
+
+#
+# LSST Data Management System
+# Copyright 2008, 2009, 2010 LSST Corporation.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsst.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+#
+
+
+"""
+StageCache memoizes the results of stages across runs.  A stage opts in
+with "cacheResults: true" in its "appStage" policy and must then declare
+the Clipboard keys it reads and writes:
+
+   cacheResults: true
+   consumedKeys: "calexp"
+   producedKeys: "sources"
+
+Before the preprocess() of such a stage is applied by the Pipeline, or its
+process() by a Slice, a key is computed from the stage class and the 
+source of its module, the stage policy, the Slice's rank and the values of
+the consumed keys.  If results were stored under that key, the produced 
+entries are put on the Clipboard and the stage is skipped; otherwise the 
+stage runs and its produced entries are stored.  A value that cannot be 
+pickled makes the stage run uncached.  The work items of a dynamically
+dispatched stage are not cached one by one.
+
+The results are kept as files in the directory named by stageCacheDir; 
+once they occupy more than stageCacheSize MB the least recently used are 
+removed.  The directory may be shared by the Pipeline and its Slices.
+"""
+
+import cPickle as pickle
+import hashlib
+import os
+import sys
+import tempfile
+
+# the size of the cache directory, in MB, if stageCacheSize is not set
+DEFAULT_CACHE_SIZE = 1024
+
+def getCachedKeys(stageDefPolicy):
+    """
+    return the (consumedKeys, producedKeys) lists declared by the given 
+    "appStage" policy if it asks for its results to be cached, or None
+    """
+    if not (stageDefPolicy.exists('cacheResults') and stageDefPolicy.getBool('cacheResults')):
+        return None
+    if not (stageDefPolicy.exists('consumedKeys') and stageDefPolicy.exists('producedKeys')):
+        raise RuntimeError("Stage %s: cacheResults requires consumedKeys and producedKeys" % \
+                           stageDefPolicy.getString('name'))
+    return ([key.strip() for key in stageDefPolicy.getStringArray('consumedKeys')],
+            [key.strip() for key in stageDefPolicy.getStringArray('producedKeys')])
+
+def makeCachePlan(executePolicy):
+    """
+    return, for each stage of the pipeline described by the given "execute"
+    policy, the keys returned by getCachedKeys()
+    """
+    return [getCachedKeys(p) for p in executePolicy.getArray("appStage")]
+
+def makeStageCache(executePolicy, cachePlan):
+    """
+    return the StageCache configured by the given "execute" policy, or None
+    if no stage asks for its results to be cached
+    """
+    if not [keys for keys in cachePlan if keys is not None]:
+        return None
+    if not executePolicy.exists('stageCacheDir'):
+        raise RuntimeError("cacheResults requires stageCacheDir")
+    size = DEFAULT_CACHE_SIZE
+    if executePolicy.exists('stageCacheSize'):
+        size = executePolicy.getInt('stageCacheSize')
+    return StageCache(executePolicy.getString('stageCacheDir'), size << 20)
+
+class StageCache(object):
+    '''A size-bounded directory of stage results'''
+
+    def __init__(self, directory, maxBytes=DEFAULT_CACHE_SIZE << 20):
+        """
+        open the cache, creating its directory if necessary
+        @param directory   the directory holding the results
+        @param maxBytes    the largest total size of the results kept
+        """
+        self.directory = directory
+        self.maxBytes = maxBytes
+        if not os.path.isdir(directory):
+            try:
+                os.makedirs(directory)
+            except OSError:
+                # another Slice may have created it meanwhile
+                if not os.path.isdir(directory):
+                    raise
+
+        self._sources = {}
+        self._hits = 0
+        self._misses = 0
+        self._stored = 0
+        self._evicted = 0
+
+    def _getSource(self, cls):
+        # the source of the module defining a stage class, so that editing
+        # the stage invalidates its results
+        name = cls.__module__
+        if name not in self._sources:
+            source = ""
+            path = getattr(sys.modules.get(name), "__file__", None)
+            if path is not None:
+                if path.endswith(".pyc") or path.endswith(".pyo"):
+                    path = path[:-1]
+                try:
+                    f = open(path, "rb")
+                    try:
+                        source = f.read()
+                    finally:
+                        f.close()
+                except IOError:
+                    pass
+            self._sources[name] = source
+        return self._sources[name]
+
+    def makeKey(self, phase, stage, clipboard, consumedKeys):
+        """
+        return the key of the results of applying a stage to a Clipboard,
+        or None if the inputs cannot be hashed
+        @param phase          "preprocess" or "process"
+        @param stage          the SerialProcessing or ParallelProcessing 
+                                instance
+        @param clipboard      the Clipboard the stage is about to be 
+                                applied to
+        @param consumedKeys   the Clipboard keys the stage declares it reads
+        """
+        cls = stage.__class__
+        policy = ""
+        if stage.policy is not None:
+            if hasattr(stage.policy, "toString"):
+                policy = stage.policy.toString()
+            else:
+                policy = repr(stage.policy)
+
+        digest = hashlib.sha1()
+        digest.update("%s\0%s.%s\0" % (phase, cls.__module__, cls.__name__))
+        digest.update(hashlib.sha1(self._getSource(cls)).digest())
+        digest.update("%s\0%d\0%d\0" % (policy, stage.getRank(), stage.getUniverseSize()))
+        try:
+            for key in consumedKeys:
+                if clipboard.contains(key):
+                    value = pickle.dumps(clipboard.get(key), pickle.HIGHEST_PROTOCOL)
+                    digest.update("%s\0%d\0" % (key, len(value)))
+                    digest.update(value)
+                else:
+                    digest.update("%s\0-\0" % key)
+        except Exception:
+            # an input that cannot be pickled
+            return None
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".pickle")
+
+    def get(self, key):
+        """
+        return the stored results as a list of (key, value, isShared) 
+        tuples, or None if there are none
+        """
+        if key is None:
+            return None
+        path = self._path(key)
+        try:
+            f = open(path, "rb")
+            try:
+                results = pickle.load(f)
+            finally:
+                f.close()
+            # mark the results as recently used
+            os.utime(path, None)
+        except (IOError, OSError, EOFError, pickle.UnpicklingError):
+            self._misses += 1
+            return None
+        self._hits += 1
+        return results
+
+    def restore(self, clipboard, results):
+        """
+        put the results returned by get() on the Clipboard
+        """
+        for key, value, isShared in results:
+            clipboard.put(key, value, isShared)
+
+    def put(self, key, clipboard, producedKeys):
+        """
+        store the produced entries of the Clipboard a stage was applied to
+        under the key returned by makeKey().  Return True if they were
+        stored.
+        """
+        if key is None:
+            return False
+        results = []
+        for name in producedKeys:
+            if clipboard.contains(name):
+                results.append( (name, clipboard.get(name), clipboard.isShared(name)) )
+
+        fd, tmpPath = tempfile.mkstemp(".tmp", "", self.directory)
+        try:
+            f = os.fdopen(fd, "wb")
+            try:
+                pickle.dump(results, f, pickle.HIGHEST_PROTOCOL)
+            finally:
+                f.close()
+            os.rename(tmpPath, self._path(key))
+        except Exception:
+            # an output that cannot be pickled, or no room left
+            os.remove(tmpPath)
+            return False
+        self._stored += 1
+        self.evict()
+        return True
+
+    def evict(self):
+        """
+        remove the least recently used results until the rest fit in 
+        maxBytes
+        """
+        entries = []
+        total = 0
+        for name in os.listdir(self.directory):
+            if not name.endswith(".pickle"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append( (st.st_mtime, st.st_size, path) )
+            total += st.st_size
+
+        entries.sort()
+        for mtime, size, path in entries:
+            if total <= self.maxBytes:
+                break
+            try:
+                os.remove(path)
+                self._evicted += 1
+            except OSError:
+                # already removed by another Slice
+                pass
+            total -= size
+
+    def getStats(self):
+        """
+        return the numbers of hits, misses, stored and evicted results as a 
+        dictionary
+        """
+        return {"hits": self._hits,
+                "misses": self._misses,
+                "stored": self._stored,
+                "evicted": self._evicted}
@@ -0,0 +1,108 @@
+#! /usr/bin/env python
+
+#
+# LSST Data Management System
+# Copyright 2008, 2009, 2010 LSST Corporation.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsst.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+#
+
+
+"""
+StageFusion works out which stages may run as one unit.  A stage whose
+serial half is a no-op, that waits for no event, and that neither 
+dispatches its work dynamically nor shares data between Slices only does
+parallel work on the Clipboard it receives.  When fuseStages is true, a 
+run of consecutive such stages (all stateless, or all not) is fused: the
+first stage of the run leads it, and the others run back-to-back after it
+without synchronization points of their own.  In the overlapped loop the
+whole run is executed by the leader's thread, so the Clipboard is not 
+handed between threads inside the run.  Each stage still logs its own 
+stage block.
+
+The Pipeline and every Slice compute the plan from the same policy so that
+they agree on the barriers and threads of each stage.
+"""
+
+from lsst.pex.harness.SyncPlan import isSerialActive, isDynamicDispatch
+
+def isFusable(stageDefPolicy):
+    """
+    return True if the stage described by the given "appStage" policy may
+    be fused with a neighbouring one
+    """
+    if isSerialActive(stageDefPolicy) or isDynamicDispatch(stageDefPolicy):
+        return False
+    if stageDefPolicy.exists('eventTopic') and \
+           stageDefPolicy.getString('eventTopic') != "None":
+        return False
+    if stageDefPolicy.exists('shareData') and stageDefPolicy.getBool('shareData'):
+        return False
+    return True
+
+def isStateless(stageDefPolicy):
+    """
+    return True if the "appStage" policy declares the stage stateless
+    """
+    return stageDefPolicy.exists('stateless') and stageDefPolicy.getBool('stateless')
+
+def makeFusionPlan(executePolicy):
+    """
+    return the fusion plan (see planFusion()) for the pipeline described by
+    the given "execute" policy.  Stages are fused only if fuseStages is 
+    true.
+    """
+    fullStageList = executePolicy.getArray("appStage")
+    fuse = False
+    if executePolicy.exists('fuseStages'):
+        fuse = executePolicy.getBool('fuseStages')
+    if not fuse:
+        return range(1, len(fullStageList)+1)
+
+    return planFusion([isFusable(p) for p in fullStageList],
+                      [isStateless(p) for p in fullStageList])
+
+def planFusion(fusable, stateless):
+    """
+    return, for each stage, the number (starting with 1) of the stage that
+    leads the run it is fused into; a stage that is not fused leads itself
+    @param fusable     for each stage, True if it may be fused
+    @param stateless   for each stage, True if it is declared stateless
+    """
+    plan = []
+    for i in range(len(fusable)):
+        if i > 0 and fusable[i] and fusable[i-1] and stateless[i] == stateless[i-1]:
+            plan.append(plan[i-1])
+        else:
+            plan.append(i+1)
+    return plan
+
+def getFusedStages(plan, iStage):
+    """
+    return the numbers of the stages that the given stage runs, in order:
+    the stage itself followed by the stages fused after it, or an empty 
+    list if the stage is itself fused into an earlier one
+    @param plan     the plan returned by planFusion()
+    @param iStage   the stage number (starting with 1)
+    """
+    if plan[iStage-1] != iStage:
+        return []
+    stages = [iStage]
+    while stages[-1] < len(plan) and plan[stages[-1]] == iStage:
+        stages.append(stages[-1]+1)
+    return stages
@@ -0,0 +1,178 @@
+#! /usr/bin/env python
+
+#
+# LSST Data Management System
+# Copyright 2008, 2009, 2010 LSST Corporation.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsst.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+#
+
+"""
+SyncPlan determines which of the four synchronization points of every
+stage actually protect something.  Each stage is executed as
+
+   [sync] preprocess [sync] process [sync] postprocess [sync]
+
+with preprocess/postprocess run by the Pipeline and process run by the
+Slices.  A barrier is only needed where the work switches from the
+Pipeline to the Slices or back; when one half of a stage is a no-op, the
+barriers around it separate nothing and can be skipped.  The Pipeline and
+every Slice compute the plan from the same policy so that they all agree
+on which barriers to enter.
+
+A stage whose parallel work is dispatched dynamically (dispatch: "dynamic")
+hands its work items to the Slices through a WorkQueue, which already
+orders the Slices' work after preprocess; only the barrier before
+postprocess is kept for such a stage.
+
+A stage fused into the stage before it (see StageFusion) enters no
+barriers at all, even when elision is turned off; it runs within the 
+synchronization epoch of the stage leading its run.
+"""
+
+NOOP_SERIAL = "lsst.pex.harness.stage.NoOpSerialProcessing"
+NOOP_PARALLEL = "lsst.pex.harness.stage.NoOpParallelProcessing"
+
+class SyncPlan(object):
+    '''The set of synchronization points each stage must enter'''
+
+    # the synchronization points within a stage
+    BEFORE_PREPROCESS  = 0
+    AFTER_PREPROCESS   = 1
+    AFTER_PROCESS      = 2
+    AFTER_POSTPROCESS  = 3
+
+    def __init__(self, serialActive, parallelActive, elide=True, dynamic=None,
+                 fused=None):
+        """
+        compute the plan
+        @param serialActive    a list with one boolean per stage that is
+                                 True if the stage has a serial
+                                 (preprocess/postprocess) component
+        @param parallelActive  a list with one boolean per stage that is
+                                 True if the stage has a parallel (process)
+                                 component
+        @param elide           if False, keep all four barriers of every
+                                 stage
+        @param dynamic         an optional list with one boolean per stage
+                                 that is True if the stage dispatches its
+                                 parallel work through a WorkQueue
+        @param fused           an optional list with one boolean per stage
+                                 that is True if the stage is fused into 
+                                 the stage before it
+        """
+        if len(serialActive) != len(parallelActive):
+            raise ValueError("serial and parallel stage lists differ in length")
+        self.nStages = len(serialActive)
+        self.elide = elide
+        if dynamic is None:
+            dynamic = [False] * self.nStages
+
+        if fused is None:
+            fused = [False] * self.nStages
+
+        if not elide:
+            self._plan = [[not fused[i]] * 4 for i in range(self.nStages)]
+            return
+        self._plan = [[False] * 4 for i in range(self.nStages)]
+
+        # the phases that do real work, in execution order, each given as
+        # (side, stage index, barrier protecting its start); the start of 
+        # dynamically dispatched work is protected by its WorkQueue instead
+        phases = []
+        for i in range(self.nStages):
+            if serialActive[i]:
+                phases.append( ("serial", i, self.BEFORE_PREPROCESS) )
+            if parallelActive[i] and (dynamic[i] or fused[i]):
+                phases.append( ("parallel", i, None) )
+            elif parallelActive[i]:
+                phases.append( ("parallel", i, self.AFTER_PREPROCESS) )
+            if serialActive[i]:
+                phases.append( ("serial", i, self.AFTER_PROCESS) )
+
+        # a barrier is required wherever work passes between the Pipeline
+        # and the Slices; the sequence wraps around from one visit to the next
+        for j in range(len(phases)):
+            side, i, point = phases[j]
+            if phases[j-1][0] != side and point is not None:
+                self._plan[i][point] = True
+
+        # always synchronize once per visit so that the Pipeline and the
+        # Slices step through visits together
+        if self.nStages > 0:
+            self._plan[0][self.BEFORE_PREPROCESS] = True
+
+    def needsBarrier(self, iStage, point):
+        """
+        return True if the given synchronization point must be entered
+        @param iStage   the stage number (starting with 1)
+        @param point    one of BEFORE_PREPROCESS, AFTER_PREPROCESS,
+                          AFTER_PROCESS, AFTER_POSTPROCESS
+        """
+        return self._plan[iStage-1][point]
+
+    def getBarrierCount(self):
+        """
+        return the number of barriers entered per visit
+        """
+        return sum([sum(points) for points in self._plan])
+
+def isSerialActive(stageDefPolicy):
+    """
+    return True if the "appStage" policy names a serial class that is not
+    NoOpSerialProcessing
+    """
+    return stageDefPolicy.exists('serialClass') and \
+           stageDefPolicy.getString('serialClass').strip() != NOOP_SERIAL
+
+def isParallelActive(stageDefPolicy):
+    """
+    return True if the "appStage" policy names a parallel class that is not
+    NoOpParallelProcessing
+    """
+    return stageDefPolicy.exists('parallelClass') and \
+           stageDefPolicy.getString('parallelClass').strip() != NOOP_PARALLEL
+
+def isDynamicDispatch(stageDefPolicy):
+    """
+    return True if the "appStage" policy asks for its parallel work to be
+    dispatched dynamically through a WorkQueue (dispatch: "dynamic")
+    """
+    return stageDefPolicy.exists('dispatch') and \
+           stageDefPolicy.getString('dispatch').strip() == "dynamic"
+
+def makeSyncPlan(executePolicy, fusionPlan=None):
+    """
+    create the SyncPlan for the pipeline described by the given "execute"
+    policy.  Barrier elision can be turned off by setting elideBarriers
+    to false.
+    @param fusionPlan   the plan returned by StageFusion.makeFusionPlan(),
+                          if stages may be fused
+    """
+    fullStageList = executePolicy.getArray("appStage")
+    elide = True
+    if executePolicy.exists('elideBarriers'):
+        elide = executePolicy.getBool('elideBarriers')
+
+    fused = None
+    if fusionPlan is not None:
+        fused = [fusionPlan[i] != i+1 for i in range(len(fullStageList))]
+
+    return SyncPlan([isSerialActive(p) for p in fullStageList],
+                    [isParallelActive(p) for p in fullStageList], elide,
+                    [isDynamicDispatch(p) for p in fullStageList], fused)
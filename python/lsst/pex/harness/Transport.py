@@ -0,0 +1,132 @@
+#! /usr/bin/env python
+
+#
+# LSST Data Management System
+# Copyright 2008, 2009, 2010 LSST Corporation.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsst.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+#
+
+
+"""
+Transport serializes Clipboards (or any picklable object) for Slices
+running as OS processes without copying large buffers through the pickle
+stream.  NumPy arrays above a size threshold are written once to a segment
+in shared memory (a file under /dev/shm where available) and replaced in
+the pickle by a reference to it, in the manner of pickle protocol 5
+out-of-band buffers.  The receiver maps each segment and rebuilds the
+array as a view on the mapping, so the data are never copied again and
+never pass through a pipe.
+
+A segment belongs to the receiver once loads() has mapped it: the file is
+unlinked at once (the mapping stays valid), so nothing is left behind when
+the receiver drops the array.  Segments of messages that are never
+received are removed by close().
+
+Arrays are rebuilt writable; the mapping is private to the receiver, so
+changes are not seen by the sender.
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+try:
+    import cPickle as pickle
+    from cStringIO import StringIO as BytesIO
+except ImportError:
+    import pickle
+    from io import BytesIO
+
+# arrays smaller than this many bytes are pickled in-band
+DEFAULT_THRESHOLD = 64 << 10
+
+def _isNumpyArray(value):
+    # recognize an ndarray without importing numpy for pipelines that
+    # never use it
+    return type(value).__module__ == "numpy" and \
+           type(value).__name__ in ("ndarray", "memmap")
+
+class ShmTransport(object):
+    '''Pickling with large NumPy arrays passed out-of-band in shared memory'''
+
+    def __init__(self, threshold=DEFAULT_THRESHOLD, directory=None):
+        """
+        create the transport.  It must be created before the Slice 
+        processes are started, so that they share its directory.
+        @param threshold   the size in bytes from which an array is passed
+                             out-of-band
+        @param directory   where to create the segment directory; by default
+                             /dev/shm, or the system temporary directory if 
+                             /dev/shm does not exist
+        """
+        self.threshold = threshold
+        if directory is None and os.path.isdir("/dev/shm"):
+            directory = "/dev/shm"
+        self.directory = tempfile.mkdtemp(prefix="pexTransport", dir=directory)
+        self._lock = threading.Lock()
+        self._nSegments = 0
+
+    def _segmentPath(self):
+        self._lock.acquire()
+        try:
+            self._nSegments += 1
+            n = self._nSegments
+        finally:
+            self._lock.release()
+        return os.path.join(self.directory, "%d-%d.npy" % (os.getpid(), n))
+
+    def dumps(self, obj):
+        """
+        return the serialized form of an object, writing its large arrays 
+        to shared memory segments
+        """
+        def persistentId(value):
+            if _isNumpyArray(value) and value.nbytes >= self.threshold:
+                import numpy
+                path = self._segmentPath()
+                numpy.save(path, value)
+                return path
+            return None
+
+        f = BytesIO()
+        pickler = pickle.Pickler(f, pickle.HIGHEST_PROTOCOL)
+        pickler.persistent_id = persistentId
+        pickler.dump(obj)
+        return f.getvalue()
+
+    def loads(self, data):
+        """
+        rebuild an object serialized by dumps(), mapping its arrays from 
+        their segments
+        """
+        def persistentLoad(path):
+            import numpy
+            array = numpy.load(path, mmap_mode="c")
+            os.remove(path)
+            return array
+
+        unpickler = pickle.Unpickler(BytesIO(data))
+        unpickler.persistent_load = persistentLoad
+        return unpickler.load()
+
+    def close(self):
+        """
+        remove the segments that were never received
+        """
+        shutil.rmtree(self.directory, True)
@@ -0,0 +1,170 @@
+#! /usr/bin/env python
+
+#
+# LSST Data Management System
+# Copyright 2008, 2009, 2010 LSST Corporation.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsst.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+#
+
+"""
+WorkQueue carries the work items of a dynamically dispatched stage
+(dispatch: "dynamic") from the Pipeline to its Slices.  The Pipeline's
+preprocess() leaves a list of Clipboards on the visit's clipboard; the
+Pipeline submits them, and idle Slices pull the next item until they receive
+the end-of-visit marker.  The processed items are sent back and collected,
+in their original order, before postprocess().
+
+WorkQueue serves Slices running as threads; ProcessWorkQueue serves Slices
+forked as OS processes.  The items are then serialized with a ShmTransport,
+which passes large NumPy arrays through shared memory rather than through 
+the queue's pipe.
+"""
+
+from __future__ import absolute_import
+
+import multiprocessing
+try:
+    import Queue as pyqueue
+except ImportError:
+    import queue as pyqueue
+
+from lsst.pex.harness.Transport import ShmTransport
+
+# the Clipboard keys under which preprocess() leaves the work items and 
+# postprocess() finds the processed items
+WORK_ITEMS_KEY = "workItems"
+WORK_RESULTS_KEY = "workResults"
+
+class WorkQueue(object):
+    '''Shared queue of work items for a dynamically dispatched stage'''
+
+    def __init__(self, nConsumers):
+        """
+        create the queue
+        @param nConsumers   the number of Slices pulling from this queue
+        """
+        self.nConsumers = nConsumers
+        self._items = self._makeQueue()
+        self._results = self._makeQueue()
+
+    def _makeQueue(self):
+        return pyqueue.Queue()
+
+    def _encode(self, clipboard):
+        return clipboard
+
+    def _decode(self, data):
+        return data
+
+    def submit(self, items):
+        """
+        post the work items for one visit followed by one end-of-visit
+        marker per consumer.  Return the number of items posted.
+        @param items    a list of Clipboards
+        """
+        for index, item in enumerate(items):
+            self._items.put( (index, self._encode(item)) )
+        for i in range(self.nConsumers):
+            self._items.put(None)
+        return len(items)
+
+    def next(self):
+        """
+        return the next work item as an (index, Clipboard) tuple, waiting
+        if necessary, or None when the items for this visit are exhausted.
+        """
+        work = self._items.get()
+        if work is None:
+            return None
+        return work[0], self._decode(work[1])
+
+    def nextBatch(self, maxItems):
+        """
+        return up to maxItems work items as a list of (index, Clipboard) 
+        tuples, waiting for the first one only, together with a flag that
+        is True once the items for this visit are exhausted.  The list is
+        empty only when the flag is set.
+        @param maxItems   the largest number of items to return
+        """
+        works = []
+        work = self._items.get()
+        while work is not None:
+            works.append( (work[0], self._decode(work[1])) )
+            if len(works) >= maxItems:
+                return works, False
+            try:
+                work = self._items.get(False)
+            except pyqueue.Empty:
+                return works, False
+        return works, True
+
+    def putResult(self, index, clipboard):
+        """
+        return a processed work item to the Pipeline
+        @param index      the index received with the item from next()
+        @param clipboard  the processed Clipboard
+        """
+        self._results.put( (index, self._encode(clipboard)) )
+
+    def collect(self, nItems):
+        """
+        wait for the given number of processed items and return them as a
+        list in the order they were submitted
+        """
+        results = [None] * nItems
+        for i in range(nItems):
+            index, data = self._results.get()
+            results[index] = self._decode(data)
+        return results
+
+    def close(self):
+        """
+        release the resources held by the queue
+        """
+        pass
+
+class ProcessWorkQueue(WorkQueue):
+    '''Shared queue of work items for Slices running as OS processes'''
+
+    def __init__(self, nConsumers, transport=None):
+        """
+        create the queue.  It must be created before the Slice processes 
+        are started.
+        @param transport   the ShmTransport to serialize the items with; by
+                             default one is created for this queue
+        """
+        WorkQueue.__init__(self, nConsumers)
+        if transport is None:
+            transport = ShmTransport()
+        self.transport = transport
+
+    def _makeQueue(self):
+        return multiprocessing.Queue()
+
+    def _encode(self, clipboard):
+        return self.transport.dumps(clipboard)
+
+    def _decode(self, data):
+        return self.transport.loads(data)
+
+    def close(self):
+        """
+        remove the shared memory segments of items never received
+        """
+        self.transport.close()
@@ -23,6 +23,8 @@
 import os, sys, re
 from Queue import Queue
 from lsst.pex.logging import Log
+from lsst.pex.harness.Coroutine import runCoroutines
+from lsst.pex.harness.Executor import Executor
 
 class StageProcessing(object):
     """
@@ -59,6 +61,8 @@ class StageProcessing(object):
                         this stage is a part of.  If None, a default will
                         be set.
            universeSize   the total number of parallel threads
+           executor  the Executor of the Slice that hosts a parallel 
+                        stage (see ParallelProcessing)
 
         The dictionary may contain other arbitrary data.  In general,
         constructors for specific stage subclasses that provide application
@@ -217,6 +221,9 @@ class SerialProcessing(StageProcessing):
     The container for the serial part of the processing that happens before 
     and after the parallel part.  This processing will happen in the context 
     of a Pipeline.
+
+    preprocess() and postprocess() may be written as generators; they are
+    then driven as coroutines (see lsst.pex.harness.Coroutine).
     """
     
     def __init__(self, policy=None, log=None, eventBroker=None,
@@ -261,7 +268,7 @@ class SerialProcessing(StageProcessing):
         # Don't pop it off because failureStage will then not be able to access it
         # element() gives a reference
         clipboard = self.inputQueue.element()
-        self.preprocess(clipboard)
+        runCoroutines([self.preprocess(clipboard)])
         # Pop it off at this point; a new reference is not needed, so it is a dummy
         dummyClipboard = self.inputQueue.getNextDataset()
         out = Queue()
@@ -289,7 +296,7 @@ class SerialProcessing(StageProcessing):
             # Don't pop it off because failureStage will then not be able to access it 
             # clipboard = queue.getNextDataset()
             clipboard = queue.element()
-            self.postprocess(clipboard)
+            runCoroutines([self.postprocess(clipboard)])
             # Pop it off at this point; a new reference is not needed, so it is a dummy
             dummyClipboard = queue.getNextDataset()
             self.outputQueue.addDataset(clipboard)
@@ -309,6 +316,13 @@ class ParallelProcessing(StageProcessing):
     """
     a container class for the parallel processing part of a pipeline stage.  
     This processing will happen in the context of a Slice.
+
+    process() may be written as a generator; it is then driven as a 
+    coroutine (see lsst.pex.harness.Coroutine), and the coroutines for a
+    batch of clipboards are run together so that their waits overlap.
+
+    Work that fans out within the Slice can be spread over the Slice's 
+    workers with self.executor (see lsst.pex.harness.Executor).
     """
     
     def __init__(self, policy=None, log=None, eventBroker=None,
@@ -335,6 +349,14 @@ class ParallelProcessing(StageProcessing):
                               is initialized.  Default: True.
         """
         StageProcessing.__init__(self, policy, log, eventBroker, sysdata, False)
+
+        # the pool of workers within the Slice, passed in with the system
+        # data so that setup() can use it; outside a Slice the tasks run 
+        # inline
+        self.executor = self.sysdata.get("executor")
+        if self.executor is None:
+            self.executor = Executor()
+
         if callSetup:
             self.setup()
 
@@ -350,11 +372,30 @@ class ParallelProcessing(StageProcessing):
         # Don't pop it off because failureStage will then not be able to access it 
         # clipboard = self.inputQueue.getNextDataset()
         clipboard = self.inputQueue.element()
-        self.process(clipboard)
+        runCoroutines([self.process(clipboard)])
         # Pop it off at this point; a new reference is not needed, so it is a dummy
         dummyClipboard = self.inputQueue.getNextDataset()
         self.outputQueue.addDataset(clipboard)
 
+    def applyProcessBatch(self, count):
+        """
+        apply the processBatch() function to the next count clipboards on 
+        the input queue in a single call, and post them to the output 
+        queue.  The harness calls this for the work items that a 
+        dynamically dispatched stage takes from its WorkQueue together 
+        (see the workBatchSize policy item); a visit's clipboards always 
+        go through applyProcess() one at a time.
+
+        @param count    the number of clipboards to process together
+        """
+        # Leave them on the queue until processed so that failureStage
+        # can still access them
+        clipboards = self.inputQueue.elements()[:count]
+        self.processBatch(clipboards)
+        for clipboard in clipboards:
+            dummyClipboard = self.inputQueue.getNextDataset()
+            self.outputQueue.addDataset(clipboard)
+
     def process(self, clipboard):
         """
         execute the parallel processing part of the stage within one thread 
@@ -362,6 +403,109 @@ class ParallelProcessing(StageProcessing):
         """
         raise RuntimeError("Not Implemented: process()")
 
+    def processBatch(self, clipboards):
+        """
+        execute the parallel processing part of the stage on several 
+        clipboards at once.  This implementation calls process() on each 
+        one in turn, then runs together those calls that returned 
+        coroutines.  A subclass that can do the per-call setup once, or 
+        vectorize across many small work items, may override it.
+
+        @param clipboards   the list of Clipboards to process, in order
+        """
+        runCoroutines([self.process(clipboard) for clipboard in clipboards])
+
+
+class ColumnarParallelProcessing(ParallelProcessing):
+    """
+    a ParallelProcessing subclass for stages that compute on columns of 
+    per-row values, such as the fields of a source list.  A subclass lists 
+    the Clipboard keys it reads in inputColumns and the keys it writes in 
+    outputColumns, and implements processColumns() instead of process().
+
+    Each input column is a sequence (a list or a NumPy array) with one 
+    entry per row.  The columns of all the clipboards handed to 
+    processBatch() are gathered into contiguous NumPy arrays, 
+    processColumns() is called once on them, and the rows of each output
+    column are scattered back to the clipboards they came from.
+    """
+
+    # the Clipboard keys holding the columns that processColumns() reads
+    inputColumns = ()
+
+    # the Clipboard keys under which the columns returned by 
+    # processColumns() are put
+    outputColumns = ()
+
+    def process(self, clipboard):
+        """
+        execute the parallel processing part of the stage on the columns 
+        of a single clipboard.
+
+        @param clipboard   the data to process, packaged as a Clipboard
+        """
+        self.processBatch([clipboard])
+
+    def processBatch(self, clipboards):
+        """
+        gather the input columns of the given clipboards, process them 
+        with a single call to processColumns(), and put the rows of each
+        output column on the clipboard that supplied them.
+
+        @param clipboards   the list of Clipboards to process, in order
+        """
+        import numpy
+
+        if not self.inputColumns:
+            raise RuntimeError("%s: no inputColumns declared" % self.getName())
+
+        columns = {}
+        counts = None
+        for name in self.inputColumns:
+            parts = []
+            for clipboard in clipboards:
+                if not clipboard.contains(name):
+                    raise RuntimeError("%s: input column %s not on the Clipboard" % \
+                                       (self.getName(), name))
+                parts.append(numpy.asarray(clipboard.get(name)))
+            lengths = [len(part) for part in parts]
+            if counts is None:
+                counts = lengths
+            elif lengths != counts:
+                raise RuntimeError("%s: input column %s has %s rows, expected %s" % \
+                                   (self.getName(), name, lengths, counts))
+            if len(parts) == 1:
+                columns[name] = parts[0]
+            else:
+                columns[name] = numpy.concatenate(parts)
+
+        results = self.processColumns(columns)
+
+        offsets = numpy.cumsum(counts)[:-1]
+        nRows = sum(counts)
+        for name in self.outputColumns:
+            if name not in results:
+                raise RuntimeError("%s: processColumns() returned no column %s" % \
+                                   (self.getName(), name))
+            column = numpy.asarray(results[name])
+            if len(column) != nRows:
+                raise RuntimeError("%s: output column %s has %d rows, expected %d" % \
+                                   (self.getName(), name, len(column), nRows))
+            for clipboard, part in zip(clipboards, numpy.split(column, offsets)):
+                clipboard.put(name, part)
+
+    def processColumns(self, columns):
+        """
+        compute the output columns from the input columns.  Each column
+        holds the rows of all the clipboards being processed together.
+
+        @param columns   a dictionary mapping each of inputColumns to a 
+                           NumPy array
+        @return a dictionary mapping each of outputColumns to an array-like
+                  with as many rows as the input columns
+        """
+        raise RuntimeError("Not Implemented: processColumns()")
+
 
 class NoOpSerialProcessing(SerialProcessing):
     """
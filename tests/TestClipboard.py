@@ -51,3 +51,54 @@ except Exception, e:
     # print "Exception " + "args[0] = " + e.args[0] 
     # print "Message is = " + str(e)  
 
+
+# shared entries are tracked as they are put and cleared with the entries
+clip.put("sharedItem", 1, True)
+clip.put("localItem", 2)
+assert clip.getSharedKeys() == ["sharedItem"]
+assert clip.isShared("sharedItem")
+assert not clip.isShared("localItem")
+
+clip.setShared("sharedItem", False)
+clip.setShared("localItem", True)
+assert clip.getSharedKeys() == ["localItem"]
+
+clip.put("localItem", 3)
+assert clip.getSharedKeys() == []
+
+# dictionary protocol
+clip["newItem"] = 4
+assert "newItem" in clip
+assert clip["newItem"] == 4
+assert len(clip) == 4
+assert sorted(clip) == sorted(clip.keys())
+assert ("newItem", 4) in clip.items()
+del clip["newItem"]
+assert not clip.has_key("newItem")
+
+clip.put("sharedItem", 5, True)
+clip.close()
+assert len(clip) == 0
+assert clip.getSharedKeys() == []
+assert clip
+
+# lazy entries are produced on first retrieval only
+calls = []
+def makeValue():
+    calls.append(1)
+    return 6
+clip.putLazy("lazyItem", makeValue)
+clip.putLazy("unusedItem", makeValue)
+assert "lazyItem" in clip
+assert calls == []
+assert sorted(clip.getUnforcedKeys()) == ["lazyItem", "unusedItem"]
+
+assert clip.get("lazyItem") == 6
+assert clip["lazyItem"] == 6
+assert calls == [1]
+assert clip.getUnforcedKeys() == ["unusedItem"]
+
+clip.put("unusedItem", 7)
+assert clip.getUnforcedKeys() == []
+assert calls == [1]
+clip.close()
@@ -0,0 +1,127 @@
+#! /usr/bin/env python
+
+#
+# LSST Data Management System
+# Copyright 2008, 2009, 2010 LSST Corporation.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsst.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+#
+
+"""
+test the lsst.pex.harness.Barrier module
+"""
+import multiprocessing
+import threading
+import time
+import unittest
+
+from lsst.pex.harness.Barrier import Barrier, ProcessBarrier, BarrierAborted
+
+import lsst.utils.tests as tests
+
+class BarrierTestCase(unittest.TestCase):
+
+    def testReuse(self):
+        nSlices = 4
+        nRounds = 50
+        barrier = Barrier(nSlices+1)
+        counts = [0] * nSlices
+        errors = []
+
+        def worker(rank):
+            try:
+                for i in range(nRounds):
+                    counts[rank] += 1
+                    barrier.wait(rank)
+                    # nobody may be more than one round ahead
+                    if min(counts) < i+1:
+                        errors.append((rank, i))
+                    barrier.wait(rank)
+            except Exception, e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker, args=(r,))
+                   for r in range(nSlices)]
+        for t in threads:
+            t.start()
+        for i in range(nRounds):
+            barrier.wait(-1)
+            barrier.wait(-1)
+        for t in threads:
+            t.join()
+
+        self.assertEquals(errors, [])
+        self.assertEquals(barrier.getGeneration(), 2*nRounds)
+
+    def testArrivals(self):
+        barrier = Barrier(2)
+
+        def late():
+            time.sleep(0.05)
+            barrier.wait(7)
+
+        t = threading.Thread(target=late)
+        t.start()
+        arrivals = barrier.wait(-1)
+        t.join()
+
+        self.assertEquals(len(arrivals), 2)
+        self.assertEquals(arrivals[0][0], -1)
+        self.assertEquals(arrivals[-1][0], 7)
+        self.assert_(arrivals[-1][1] >= arrivals[0][1])
+
+    def testAbort(self):
+        barrier = Barrier(2)
+        self.assertRaises(BarrierAborted, barrier.wait, -1, 0.01)
+        self.assert_(barrier.isAborted())
+        self.assertRaises(BarrierAborted, barrier.wait, 0)
+
+    def testProcesses(self):
+        nSlices = 3
+        nRounds = 20
+        barrier = ProcessBarrier(nSlices+1)
+
+        def worker(rank):
+            for i in range(nRounds):
+                barrier.wait(rank)
+
+        procs = [multiprocessing.Process(target=worker, args=(r,))
+                 for r in range(nSlices)]
+        for p in procs:
+            p.start()
+        for i in range(nRounds):
+            arrivals = barrier.wait(-1)
+        for p in procs:
+            p.join()
+
+        self.assertEquals(barrier.getGeneration(), nRounds)
+        self.assertEquals(sorted([r for r, t in arrivals]), range(-1, nSlices))
+
+#-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+
+def suite():
+    """Returns a suite containing all the test cases in this module."""
+    tests.init()
+
+    suites = []
+    suites += unittest.makeSuite(BarrierTestCase)
+
+    return unittest.TestSuite(suites)
+
+if __name__ == "__main__":
+    tests.run(suite())
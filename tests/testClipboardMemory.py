@@ -0,0 +1,132 @@
+#! /usr/bin/env python
+
+#
+# LSST Data Management System
+# Copyright 2008, 2009, 2010 LSST Corporation.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsst.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+#
+
+
+"""
+test the lsst.pex.harness.ClipboardMemory module
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+from lsst.pex.harness.Clipboard import Clipboard
+from lsst.pex.harness.ClipboardMemory import ClipboardMemory
+from lsst.pex.harness.ClipboardMemory import estimateSize, registerSizer
+
+import lsst.utils.tests as tests
+
+class Blob(object):
+    def __init__(self, size):
+        self.size = size
+
+class Pixels(object):
+    def __init__(self, nbytes):
+        self.nbytes = nbytes
+
+class Image(object):
+    # has the accessors of an afw image
+    def __init__(self, nbytes):
+        self.pixels = Pixels(nbytes)
+    def getWidth(self):
+        return 1
+    def getArray(self):
+        return self.pixels
+
+registerSizer(Blob, lambda blob: blob.size)
+
+class ClipboardMemoryTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.scratchDir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.scratchDir, True)
+
+    def testEstimateSize(self):
+        self.assertEquals(estimateSize(Blob(1234)), 1234)
+        self.assertEquals(estimateSize(Pixels(800)), 800)
+        self.assertEquals(estimateSize(Image(400)), 400)
+        self.assertEquals(estimateSize(bytearray(100)), 100)
+
+    def testAccounting(self):
+        clip = Clipboard(ClipboardMemory(0, self.scratchDir))
+        clip.put("a", Blob(100))
+        clip.put("b", Blob(200))
+        clip.put("a", Blob(50))
+        memory = clip.getMemory()
+        self.assertEquals(memory.getSizes(), {"a": 50, "b": 200})
+        self.assertEquals(memory.getStats()["total"], 250)
+        self.assertEquals(memory.getStats()["highWaterMark"], 300)
+        self.assertEquals(memory.getStats()["spilled"], 0)
+
+        clip.remove("b")
+        self.assertEquals(memory.getStats()["total"], 50)
+
+    def testSpill(self):
+        clip = Clipboard(ClipboardMemory(250, self.scratchDir))
+        clip.put("a", Blob(100))
+        clip.put("b", Blob(100))
+        clip.get("a")                    # b is now the least recently used
+        clip.put("c", Blob(100))
+
+        memory = clip.getMemory()
+        self.assert_(memory.isSpilled("b"))
+        self.assert_(not memory.isSpilled("a"))
+        self.assertEquals(memory.getStats()["total"], 200)
+        self.assert_("b" in clip)
+        self.assertEquals(len(os.listdir(self.scratchDir)), 1)
+
+        # reloading b spills a, now the least recently used
+        self.assertEquals(clip.get("b").size, 100)
+        self.assert_(not memory.isSpilled("b"))
+        self.assert_(memory.isSpilled("a"))
+        self.assertEquals(clip["a"].size, 100)
+        self.assertEquals(memory.getStats()["reloaded"], 2)
+        self.assertEquals(memory.getSizes(), {"a": 100, "b": 100, "c": 100})
+
+        clip.close()
+        self.assertEquals(os.listdir(self.scratchDir), [])
+
+    def testUnspillable(self):
+        clip = Clipboard(ClipboardMemory(150, self.scratchDir))
+        clip.put("f", Blob(100))
+        clip.getItem("f").method = lambda: None    # cannot be pickled
+        clip.put("g", Blob(100))
+        self.assert_(not clip.getMemory().isSpilled("f"))
+        self.assertEquals(clip.getMemory().getStats()["spilled"], 0)
+
+#-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+
+def suite():
+    """Returns a suite containing all the test cases in this module."""
+    tests.init()
+
+    suites = []
+    suites += unittest.makeSuite(ClipboardMemoryTestCase)
+
+    return unittest.TestSuite(suites)
+
+if __name__ == "__main__":
+    tests.run(suite())
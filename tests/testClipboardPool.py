@@ -0,0 +1,81 @@
+#! /usr/bin/env python
+
+#
+# LSST Data Management System
+# Copyright 2008, 2009, 2010 LSST Corporation.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsst.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+#
+
+
+"""
+test the lsst.pex.harness.ClipboardPool module
+"""
+import unittest
+
+from lsst.pex.harness.ClipboardPool import ClipboardPool
+
+import lsst.utils.tests as tests
+
+class ClipboardPoolTestCase(unittest.TestCase):
+
+    def testReuse(self):
+        pool = ClipboardPool()
+        clip = pool.acquire()
+        clip.put("a", 1, True)
+        clip.putLazy("b", lambda: 2)
+        pool.release(clip)
+
+        reused = pool.acquire()
+        self.assert_(reused is clip)
+        self.assertEquals(len(reused), 0)
+        self.assertEquals(reused.getSharedKeys(), [])
+        self.assertEquals(reused.getUnforcedKeys(), [])
+
+        stats = pool.getStats()
+        self.assertEquals(stats["hits"], 1)
+        self.assertEquals(stats["misses"], 1)
+        self.assertEquals(stats["released"], 1)
+        self.assertEquals(stats["size"], 0)
+
+    def testMaxsize(self):
+        created = []
+        def factory():
+            created.append(1)
+            return ClipboardPool().factory()
+        pool = ClipboardPool(factory, maxsize=1)
+        clips = [pool.acquire() for i in range(3)]
+        self.assertEquals(len(created), 3)
+        for clip in clips:
+            pool.release(clip)
+        self.assertEquals(pool.getStats()["size"], 1)
+        self.assertEquals(pool.getStats()["dropped"], 2)
+
+#-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+
+def suite():
+    """Returns a suite containing all the test cases in this module."""
+    tests.init()
+
+    suites = []
+    suites += unittest.makeSuite(ClipboardPoolTestCase)
+
+    return unittest.TestSuite(suites)
+
+if __name__ == "__main__":
+    tests.run(suite())
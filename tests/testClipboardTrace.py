@@ -0,0 +1,167 @@
+#! /usr/bin/env python
+
+#
+# LSST Data Management System
+# Copyright 2008, 2009, 2010 LSST Corporation.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsst.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+#
+
+
+"""
+test the lsst.pex.harness.ClipboardTrace module
+"""
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from lsst.pex.harness.ClipboardTrace import ClipboardTracer, TracingClipboard
+from lsst.pex.harness.Queue import Queue
+from lsst.pex.harness.EventWaiter import EventFanOut
+from lsst.pex.harness.Pipeline import Pipeline
+from lsst.pex.harness.Slice import Slice
+from lsst.pex.logging import Log, BlockTimingLog
+import lsst.daf.base as dafBase
+
+import lsst.utils.tests as tests
+
+class ClipboardTraceTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.tracer = ClipboardTracer(os.path.join(self.directory, "trace"), 
+                                      0, ["isr", "detect", "measure"])
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, True)
+
+    def runVisit(self, visit):
+        clip = TracingClipboard(self.tracer)
+        self.tracer.setContext(visit, None)
+        clip.put("event", {"visitId": visit})
+
+        self.tracer.setContext(visit, 1)
+        clip.get("event")
+        clip.put("exposure", "pixels")
+
+        self.tracer.setContext(visit, 2)
+        clip["exposure"]
+        clip.put("sources", [1, 2, 3])
+        clip.get("optional")
+
+        self.tracer.setContext(visit, 3)
+        clip.get("exposure")
+        clip.get("sources")
+        clip.close()
+
+    def testGraph(self):
+        self.runVisit(1)
+        self.runVisit(2)
+        graph = self.tracer.getGraph()
+        edges = dict([((e["from"], e["to"]), e["keys"]) for e in graph["edges"]])
+        self.assertEquals(edges, {("harness", "1:isr"): ["event"],
+                                  ("1:isr", "2:detect"): ["exposure"],
+                                  ("1:isr", "3:measure"): ["exposure"],
+                                  ("2:detect", "3:measure"): ["sources"]})
+        self.assertEquals(graph["keys"]["exposure"], {"puts": 2, "gets": 4})
+        self.assertEquals(graph["keys"]["optional"], {"puts": 0, "gets": 2})
+
+    def testFiles(self):
+        self.runVisit(1)
+        self.tracer.close()
+        prefix = os.path.join(self.directory, "trace")
+
+        records = [json.loads(line) for line in open(prefix + ".records.json")]
+        self.assertEquals(len(records), 8)
+        self.assertEquals(records[2]["op"], "put")
+        self.assertEquals(records[2]["key"], "exposure")
+        self.assertEquals(records[2]["stage"], 1)
+        self.assertEquals(records[2]["type"], "str")
+        self.assertEquals(records[2]["size"] > 0, True)
+        self.assertEquals(records[5]["op"], "miss")
+
+        graph = json.load(open(prefix + ".graph.json"))
+        self.assertEquals(len(graph["edges"]), 4)
+        dot = open(prefix + ".dot").read()
+        self.assert_('"1:isr" -> "2:detect" [label="exposure"];' in dot)
+
+class HarnessTraceTestCase(unittest.TestCase):
+    """
+    trace the payload of a triggering event as the Pipeline and a Slice put
+    it on their Clipboards at the start of a stage
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.log = BlockTimingLog(Log.getDefaultLog(), "testClipboardTrace")
+        self.fanOut = EventFanOut(1)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, True)
+
+    def prepare(self, runner, rank):
+        runner.log = self.log
+        runner.clipboardTracer = ClipboardTracer( \
+            os.path.join(self.directory, "trace%d" % rank), rank, ["isr"])
+        runner.queueList = [Queue()]
+        runner.queueList[0].addDataset(TracingClipboard(runner.clipboardTracer))
+        runner.releaseList = [[]]
+        runner.eventTopicList = ["trigger"]
+        runner.eventFanOutList = [self.fanOut]
+        return runner.queueList[0].element()
+
+    def assertEventEdge(self, runner, clipboard):
+        self.assertEquals(runner.clipboardTracer.getContext(), (1, 1))
+        self.assertEquals(clipboard.get("trigger").getInt("visitId"), 7)
+        graph = runner.clipboardTracer.getGraph()
+        edges = [(e["from"], e["to"], e["keys"]) for e in graph["edges"]]
+        self.assertEquals(edges, [("harness", "1:isr", ["trigger"])])
+
+    def testPipelineAndSlice(self):
+        payload = dafBase.PropertySet()
+        payload.setInt("visitId", 7)
+
+        pipeline = Pipeline("trace", "trace_policy.paf", "trace")
+        pipelineClipboard = self.prepare(pipeline, -1)
+        pipeline.waitForEvent = lambda topic: payload
+        pipeline.beginStage(1, 1, self.log)
+        self.assertEventEdge(pipeline, pipelineClipboard)
+
+        # the Pipeline handed the event on to the Slice
+        slice = Slice("trace", "trace_policy.paf", "trace", 0)
+        sliceClipboard = self.prepare(slice, 0)
+        slice.sliceEventTopicList = ["trigger_trace"]
+        slice.beginStage(1, 1, self.log)
+        self.assertEventEdge(slice, sliceClipboard)
+
+#-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+
+def suite():
+    """Returns a suite containing all the test cases in this module."""
+    tests.init()
+
+    suites = []
+    suites += unittest.makeSuite(ClipboardTraceTestCase)
+    suites += unittest.makeSuite(HarnessTraceTestCase)
+
+    return unittest.TestSuite(suites)
+
+if __name__ == "__main__":
+    tests.run(suite())
@@ -0,0 +1,115 @@
+#! /usr/bin/env python
+
+#
+# LSST Data Management System
+# Copyright 2008, 2009, 2010 LSST Corporation.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsst.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+#
+
+
+"""
+test lsst.pex.harness.stage.ColumnarParallelProcessing
+"""
+import unittest
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from lsst.pex.harness.Queue import Queue
+from lsst.pex.harness.Clipboard import Clipboard
+from lsst.pex.harness.stage import ColumnarParallelProcessing
+
+import lsst.utils.tests as tests
+
+class OffsetStage(ColumnarParallelProcessing):
+
+    inputColumns = ("ra", "dec")
+    outputColumns = ("sep",)
+
+    def setup(self):
+        self.calls = []
+
+    def processColumns(self, columns):
+        self.calls.append(len(columns["ra"]))
+        return {"sep": numpy.hypot(columns["ra"] - 10.0, columns["dec"])}
+
+def makeClipboard(ra, dec):
+    clipboard = Clipboard()
+    clipboard.put("ra", ra)
+    clipboard.put("dec", dec)
+    return clipboard
+
+class ColumnarTestCase(unittest.TestCase):
+
+    def testSingle(self):
+        if numpy is None:
+            return
+        stage = OffsetStage()
+        clipboard = makeClipboard([13.0, 10.0], [4.0, -2.0])
+        stage.process(clipboard)
+        self.assertEquals(list(clipboard.get("sep")), [5.0, 2.0])
+
+    def testBatch(self):
+        if numpy is None:
+            return
+        stage = OffsetStage()
+        inQueue = Queue()
+        inQueue.addDataset(makeClipboard([13.0], [4.0]))
+        inQueue.addDataset(makeClipboard([], []))
+        inQueue.addDataset(makeClipboard(numpy.array([10.0, 11.0]),
+                                         numpy.array([1.0, 0.0])))
+        outQueue = Queue()
+        stage.initialize(outQueue, inQueue)
+        stage.applyProcessBatch(3)
+
+        # one kernel call over the rows of all three clipboards
+        self.assertEquals(stage.calls, [3])
+        seps = [list(c.get("sep")) for c in outQueue.elements()]
+        self.assertEquals(seps, [[5.0], [], [1.0, 1.0]])
+
+    def testErrors(self):
+        if numpy is None:
+            return
+        stage = OffsetStage()
+        clipboard = Clipboard()
+        clipboard.put("ra", [1.0])
+        self.assertRaises(RuntimeError, stage.process, clipboard)
+
+        clipboard = makeClipboard([1.0, 2.0], [1.0])
+        self.assertRaises(RuntimeError, stage.process, clipboard)
+
+        stage.processColumns = lambda columns: {"sep": [0.0]}
+        clipboard = makeClipboard([1.0, 2.0], [1.0, 2.0])
+        self.assertRaises(RuntimeError, stage.process, clipboard)
+        self.assertFalse(clipboard.contains("sep"))
+
+#-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+
+def suite():
+    """Returns a suite containing all the test cases in this module."""
+    tests.init()
+
+    suites = []
+    suites += unittest.makeSuite(ColumnarTestCase)
+
+    return unittest.TestSuite(suites)
+
+if __name__ == "__main__":
+    tests.run(suite())
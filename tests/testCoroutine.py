@@ -0,0 +1,155 @@
+#! /usr/bin/env python
+
+#
+# LSST Data Management System
+# Copyright 2008, 2009, 2010 LSST Corporation.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsst.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+#
+
+
+"""
+test the lsst.pex.harness.Coroutine module and coroutine stages
+"""
+import time
+import unittest
+
+from lsst.pex.harness.Coroutine import Future, CoroutineLoop, runInThread, runCoroutines
+from lsst.pex.harness.Queue import Queue
+from lsst.pex.harness.Clipboard import Clipboard
+from lsst.pex.harness.stage import SerialProcessing, ParallelProcessing
+
+import lsst.utils.tests as tests
+
+def slowSquare(x, delay=0.2):
+    time.sleep(delay)
+    return x * x
+
+def fail():
+    raise ValueError("failed in thread")
+
+class WaitingStage(ParallelProcessing):
+
+    def process(self, clipboard):
+        y = yield runInThread(slowSquare, clipboard.get("x"))
+        clipboard.put("y", y)
+
+class WaitingSerialStage(SerialProcessing):
+
+    def preprocess(self, clipboard):
+        yield 0.01
+        clipboard.put("pre", True)
+
+    def postprocess(self, clipboard):
+        clipboard.put("post", True)
+
+class CoroutineTestCase(unittest.TestCase):
+
+    def testFuture(self):
+        self.assertEquals(runInThread(slowSquare, 3, 0).result(5), 9)
+        self.assertRaises(ValueError, runInThread(fail).result, 5)
+        future = Future()
+        self.assert_(not future.done())
+        self.assertRaises(RuntimeError, future.result, 0.01)
+
+    def testOverlap(self):
+        results = []
+        def square(x):
+            y = yield runInThread(slowSquare, x)
+            results.append(y)
+
+        start = time.time()
+        runCoroutines([square(2), None, square(3), square(4)])
+        self.assert_(time.time() - start < 0.5)
+        self.assertEquals(sorted(results), [4, 9, 16])
+
+    def testYields(self):
+        order = []
+        def sleeper(name, delay):
+            yield delay
+            order.append(name)
+        def gatherer():
+            values = yield [runInThread(slowSquare, i, 0.01) for i in range(3)]
+            yield
+            order.append(values)
+
+        loop = CoroutineLoop()
+        loop.spawn(sleeper("late", 0.1))
+        loop.spawn(sleeper("early", 0.05))
+        loop.spawn(gatherer())
+        loop.run()
+        self.assertEquals(order, [[0, 1, 4], "early", "late"])
+
+    def testFailure(self):
+        closed = []
+        def waiter():
+            try:
+                yield 10
+            finally:
+                closed.append(True)
+        def failing():
+            yield runInThread(fail)
+
+        start = time.time()
+        self.assertRaises(ValueError, runCoroutines, [waiter(), failing()])
+        self.assert_(time.time() - start < 5)
+        self.assertEquals(closed, [True])
+
+        def badWait():
+            yield "nothing"
+        self.assertRaises(RuntimeError, runCoroutines, [badWait()])
+
+    def testParallelStage(self):
+        stage = WaitingStage()
+        inQueue = Queue()
+        for x in range(4):
+            clipboard = Clipboard()
+            clipboard.put("x", x)
+            inQueue.addDataset(clipboard)
+        outQueue = Queue()
+        stage.initialize(outQueue, inQueue)
+
+        # the waits of the four clipboards overlap
+        start = time.time()
+        stage.applyProcessBatch(4)
+        self.assert_(time.time() - start < 0.6)
+        self.assertEquals([c.get("y") for c in outQueue.elements()], [0, 1, 4, 9])
+
+    def testSerialStage(self):
+        stage = WaitingSerialStage()
+        inQueue = Queue()
+        inQueue.addDataset(Clipboard())
+        stage.initialize(Queue(), inQueue)
+        interQueue = stage.applyPreprocess()
+        self.assert_(interQueue.element().get("pre"))
+        stage.applyPostprocess(interQueue)
+        self.assert_(stage.outputQueue.element().get("post"))
+
+#-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+
+def suite():
+    """Returns a suite containing all the test cases in this module."""
+    tests.init()
+
+    suites = []
+    suites += unittest.makeSuite(CoroutineTestCase)
+
+    return unittest.TestSuite(suites)
+
+if __name__ == "__main__":
+    tests.run(suite())
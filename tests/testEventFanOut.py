@@ -0,0 +1,84 @@
+#! /usr/bin/env python
+
+#
+# LSST Data Management System
+# Copyright 2008, 2009, 2010 LSST Corporation.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsst.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+#
+
+"""
+test the EventFanOut class of the lsst.pex.harness.EventWaiter module
+"""
+import threading
+import unittest
+
+from lsst.daf.base import PropertySet
+from lsst.pex.harness.EventWaiter import EventFanOut
+
+import lsst.utils.tests as tests
+
+class EventFanOutTestCase(unittest.TestCase):
+
+    def testFanOut(self):
+        nSlices = 3
+        fanOut = EventFanOut(nSlices)
+        received = [None] * nSlices
+
+        def slice(rank):
+            received[rank] = fanOut.receive(rank)
+
+        threads = [threading.Thread(target=slice, args=(r,))
+                   for r in range(nSlices)]
+        for t in threads:
+            t.start()
+
+        ps = PropertySet()
+        ps.setInt("visitId", 85408)
+        fanOut.publish(ps)
+        for t in threads:
+            t.join()
+
+        # every Slice gets its own copy of the payload
+        for rank in range(nSlices):
+            self.assertEquals(received[rank].getInt("visitId"), 85408)
+            self.assert_(received[rank] is not ps)
+        self.assert_(received[0] is not received[1])
+
+    def testOrder(self):
+        fanOut = EventFanOut(1)
+        for i in range(5):
+            ps = PropertySet()
+            ps.setInt("i", i)
+            fanOut.publish(ps)
+        self.assertEquals([fanOut.receive(0).getInt("i") for i in range(5)],
+                          range(5))
+
+#-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+
+def suite():
+    """Returns a suite containing all the test cases in this module."""
+    tests.init()
+
+    suites = []
+    suites += unittest.makeSuite(EventFanOutTestCase)
+
+    return unittest.TestSuite(suites)
+
+if __name__ == "__main__":
+    tests.run(suite())
@@ -0,0 +1,121 @@
+#! /usr/bin/env python
+
+#
+# LSST Data Management System
+# Copyright 2008, 2009, 2010 LSST Corporation.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsst.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+#
+
+"""
+test the lsst.pex.harness.Exchange module
+"""
+import multiprocessing
+import os
+import threading
+import unittest
+
+from lsst.pex.harness.Exchange import Exchange, ProcessExchange
+from lsst.pex.harness.Exchange import ALL_GATHER, RING, COUNTERCLOCKWISE
+
+import lsst.utils.tests as tests
+
+def runSlices(exchange, nRounds, results):
+    def worker(rank):
+        for i in range(nRounds):
+            received = exchange.share(rank, {"rankKey": (rank, i)})
+            results[rank].append(received)
+
+    threads = [threading.Thread(target=worker, args=(r,))
+               for r in range(exchange.nSlices)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+class ExchangeTestCase(unittest.TestCase):
+
+    def testRing(self):
+        nSlices = 4
+        exchange = Exchange(nSlices)
+        self.assertEquals(exchange.getSources(0), [3])
+        self.assertEquals(exchange.getSources(2), [1])
+
+        results = [[] for r in range(nSlices)]
+        runSlices(exchange, 10, results)
+        for rank in range(nSlices):
+            source = (rank - 1) % nSlices
+            for i, received in enumerate(results[rank]):
+                self.assertEquals(received, {"rankKey-%d" % source: (source, i)})
+
+    def testCounterclockwise(self):
+        exchange = Exchange(3, RING, COUNTERCLOCKWISE)
+        self.assertEquals(exchange.getSources(2), [0])
+        self.assertEquals(exchange.getSources(0), [1])
+
+    def testAllGather(self):
+        nSlices = 3
+        exchange = Exchange(nSlices, ALL_GATHER)
+        results = [[] for r in range(nSlices)]
+        runSlices(exchange, 5, results)
+        self.assertEquals(sorted(results[1][4].keys()), ["rankKey-0", "rankKey-2"])
+        self.assertEquals(results[1][4]["rankKey-2"], (2, 4))
+
+    def testBadTopology(self):
+        self.assertRaises(RuntimeError, Exchange, 3, "torus")
+
+    def testProcesses(self):
+        nSlices = 3
+        nRounds = 5
+        exchange = ProcessExchange(nSlices)
+        output = multiprocessing.Queue()
+
+        def worker(rank):
+            for i in range(nRounds):
+                received = exchange.share(rank, {"rankKey": (rank, i)})
+            output.put((rank, received))
+
+        procs = [multiprocessing.Process(target=worker, args=(r,))
+                 for r in range(nSlices)]
+        for p in procs:
+            p.start()
+        results = dict([output.get() for p in procs])
+        for p in procs:
+            p.join()
+
+        self.assertEquals(results[0], {"rankKey-2": (2, nRounds-1)})
+        self.assertEquals(results[1], {"rankKey-0": (0, nRounds-1)})
+
+        # only the postings of the last two exchanges are kept
+        self.assertEquals(len(os.listdir(exchange.directory)), 2*nSlices)
+        exchange.close()
+        self.assert_(not os.path.exists(exchange.directory))
+
+#-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+
+def suite():
+    """Returns a suite containing all the test cases in this module."""
+    tests.init()
+
+    suites = []
+    suites += unittest.makeSuite(ExchangeTestCase)
+
+    return unittest.TestSuite(suites)
+
+if __name__ == "__main__":
+    tests.run(suite())
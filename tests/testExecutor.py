@@ -0,0 +1,150 @@
+#! /usr/bin/env python
+
+#
+# LSST Data Management System
+# Copyright 2008, 2009, 2010 LSST Corporation.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsst.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+#
+
+
+"""
+test the lsst.pex.harness.Executor module
+"""
+import cPickle
+import multiprocessing
+import multiprocessing.pool
+import time
+import unittest
+
+from lsst.pex.harness.Executor import Executor, getWorkerCount
+from lsst.pex.harness.Coroutine import runCoroutines
+from lsst.pex.harness.stage import ParallelProcessing
+
+import lsst.utils.tests as tests
+
+def slowSquare(x):
+    time.sleep(0.1)
+    return x * x
+
+def checkPositive(x):
+    if x < 0:
+        raise ValueError("negative: %d" % x)
+    return x
+
+def makeClosure(x):
+    return lambda: x
+
+class SetupStage(ParallelProcessing):
+    """a stage that already uses its Executor in setup()"""
+
+    def setup(self):
+        self.setupExecutor = self.executor
+        self.table = self.executor.map(checkPositive, [1, 2])
+
+class ExecutorTestCase(unittest.TestCase):
+
+    def testWorkerCount(self):
+        self.assertEquals(getWorkerCount(3, 100), 3)
+        self.assertEquals(getWorkerCount(0, 1), multiprocessing.cpu_count())
+        self.assertEquals(getWorkerCount(0, 10000), 1)
+
+    def testInline(self):
+        executor = Executor()
+        self.assertEquals(executor.map(checkPositive, [3, 1, 2]), [3, 1, 2])
+        self.assertEquals(executor.submit(checkPositive, 5).result(), 5)
+        self.assertEquals(executor.getStats()["tasks"], 4)
+
+        # a stage works with its default Executor outside a Slice
+        stage = ParallelProcessing()
+        self.assertEquals(stage.executor.map(checkPositive, [1]), [1])
+
+    def testStageSetup(self):
+        # the Slice passes its Executor in with the system data, so that
+        # setup() runs on the Slice's workers too
+        executor = Executor(2)
+        stage = SetupStage(sysdata={"rank": 0, "executor": executor})
+        self.assert_(stage.setupExecutor is executor)
+        self.assert_(stage.executor is executor)
+        self.assertEquals(stage.table, [1, 2])
+        self.assertEquals(executor.getStats()["tasks"], 2)
+        executor.close()
+
+    def testThreads(self):
+        executor = Executor(4)
+        start = time.time()
+        self.assertEquals(executor.map(slowSquare, range(8)), [x*x for x in range(8)])
+        self.assert_(time.time() - start < 0.6)
+
+        stats = executor.getStats()
+        self.assertEquals(stats["tasks"], 8)
+        self.assert_(stats["busyTime"] >= 0.8)
+        self.assert_(stats["longest"] >= 0.1)
+        executor.close()
+
+    def testFailure(self):
+        executor = Executor(2)
+        self.assertRaises(ValueError, executor.map, checkPositive, [1, -2, 3, -4])
+        stats = executor.getStats()
+        self.assertEquals((stats["tasks"], stats["failed"]), (4, 2))
+        self.assertRaises(ValueError, executor.submit(checkPositive, -1).result, 5)
+        executor.close()
+
+    def testSubmitFromCoroutine(self):
+        executor = Executor(4)
+        results = []
+        def measure(x):
+            y = yield executor.submit(slowSquare, x)
+            results.append(y)
+
+        start = time.time()
+        runCoroutines([measure(x) for x in range(4)])
+        self.assert_(time.time() - start < 0.35)
+        self.assertEquals(sorted(results), [0, 1, 4, 9])
+        executor.close()
+
+    def testProcesses(self):
+        executor = Executor(2, "process")
+        self.assertEquals(executor.map(checkPositive, range(5)), range(5))
+        self.assertRaises(ValueError, executor.map, checkPositive, [0, -1])
+        self.assertEquals(executor.submit(checkPositive, 7).result(10), 7)
+
+        # a task or result that cannot be pickled fails its Future rather 
+        # than leaving it pending
+        self.assertRaises(cPickle.PicklingError, 
+                          executor.submit(lambda x: x, 1).result, 10)
+        self.assertRaises(multiprocessing.pool.MaybeEncodingError, 
+                          executor.submit(makeClosure, 1).result, 10)
+        self.assertEquals(executor.submit(checkPositive, 8).result(10), 8)
+        executor.close()
+
+        self.assertRaises(RuntimeError, Executor, 2, "cluster")
+
+#-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+
+def suite():
+    """Returns a suite containing all the test cases in this module."""
+    tests.init()
+
+    suites = []
+    suites += unittest.makeSuite(ExecutorTestCase)
+
+    return unittest.TestSuite(suites)
+
+if __name__ == "__main__":
+    tests.run(suite())
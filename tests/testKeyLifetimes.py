@@ -0,0 +1,69 @@
+#! /usr/bin/env python
+
+#
+# LSST Data Management System
+# Copyright 2008, 2009, 2010 LSST Corporation.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsst.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+#
+
+
+"""
+test the lsst.pex.harness.KeyLifetimes module
+"""
+import unittest
+
+from lsst.pex.harness.KeyLifetimes import planReleases
+
+import lsst.utils.tests as tests
+
+class KeyLifetimesTestCase(unittest.TestCase):
+
+    def testDeclared(self):
+        plan = planReleases([set(["raw"]), 
+                             set(["raw", "calexp"]),
+                             set(["calexp", "sources"]),
+                             set(["sources"])])
+        self.assertEquals(plan, [[], ["raw"], ["calexp"], []])
+
+    def testUndeclaredStage(self):
+        # stage 3 declares nothing, so it may still read raw and calexp
+        plan = planReleases([set(["raw"]), 
+                             set(["raw", "calexp"]),
+                             None,
+                             set(["sources"]),
+                             set(["sources"])])
+        self.assertEquals(plan, [[], [], ["calexp", "raw"], [], []])
+
+    def testNothingDeclared(self):
+        self.assertEquals(planReleases([None, None]), [[], []])
+        self.assertEquals(planReleases([]), [])
+
+#-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+
+def suite():
+    """Returns a suite containing all the test cases in this module."""
+    tests.init()
+
+    suites = []
+    suites += unittest.makeSuite(KeyLifetimesTestCase)
+
+    return unittest.TestSuite(suites)
+
+if __name__ == "__main__":
+    tests.run(suite())
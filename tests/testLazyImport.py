@@ -0,0 +1,68 @@
+#! /usr/bin/env python
+
+#
+# LSST Data Management System
+# Copyright 2008, 2009, 2010 LSST Corporation.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsst.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+#
+
+
+"""
+test the lsst.pex.harness.LazyImport module
+"""
+import sys
+import unittest
+
+from lsst.pex.harness.LazyImport import lazyImport
+
+import lsst.utils.tests as tests
+
+class LazyImportTestCase(unittest.TestCase):
+
+    def testFirstUse(self):
+        # a module this process has not needed yet
+        name = "wave"
+        if name in sys.modules:
+            del sys.modules[name]
+
+        wave = lazyImport(name)
+        self.assert_(not wave.isLoaded())
+        self.assert_(name not in sys.modules)
+
+        self.assert_(wave.Error is sys.modules[name].Error)
+        self.assert_(wave.isLoaded())
+        self.assert_(wave.getModule() is sys.modules[name])
+
+    def testMissing(self):
+        missing = lazyImport("lsst.pex.harness.noSuchModule")
+        self.assertRaises(ImportError, getattr, missing, "anything")
+
+#-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+
+def suite():
+    """Returns a suite containing all the test cases in this module."""
+    tests.init()
+
+    suites = []
+    suites += unittest.makeSuite(LazyImportTestCase)
+
+    return unittest.TestSuite(suites)
+
+if __name__ == "__main__":
+    tests.run(suite())
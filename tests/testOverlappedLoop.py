@@ -0,0 +1,266 @@
+#! /usr/bin/env python
+
+#
+# LSST Data Management System
+# Copyright 2008, 2009, 2010 LSST Corporation.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsst.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+#
+
+
+"""
+test the overlapped visit loop (visitDepth > 1) of lsst.pex.harness.Pipeline
+and Slice, running the Slices as threads
+"""
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from lsst.pex.harness.Pipeline import Pipeline
+from lsst.pex.harness.stage import SerialProcessing, ParallelProcessing
+
+import lsst.utils.tests as tests
+
+# (stage, rank, visit) for every call to process(), and (0, -1, visit) for
+# every call to preprocess(), in the order of the calls
+processed = []
+processedLock = threading.Lock()
+
+class SlowSerialStage(SerialProcessing):
+    """
+    hold the Slices at the first stage long enough for the next visit's 
+    Clipboard to be queued behind the current one
+    """
+
+    def setup(self):
+        self.visit = 0
+
+    def preprocess(self, clipboard):
+        time.sleep(0.05)
+        self.visit += 1
+        with processedLock:
+            processed.append((0, -1, self.visit))
+
+    def postprocess(self, clipboard):
+        pass
+
+class CountingStage(ParallelProcessing):
+    """number the visits a Slice sees"""
+
+    def setup(self):
+        self.visit = 0
+
+    def process(self, clipboard):
+        self.visit += 1
+        clipboard.put("visit", self.visit)
+        with processedLock:
+            processed.append((1, self.getRank(), self.visit))
+
+class RecordingStage(ParallelProcessing):
+    """record the visit number the Clipboard carries"""
+
+    def process(self, clipboard):
+        with processedLock:
+            processed.append((2, self.getRank(), clipboard.get("visit")))
+
+# the visits on which the stages below raise
+SERIAL_FAILURE = 3
+PARALLEL_FAILURE = 4
+
+class FailingSerialStage(SlowSerialStage):
+    """number the visits on the Pipeline's Clipboard, failing on one"""
+
+    def preprocess(self, clipboard):
+        SlowSerialStage.preprocess(self, clipboard)
+        clipboard.put("visit", self.visit)
+        if self.visit == SERIAL_FAILURE:
+            raise RuntimeError("preprocess failed on visit %d" % self.visit)
+
+class FailingStage(CountingStage):
+    """number the visits a Slice sees, failing on one"""
+
+    def process(self, clipboard):
+        CountingStage.process(self, clipboard)
+        if self.visit == PARALLEL_FAILURE:
+            raise RuntimeError("process failed on visit %d" % self.visit)
+
+class RecordingSerialStage(SerialProcessing):
+    """record the visit number the Pipeline's Clipboard carries"""
+
+    def preprocess(self, clipboard):
+        with processedLock:
+            processed.append((3, -1, clipboard.get("visit")))
+
+    def postprocess(self, clipboard):
+        pass
+
+POLICY = """
+nSlices: %(nSlices)d
+visitDepth: 2
+localLogMode: false
+eventBrokerHost: "localhost"
+
+appStage: {
+     name: "count"
+     serialClass: "%(module)s.SlowSerialStage"
+     parallelClass: "%(module)s.CountingStage"
+     eventTopic: "None"
+     stateless: true
+}
+
+appStage: {
+     name: "record"
+     parallelClass: "%(module)s.RecordingStage"
+     eventTopic: "None"
+     stateless: true
+}
+"""
+
+FAILURE_POLICY = """
+nSlices: %(nSlices)d
+visitDepth: 2
+localLogMode: false
+eventBrokerHost: "localhost"
+
+appStage: {
+     name: "fail"
+     serialClass: "%(module)s.FailingSerialStage"
+     parallelClass: "%(module)s.FailingStage"
+     eventTopic: "None"
+     stateless: true
+}
+
+appStage: {
+     name: "record"
+     serialClass: "%(module)s.RecordingSerialStage"
+     parallelClass: "%(module)s.RecordingStage"
+     eventTopic: "None"
+     stateless: true
+}
+"""
+
+class OverlappedLoopTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.nSlices = 2
+        self.dir = tempfile.mkdtemp()
+        del processed[:]
+
+    def writePolicy(self, policy):
+        policyFile = os.path.join(self.dir, "overlap_policy.paf")
+        f = open(policyFile, "w")
+        f.write(policy % {"nSlices": self.nSlices, "module": __name__})
+        f.close()
+        return policyFile
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def countVisits(self, stage, rank):
+        with processedLock:
+            return [visit for s, r, visit in processed if s == stage and r == rank]
+
+    def runPipeline(self, policyFile, nVisits):
+        """
+        run the overlapped loop until each Slice has processed nVisits
+        visits in its first stage
+        """
+        pipeline = Pipeline("overlap", policyFile, "overlap")
+        pipeline.initializeLogger()
+        pipeline.configurePipeline()
+        pipeline.initializeQueues()
+        pipeline.initializeStages()
+        pipeline.startSlices()
+
+        def run():
+            try:
+                pipeline.startStagesLoop()
+            except SystemExit:
+                pass
+        loop = threading.Thread(target=run)
+        loop.daemon = True
+        loop.start()
+
+        # stop starting visits once each Slice has finished a few, and 
+        # exit at the end of the visits in flight
+        done = threading.Event()
+        def watch():
+            while not done.isSet():
+                if min([len(self.countVisits(1, r)) for r in range(self.nSlices)]) >= nVisits:
+                    pipeline.setExitLevel(4)
+                    pipeline.setStop()
+                    return
+                done.wait(0.01)
+        watcher = threading.Thread(target=watch)
+        watcher.daemon = True
+        watcher.start()
+
+        loop.join(60)
+        done.set()
+        self.assert_(not loop.isAlive(), "overlapped loop did not finish")
+
+    def testVisitDepth2(self):
+        nVisits = 6
+        self.runPipeline(self.writePolicy(POLICY), nVisits)
+
+        # every visit's Clipboard went through each stage exactly once and
+        # in order, and only once the Pipeline had prepared that visit
+        for rank in range(self.nSlices):
+            visits = self.countVisits(1, rank)
+            self.assert_(len(visits) >= nVisits)
+            self.assertEquals(visits, range(1, len(visits)+1))
+            self.assertEquals(self.countVisits(2, rank), visits)
+            for visit in visits:
+                self.assert_(processed.index((0, -1, visit)) < 
+                             processed.index((1, rank, visit)),
+                             "visit %d processed before its preprocess" % visit)
+
+    def testFailedVisit(self):
+        nVisits = 6
+        self.runPipeline(self.writePolicy(FAILURE_POLICY), nVisits)
+
+        # the next stage skips the visit a stage failed on, in the Pipeline
+        # and in each Slice, however soon it picks up that visit's Clipboard
+        serialVisits = self.countVisits(3, -1)
+        self.assert_(len(serialVisits) >= nVisits - 1)
+        self.assert_(SERIAL_FAILURE not in serialVisits)
+        self.assertEquals(serialVisits, 
+                          [v for v in range(1, len(serialVisits)+2) 
+                           if v != SERIAL_FAILURE])
+        for rank in range(self.nSlices):
+            visits = self.countVisits(1, rank)
+            self.assert_(len(visits) >= nVisits)
+            self.assertEquals(self.countVisits(2, rank), 
+                              [v for v in visits if v != PARALLEL_FAILURE])
+
+#-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+
+def suite():
+    """Returns a suite containing all the test cases in this module."""
+    tests.init()
+
+    suites = []
+    suites += unittest.makeSuite(OverlappedLoopTestCase)
+
+    return unittest.TestSuite(suites)
+
+if __name__ == "__main__":
+    tests.run(suite())
@@ -0,0 +1,101 @@
+#! /usr/bin/env python
+
+#
+# LSST Data Management System
+# Copyright 2008, 2009, 2010 LSST Corporation.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsst.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+#
+
+
+"""
+test the lsst.pex.harness.PipelineConfig module
+"""
+import unittest
+
+from lsst.pex.harness.PipelineConfig import PipelineConfig, importClass
+from lsst.pex.harness.stage import NoOpParallelProcessing
+from lsst.pex.harness.Clipboard import Clipboard
+from lsst.pex.policy import Policy
+
+import lsst.utils.tests as tests
+
+def makeStagePolicy(name=None, parallelClass=None, eventTopic="None",
+                    shareData=None):
+    stageDefPolicy = Policy()
+    if name is not None:
+        stageDefPolicy.set("name", name)
+    if parallelClass is not None:
+        stageDefPolicy.set("parallelClass", parallelClass)
+        stagePolicy = Policy()
+        stagePolicy.set("threshold", 5)
+        stageDefPolicy.set("stagePolicy", stagePolicy)
+    stageDefPolicy.set("eventTopic", eventTopic)
+    if shareData is not None:
+        stageDefPolicy.set("shareData", shareData)
+    return stageDefPolicy
+
+class PipelineConfigTestCase(unittest.TestCase):
+
+    def testImportClass(self):
+        self.assert_(importClass("lsst.pex.harness.Clipboard.Clipboard") is Clipboard)
+
+    def testStages(self):
+        executePolicy = Policy()
+        executePolicy.add("appStage", makeStagePolicy("first",
+            "lsst.pex.harness.stage.NoOpParallelProcessing", "trigger"))
+        executePolicy.add("appStage", makeStagePolicy(shareData=True))
+
+        config = PipelineConfig(executePolicy)
+        self.assertEquals(config.nStages, 2)
+        self.assertEquals(config.stageNames, ["first", "NoOpParallelProcessing"])
+        self.assertEquals(config.parallelClasses,
+                          [NoOpParallelProcessing, NoOpParallelProcessing])
+        self.assertEquals(config.stagePolicies[0].get("threshold"), 5)
+        self.assert_(config.stagePolicies[1] is None)
+        self.assertEquals(config.eventTopics, ["trigger", "None"])
+        self.assertEquals(config.shareData, [False, True])
+        self.assert_(config.failParallelName is None)
+        self.assert_(config.failParallelClass is None)
+
+    def testFailureStage(self):
+        failPolicy = Policy()
+        failPolicy.set("name", "onFailure")
+
+        executePolicy = Policy()
+        executePolicy.add("appStage", makeStagePolicy("first"))
+        executePolicy.set("failureStage", failPolicy)
+
+        config = PipelineConfig(executePolicy)
+        self.assertEquals(config.failureStageName, "onFailure")
+        self.assert_(config.failParallelClass is NoOpParallelProcessing)
+        self.assert_(config.failStagePolicy is None)
+
+#-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+
+def suite():
+    """Returns a suite containing all the test cases in this module."""
+    tests.init()
+
+    suites = []
+    suites += unittest.makeSuite(PipelineConfigTestCase)
+
+    return unittest.TestSuite(suites)
+
+if __name__ == "__main__":
+    tests.run(suite())
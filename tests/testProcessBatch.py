@@ -0,0 +1,144 @@
+#! /usr/bin/env python
+
+#
+# LSST Data Management System
+# Copyright 2008, 2009, 2010 LSST Corporation.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsst.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+#
+
+
+"""
+test the processBatch() hook of lsst.pex.harness.stage.ParallelProcessing
+"""
+import unittest
+
+from lsst.pex.harness.Queue import Queue
+from lsst.pex.harness.Clipboard import Clipboard
+from lsst.pex.harness.stage import ParallelProcessing
+
+import lsst.utils.tests as tests
+
+class SquareStage(ParallelProcessing):
+
+    def setup(self):
+        self.batches = []
+
+    def process(self, clipboard):
+        clipboard.put("y", clipboard.get("x") ** 2)
+
+class BatchSquareStage(SquareStage):
+
+    def processBatch(self, clipboards):
+        self.batches.append(len(clipboards))
+        for clipboard in clipboards:
+            clipboard.put("y", clipboard.get("x") ** 2)
+
+class FailingBatchStage(SquareStage):
+
+    def processBatch(self, clipboards):
+        raise RuntimeError("batch failed")
+
+def makeQueue(n):
+    queue = Queue()
+    for i in range(n):
+        clipboard = Clipboard()
+        clipboard.put("x", i)
+        queue.addDataset(clipboard)
+    return queue
+
+class ProcessBatchTestCase(unittest.TestCase):
+
+    def testSingle(self):
+        stage = BatchSquareStage()
+        inQueue = makeQueue(1)
+        outQueue = Queue()
+        stage.initialize(outQueue, inQueue)
+        stage.applyProcess()
+
+        self.assertEquals(stage.batches, [])
+        self.assertEquals(inQueue.size(), 0)
+        self.assertEquals(outQueue.getNextDataset().get("y"), 0)
+
+    def testOneAtATime(self):
+        # applyProcess() never takes more than one clipboard, however many 
+        # are queued
+        stage = BatchSquareStage()
+        inQueue = makeQueue(3)
+        outQueue = Queue()
+        stage.initialize(outQueue, inQueue)
+        stage.applyProcess()
+
+        self.assertEquals(stage.batches, [])
+        self.assertEquals(inQueue.size(), 2)
+        self.assertEquals(outQueue.size(), 1)
+
+    def testDefaultBatch(self):
+        stage = SquareStage()
+        inQueue = makeQueue(4)
+        outQueue = Queue()
+        stage.initialize(outQueue, inQueue)
+        stage.applyProcessBatch(4)
+
+        self.assertEquals(inQueue.size(), 0)
+        self.assertEquals([c.get("y") for c in outQueue.elements()], [0, 1, 4, 9])
+
+    def testBatch(self):
+        stage = BatchSquareStage()
+        inQueue = makeQueue(4)
+        outQueue = Queue()
+        stage.initialize(outQueue, inQueue)
+        stage.applyProcessBatch(4)
+
+        self.assertEquals(stage.batches, [4])
+        self.assertEquals([c.get("y") for c in outQueue.elements()], [0, 1, 4, 9])
+
+    def testPartialBatch(self):
+        stage = BatchSquareStage()
+        inQueue = makeQueue(5)
+        outQueue = Queue()
+        stage.initialize(outQueue, inQueue)
+        stage.applyProcessBatch(3)
+
+        self.assertEquals(stage.batches, [3])
+        self.assertEquals(inQueue.size(), 2)
+        self.assertEquals([c.get("y") for c in outQueue.elements()], [0, 1, 4])
+
+    def testFailure(self):
+        # the clipboards stay queued for the failure stage to examine
+        stage = FailingBatchStage()
+        inQueue = makeQueue(3)
+        outQueue = Queue()
+        stage.initialize(outQueue, inQueue)
+        self.assertRaises(RuntimeError, stage.applyProcessBatch, 3)
+        self.assertEquals(inQueue.size(), 3)
+        self.assertEquals(outQueue.size(), 0)
+
+#-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+
+def suite():
+    """Returns a suite containing all the test cases in this module."""
+    tests.init()
+
+    suites = []
+    suites += unittest.makeSuite(ProcessBatchTestCase)
+
+    return unittest.TestSuite(suites)
+
+if __name__ == "__main__":
+    tests.run(suite())
@@ -0,0 +1,111 @@
+#! /usr/bin/env python
+
+#
+# LSST Data Management System
+# Copyright 2008, 2009, 2010 LSST Corporation.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsst.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+#
+
+
+"""
+test the lsst.pex.harness.Queue module
+"""
+import threading
+import time
+import unittest
+
+from lsst.pex.harness.Queue import Queue, QueueFull
+
+import lsst.utils.tests as tests
+
+class QueueTestCase(unittest.TestCase):
+
+    def testFifo(self):
+        queue = Queue()
+        self.assertEquals(queue.getNextDataset(), None)
+        self.assertEquals(queue.element(), None)
+        for i in range(5):
+            queue.addDataset(i)
+        self.assertEquals(queue.size(), 5)
+        self.assertEquals(queue.element(), 0)
+        self.assertEquals([queue.getNextDataset() for i in range(5)], range(5))
+        self.assertEquals(queue.getNextDataset(), None)
+
+    def testBlockingGet(self):
+        queue = Queue()
+        self.assertEquals(queue.getNextDataset(block=True, timeout=0.05), None)
+
+        producer = threading.Timer(0.05, queue.addDataset, args=("a",))
+        producer.start()
+        self.assertEquals(queue.element(block=True, timeout=5), "a")
+        self.assertEquals(queue.getNextDataset(block=True), "a")
+        producer.join()
+
+    def testBackpressure(self):
+        queue = Queue(maxsize=2)
+        queue.addDataset(1)
+        queue.addDataset(2)
+        self.assertRaises(QueueFull, queue.addDataset, 3, False)
+        self.assertRaises(QueueFull, queue.addDataset, 3, True, 0.05)
+
+        consumer = threading.Timer(0.05, queue.getNextDataset)
+        consumer.start()
+        queue.addDataset(3)
+        consumer.join()
+        self.assertEquals([queue.getNextDataset() for i in range(2)], [2, 3])
+
+    def testStats(self):
+        queue = Queue(maxsize=3)
+        for i in range(3):
+            queue.addDataset(i)
+        queue.getNextDataset()
+        stats = queue.getStats()
+        self.assertEquals(stats["size"], 2)
+        self.assertEquals(stats["maxsize"], 3)
+        self.assertEquals(stats["highWaterMark"], 3)
+        self.assertEquals(stats["added"], 3)
+        self.assertEquals(stats["removed"], 1)
+
+    def testThreads(self):
+        queue = Queue(maxsize=4)
+        received = []
+        def consume():
+            for i in range(100):
+                received.append(queue.getNextDataset(block=True))
+        consumer = threading.Thread(target=consume)
+        consumer.start()
+        for i in range(100):
+            queue.addDataset(i)
+        consumer.join()
+        self.assertEquals(received, range(100))
+        self.assert_(queue.getStats()["highWaterMark"] <= 4)
+
+#-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+
+def suite():
+    """Returns a suite containing all the test cases in this module."""
+    tests.init()
+
+    suites = []
+    suites += unittest.makeSuite(QueueTestCase)
+
+    return unittest.TestSuite(suites)
+
+if __name__ == "__main__":
+    tests.run(suite())
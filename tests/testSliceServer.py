@@ -0,0 +1,192 @@
+#! /usr/bin/env python
+
+#
+# LSST Data Management System
+# Copyright 2008, 2009, 2010 LSST Corporation.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsst.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+#
+
+"""
+test the lsst.pex.harness.SliceServer and SliceAgent modules with agents
+connecting over localhost
+"""
+import multiprocessing
+import os
+import tempfile
+import unittest
+
+from lsst.pex.harness.Barrier import Barrier, BarrierAborted
+from lsst.pex.harness.WorkQueue import WorkQueue
+from lsst.pex.harness.Clipboard import Clipboard
+from lsst.pex.harness.SliceServer import SliceServer
+from lsst.pex.harness.SliceAgent import SliceClient, RemoteObject
+
+import lsst.utils.tests as tests
+
+def agent(address, nRounds, output):
+    def stopped():
+        pass
+    client = SliceClient(address, onStop=stopped)
+    barrier = RemoteObject(client, ("barrier", 0))
+    workQueue = RemoteObject(client, ("workQueue", 0))
+    for i in range(nRounds):
+        barrier.wait(client.rank)
+    while True:
+        work = workQueue.next()
+        if work is None:
+            break
+        index, item = work
+        item.put("rank", client.rank)
+        workQueue.putResult(index, item)
+    try:
+        barrier.wait(client.rank)
+    except BarrierAborted:
+        output.put((client.rank, "aborted"))
+    client.close()
+
+def batchAgent(address, batchSize, output):
+    client = SliceClient(address)
+    workQueue = RemoteObject(client, ("workQueue", 0))
+    batches = []
+    finished = False
+    while not finished:
+        works, finished = workQueue.nextBatch(batchSize)
+        if works:
+            batches.append(len(works))
+        for index, item in works:
+            item.put("rank", client.rank)
+            workQueue.putResult(index, item)
+    output.put((client.rank, batches))
+    client.close()
+
+class SliceServerTestCase(unittest.TestCase):
+
+    def runAgents(self, address, nSlices=2, nRounds=10):
+        server = SliceServer(address)
+        barrier = Barrier(nSlices+1)
+        workQueue = WorkQueue(nSlices)
+        output = multiprocessing.Queue()
+
+        agents = [multiprocessing.Process(target=agent,
+                                          args=(server.getAddress(), nRounds, output))
+                  for r in range(nSlices)]
+        for a in agents:
+            a.start()
+
+        config = {"nStages": 1}
+        targets = {("barrier", 0): barrier, ("workQueue", 0): workQueue}
+        remoteSlices = server.accept(nSlices, config, targets, 30)
+        for remoteSlice in remoteSlices:
+            remoteSlice.daemon = True
+            remoteSlice.start()
+        self.assertEquals([s.rank for s in remoteSlices], range(nSlices))
+        self.assertEquals(sorted([s.getPid() for s in remoteSlices]),
+                          sorted([a.pid for a in agents]))
+
+        for i in range(nRounds):
+            arrivals = barrier.wait(-1)
+        self.assertEquals(sorted([r for r, t in arrivals]), range(-1, nSlices))
+
+        items = []
+        for i in range(20):
+            item = Clipboard()
+            item.put("x", i)
+            items.append(item)
+        workQueue.submit(items)
+        results = workQueue.collect(len(items))
+        self.assertEquals([r.get("x") for r in results], range(20))
+        for r in results:
+            self.assert_(r.get("rank") in range(nSlices))
+
+        # an aborted barrier is reported to the agents
+        barrier.abort()
+        self.assertEquals(sorted([output.get() for a in agents]),
+                          [(r, "aborted") for r in range(nSlices)])
+
+        for a in agents:
+            a.join()
+        for remoteSlice in remoteSlices:
+            remoteSlice.join()
+        server.close()
+
+    def testTcp(self):
+        self.runAgents("localhost:0")
+
+    def testUnixSocket(self):
+        path = os.path.join(tempfile.mkdtemp(), "slices")
+        self.runAgents("unix:" + path)
+        self.assert_(not os.path.exists(path))
+
+    def testBatches(self):
+        # agents take the work items of a dynamically dispatched stage in
+        # batches of up to three
+        nSlices = 2
+        server = SliceServer("localhost:0")
+        workQueue = WorkQueue(nSlices)
+        output = multiprocessing.Queue()
+
+        agents = [multiprocessing.Process(target=batchAgent,
+                                          args=(server.getAddress(), 3, output))
+                  for r in range(nSlices)]
+        for a in agents:
+            a.start()
+
+        targets = {("workQueue", 0): workQueue}
+        remoteSlices = server.accept(nSlices, {"nStages": 1}, targets, 30)
+        for remoteSlice in remoteSlices:
+            remoteSlice.daemon = True
+            remoteSlice.start()
+
+        items = []
+        for i in range(20):
+            item = Clipboard()
+            item.put("x", i)
+            items.append(item)
+        workQueue.submit(items)
+        results = workQueue.collect(len(items))
+        self.assertEquals([r.get("x") for r in results], range(20))
+
+        batches = dict([output.get() for a in agents])
+        self.assertEquals(sorted(batches.keys()), range(nSlices))
+        sizes = batches[0] + batches[1]
+        self.assertEquals(sum(sizes), 20)
+        self.assert_(max(sizes) <= 3)
+
+        for a in agents:
+            a.join()
+        for remoteSlice in remoteSlices:
+            remoteSlice.join()
+        server.close()
+
+    def testBadAddress(self):
+        self.assertRaises(RuntimeError, SliceServer, "nowhere")
+
+#-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+
+def suite():
+    """Returns a suite containing all the test cases in this module."""
+    tests.init()
+
+    suites = []
+    suites += unittest.makeSuite(SliceServerTestCase)
+
+    return unittest.TestSuite(suites)
+
+if __name__ == "__main__":
+    tests.run(suite())
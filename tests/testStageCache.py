@@ -0,0 +1,139 @@
+#! /usr/bin/env python
+
+#
+# LSST Data Management System
+# Copyright 2008, 2009, 2010 LSST Corporation.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsst.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+#
+
+
+"""
+test the lsst.pex.harness.StageCache module
+"""
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from lsst.pex.harness.StageCache import StageCache
+from lsst.pex.harness.Clipboard import Clipboard
+from lsst.pex.harness.stage import ParallelProcessing
+
+import lsst.utils.tests as tests
+
+class SumStage(ParallelProcessing):
+
+    def process(self, clipboard):
+        clipboard.put("sum", sum(clipboard.get("values")))
+
+def makeClipboard(values):
+    clipboard = Clipboard()
+    clipboard.put("values", values)
+    return clipboard
+
+class StageCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = StageCache(os.path.join(self.directory, "cache"))
+        self.stage = SumStage(sysdata={"rank": 0, "universeSize": 2})
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def testKeys(self):
+        key = self.cache.makeKey("process", self.stage, makeClipboard([1, 2]), ["values"])
+        self.assertEquals(key, 
+            self.cache.makeKey("process", self.stage, makeClipboard([1, 2]), ["values"]))
+        self.assertNotEquals(key,
+            self.cache.makeKey("process", self.stage, makeClipboard([1, 3]), ["values"]))
+        self.assertNotEquals(key,
+            self.cache.makeKey("preprocess", self.stage, makeClipboard([1, 2]), ["values"]))
+
+        # the Slice rank is part of the key
+        other = SumStage(sysdata={"rank": 1, "universeSize": 2})
+        self.assertNotEquals(key,
+            self.cache.makeKey("process", other, makeClipboard([1, 2]), ["values"]))
+
+        # a key that is not on the Clipboard is hashed as missing
+        self.assertNotEquals(key,
+            self.cache.makeKey("process", self.stage, Clipboard(), ["values"]))
+
+        # an input that cannot be pickled disables caching
+        self.assertEquals(
+            self.cache.makeKey("process", self.stage, makeClipboard(threading.Lock()), ["values"]),
+            None)
+
+    def testStoreAndRestore(self):
+        clipboard = makeClipboard([1, 2, 3])
+        key = self.cache.makeKey("process", self.stage, clipboard, ["values"])
+        self.assertEquals(self.cache.get(key), None)
+
+        self.stage.process(clipboard)
+        clipboard.put("shared", "s", True)
+        self.assert_(self.cache.put(key, clipboard, ["sum", "shared", "absent"]))
+
+        restored = makeClipboard([1, 2, 3])
+        results = self.cache.get(key)
+        self.assertEquals(len(results), 2)
+        self.cache.restore(restored, results)
+        self.assertEquals(restored.get("sum"), 6)
+        self.assert_(restored.isShared("shared"))
+        self.assert_(not restored.contains("absent"))
+
+        self.assertEquals(self.cache.get(None), None)
+        stats = self.cache.getStats()
+        self.assertEquals((stats["hits"], stats["misses"], stats["stored"]), (1, 1, 1))
+
+    def testEviction(self):
+        keys = []
+        for i in range(4):
+            clipboard = makeClipboard([i])
+            key = self.cache.makeKey("process", self.stage, clipboard, ["values"])
+            clipboard.put("sum", "x" * 1000)
+            self.cache.put(key, clipboard, ["sum"])
+            os.utime(self.cache._path(key), (i, i))
+            keys.append(key)
+        size = os.path.getsize(self.cache._path(keys[0]))
+
+        # using the oldest entry makes it the most recently used
+        self.cache.get(keys[0])
+        self.cache.maxBytes = 2 * size
+        self.cache.evict()
+
+        self.assertEquals(self.cache.getStats()["evicted"], 2)
+        self.assertNotEquals(self.cache.get(keys[0]), None)
+        self.assertEquals(self.cache.get(keys[1]), None)
+        self.assertEquals(self.cache.get(keys[2]), None)
+        self.assertNotEquals(self.cache.get(keys[3]), None)
+
+#-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+
+def suite():
+    """Returns a suite containing all the test cases in this module."""
+    tests.init()
+
+    suites = []
+    suites += unittest.makeSuite(StageCacheTestCase)
+
+    return unittest.TestSuite(suites)
+
+if __name__ == "__main__":
+    tests.run(suite())
@@ -0,0 +1,84 @@
+#! /usr/bin/env python
+
+#
+# LSST Data Management System
+# Copyright 2008, 2009, 2010 LSST Corporation.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsst.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+#
+
+
+"""
+test the lsst.pex.harness.StageFusion module
+"""
+import unittest
+
+from lsst.pex.harness.StageFusion import planFusion, getFusedStages
+from lsst.pex.harness.SyncPlan import SyncPlan
+
+import lsst.utils.tests as tests
+
+class StageFusionTestCase(unittest.TestCase):
+
+    def testRuns(self):
+        # stages 2-4 and 6-7 are fused
+        plan = planFusion([False, True, True, True, False, True, True],
+                          [False] * 7)
+        self.assertEquals(plan, [1, 2, 2, 2, 5, 6, 6])
+        self.assertEquals(getFusedStages(plan, 1), [1])
+        self.assertEquals(getFusedStages(plan, 2), [2, 3, 4])
+        self.assertEquals(getFusedStages(plan, 3), [])
+        self.assertEquals(getFusedStages(plan, 6), [6, 7])
+
+    def testStateless(self):
+        # a stateless stage is not fused with a stateful one
+        plan = planFusion([True, True, True], [False, True, True])
+        self.assertEquals(plan, [1, 2, 2])
+
+    def testNothingFused(self):
+        self.assertEquals(planFusion([False, False], [False, False]), [1, 2])
+        self.assertEquals(planFusion([], []), [])
+
+    def testSyncPlan(self):
+        # the fused stages 3 and 4 keep no barriers, even without elision
+        fused = [False, False, True, True, False]
+        plan = SyncPlan([True, False, False, False, True], [True] * 5,
+                        elide=False, fused=fused)
+        self.assertEquals(plan.getBarrierCount(), 12)
+        for point in range(4):
+            self.assert_(not plan.needsBarrier(3, point))
+            self.assert_(plan.needsBarrier(2, point))
+
+        plan = SyncPlan([True, False, False, False, True], [True] * 5,
+                        fused=fused)
+        self.assertEquals(plan.getBarrierCount(),
+                          SyncPlan([True, False, False, False, True], [True] * 5).getBarrierCount())
+
+#-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+
+def suite():
+    """Returns a suite containing all the test cases in this module."""
+    tests.init()
+
+    suites = []
+    suites += unittest.makeSuite(StageFusionTestCase)
+
+    return unittest.TestSuite(suites)
+
+if __name__ == "__main__":
+    tests.run(suite())
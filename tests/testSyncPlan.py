@@ -0,0 +1,90 @@
+#! /usr/bin/env python
+
+#
+# LSST Data Management System
+# Copyright 2008, 2009, 2010 LSST Corporation.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsst.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+#
+
+"""
+test the lsst.pex.harness.SyncPlan module
+"""
+import unittest
+
+from lsst.pex.harness.SyncPlan import SyncPlan
+
+import lsst.utils.tests as tests
+
+BEFORE_PRE  = SyncPlan.BEFORE_PREPROCESS
+AFTER_PRE   = SyncPlan.AFTER_PREPROCESS
+AFTER_PROC  = SyncPlan.AFTER_PROCESS
+AFTER_POST  = SyncPlan.AFTER_POSTPROCESS
+
+class SyncPlanTestCase(unittest.TestCase):
+
+    def testFull(self):
+        plan = SyncPlan([True, False], [False, True], elide=False)
+        self.assertEquals(plan.getBarrierCount(), 8)
+
+    def testBothHalves(self):
+        plan = SyncPlan([True], [True])
+        self.assert_(plan.needsBarrier(1, BEFORE_PRE))
+        self.assert_(plan.needsBarrier(1, AFTER_PRE))
+        self.assert_(plan.needsBarrier(1, AFTER_PROC))
+        self.assert_(not plan.needsBarrier(1, AFTER_POST))
+
+    def testParallelOnly(self):
+        # consecutive parallel-only stages only need the per-visit barrier
+        plan = SyncPlan([False, False, False], [True, True, True])
+        self.assertEquals(plan.getBarrierCount(), 1)
+        self.assert_(plan.needsBarrier(1, BEFORE_PRE))
+
+    def testMixed(self):
+        # serial-only stage 1 followed by parallel-only stages 2 and 3
+        plan = SyncPlan([True, False, False], [False, True, True])
+        self.assert_(plan.needsBarrier(1, BEFORE_PRE))
+        self.assert_(not plan.needsBarrier(1, AFTER_PRE))
+        self.assert_(not plan.needsBarrier(1, AFTER_PROC))
+        self.assert_(plan.needsBarrier(2, AFTER_PRE))
+        self.assert_(not plan.needsBarrier(3, AFTER_PRE))
+        self.assertEquals(plan.getBarrierCount(), 2)
+
+    def testDynamic(self):
+        # the work queue orders the Slices after preprocess; only the
+        # barrier before postprocess remains
+        plan = SyncPlan([True], [True], dynamic=[True])
+        self.assert_(plan.needsBarrier(1, BEFORE_PRE))
+        self.assert_(not plan.needsBarrier(1, AFTER_PRE))
+        self.assert_(plan.needsBarrier(1, AFTER_PROC))
+        self.assertEquals(plan.getBarrierCount(), 2)
+
+#-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+
+def suite():
+    """Returns a suite containing all the test cases in this module."""
+    tests.init()
+
+    suites = []
+    suites += unittest.makeSuite(SyncPlanTestCase)
+
+    return unittest.TestSuite(suites)
+
+if __name__ == "__main__":
+    tests.run(suite())
+
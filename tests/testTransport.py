@@ -0,0 +1,99 @@
+#! /usr/bin/env python
+
+#
+# LSST Data Management System
+# Copyright 2008, 2009, 2010 LSST Corporation.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsst.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+#
+
+
+"""
+test the lsst.pex.harness.Transport module
+"""
+import os
+import unittest
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from lsst.pex.harness.Transport import ShmTransport
+from lsst.pex.harness.Clipboard import Clipboard
+
+import lsst.utils.tests as tests
+
+class TransportTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.transport = ShmTransport(threshold=1024)
+
+    def tearDown(self):
+        self.transport.close()
+
+    def testInBand(self):
+        clip = Clipboard()
+        clip.put("x", [1, 2, 3], True)
+        clip.put("name", "visit")
+        copy = self.transport.loads(self.transport.dumps(clip))
+        self.assertEquals(copy.get("x"), [1, 2, 3])
+        self.assertEquals(copy.get("name"), "visit")
+        self.assertEquals(copy.getSharedKeys(), ["x"])
+        self.assertEquals(os.listdir(self.transport.directory), [])
+
+    def testOutOfBand(self):
+        if numpy is None:
+            return
+        small = numpy.arange(10)
+        large = numpy.arange(100000, dtype=numpy.float64).reshape(1000, 100)
+        clip = Clipboard()
+        clip.put("small", small)
+        clip.put("large", large)
+
+        data = self.transport.dumps(clip)
+        self.assert_(len(data) < large.nbytes)
+        self.assertEquals(len(os.listdir(self.transport.directory)), 1)
+
+        copy = self.transport.loads(data)
+        self.assert_((copy.get("small") == small).all())
+        self.assert_((copy.get("large") == large).all())
+        self.assertEquals(copy.get("large").shape, (1000, 100))
+        self.assertEquals(os.listdir(self.transport.directory), [])
+
+        # the received array is writable and private to the receiver
+        copy.get("large")[0, 0] = -1
+        self.assertEquals(large[0, 0], 0)
+
+    def testClose(self):
+        self.transport.dumps([1])
+        self.transport.close()
+        self.assert_(not os.path.exists(self.transport.directory))
+
+#-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+
+def suite():
+    """Returns a suite containing all the test cases in this module."""
+    tests.init()
+
+    suites = []
+    suites += unittest.makeSuite(TransportTestCase)
+
+    return unittest.TestSuite(suites)
+
+if __name__ == "__main__":
+    tests.run(suite())
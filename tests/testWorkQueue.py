@@ -0,0 +1,125 @@
+#! /usr/bin/env python
+
+#
+# LSST Data Management System
+# Copyright 2008, 2009, 2010 LSST Corporation.
+#
+# This product includes software developed by the
+# LSST Project (http://www.lsst.org/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the LSST License Statement and
+# the GNU General Public License along with this program.  If not,
+# see <http://www.lsstcorp.org/LegalNotices/>.
+#
+
+"""
+test the lsst.pex.harness.WorkQueue module
+"""
+import multiprocessing
+import threading
+import unittest
+
+from lsst.pex.harness.WorkQueue import WorkQueue, ProcessWorkQueue
+from lsst.pex.harness.Clipboard import Clipboard
+
+import lsst.utils.tests as tests
+
+def consume(workQueue, rank, nVisits=1):
+    for visit in range(nVisits):
+        while True:
+            work = workQueue.next()
+            if work is None:
+                break
+            index, item = work
+            item.put("y", item.get("x") * 2)
+            item.put("rank", rank)
+            workQueue.putResult(index, item)
+
+def makeItems(n):
+    items = []
+    for i in range(n):
+        item = Clipboard()
+        item.put("x", i)
+        items.append(item)
+    return items
+
+class WorkQueueTestCase(unittest.TestCase):
+
+    def testThreads(self):
+        nSlices = 4
+        workQueue = WorkQueue(nSlices)
+        threads = [threading.Thread(target=consume, args=(workQueue, r))
+                   for r in range(nSlices)]
+        for t in threads:
+            t.start()
+
+        # every consumer stops at its own end-of-visit marker
+        self.assertEquals(workQueue.submit(makeItems(25)), 25)
+        results = workQueue.collect(25)
+        for t in threads:
+            t.join()
+
+        self.assertEquals([r.get("y") for r in results], range(0, 50, 2))
+
+    def testEmpty(self):
+        workQueue = WorkQueue(2)
+        workQueue.submit([])
+        self.assertEquals(workQueue.next(), None)
+        self.assertEquals(workQueue.next(), None)
+        self.assertEquals(workQueue.collect(0), [])
+
+    def testBatches(self):
+        workQueue = WorkQueue(2)
+        workQueue.submit(makeItems(5))
+
+        works, finished = workQueue.nextBatch(3)
+        self.assertEquals([index for index, item in works], [0, 1, 2])
+        self.assertEquals(finished, False)
+
+        # the end-of-visit marker cuts a batch short
+        works, finished = workQueue.nextBatch(3)
+        self.assertEquals([item.get("x") for index, item in works], [3, 4])
+        self.assertEquals(finished, True)
+
+        self.assertEquals(workQueue.nextBatch(3), ([], True))
+
+    def testProcesses(self):
+        nSlices = 3
+        nVisits = 3
+        workQueue = ProcessWorkQueue(nSlices)
+        procs = [multiprocessing.Process(target=consume, args=(workQueue, r, nVisits))
+                 for r in range(nSlices)]
+        for p in procs:
+            p.start()
+
+        for visit in range(nVisits):
+            workQueue.submit(makeItems(10))
+            results = workQueue.collect(10)
+            self.assertEquals([r.get("y") for r in results], range(0, 20, 2))
+        for p in procs:
+            p.join()
+        workQueue.close()
+
+#-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
+
+def suite():
+    """Returns a suite containing all the test cases in this module."""
+    tests.init()
+
+    suites = []
+    suites += unittest.makeSuite(WorkQueueTestCase)
+
+    return unittest.TestSuite(suites)
+
+if __name__ == "__main__":
+    tests.run(suite())